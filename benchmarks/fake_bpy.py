@@ -0,0 +1,489 @@
+"""
+A stand-in for Blender's bpy module, so the controller's hot paths can be measured on a plain
+Python + NumPy install.
+
+Only the parts of the API the controller uses are covered. Pose channels (rotation_euler, location, scale)
+of each armature live in one NumPy array, so foreach_get()/foreach_set() are bulk copies like in Blender,
+while per-bone attribute access goes through Python objects the way RNA access does.
+
+Usage:
+    import fake_bpy
+    fake_bpy.install()  # registers this module as "bpy"
+    fake_bpy.load_model_tree("controller/model_tree.json")
+    fake_bpy.make_synthetic_rig("Crowd_01", 10000)
+"""
+import json
+import os
+import sys
+import types
+
+import numpy as np
+
+
+class Vector:
+    """Mimics mathutils Vector/Euler over a NumPy array (often a row view into the armature's pose arrays)."""
+    __slots__ = ("_values",)
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, index):
+        return float(self._values[index])
+
+    def __setitem__(self, index, value):
+        self._values[index] = value
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return (float(value) for value in self._values)
+
+    def __repr__(self):
+        return f"Vector({tuple(self)})"
+
+    def copy(self):
+        return Vector(np.array(self._values, dtype=np.float32))
+
+    def to_tuple(self):
+        return tuple(self)
+
+    x = property(lambda self: self[0], lambda self, value: self.__setitem__(0, value))
+    y = property(lambda self: self[1], lambda self, value: self.__setitem__(1, value))
+    z = property(lambda self: self[2], lambda self, value: self.__setitem__(2, value))
+
+
+class Collection:
+    """Mimics bpy_prop_collection: ordered, addressable by index or name, with foreach_get/foreach_set."""
+
+    def __init__(self, items=(), channels=None):
+        self._items = []
+        self._by_name = {}
+        self._channels = channels  # attribute name -> (items, components) array, for bulk access
+        for item in items:
+            self.link(item)
+
+    def link(self, item):
+        self._items.append(item)
+        self._by_name[item.name] = item
+
+    def remove(self, item):
+        self._items.remove(item)
+        self._by_name.pop(item.name, None)
+
+    def _rename(self, item, old_name):
+        self._by_name.pop(old_name, None)
+        self._by_name[item.name] = item
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._by_name[key]
+        return self._items[key]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name, default=None):
+        return self._by_name.get(name, default)
+
+    def keys(self):
+        return [item.name for item in self._items]
+
+    def values(self):
+        return list(self._items)
+
+    def items(self):
+        return [(item.name, item) for item in self._items]
+
+    def foreach_get(self, attribute, sequence):
+        if self._channels is not None and attribute in self._channels:
+            sequence[:] = self._channels[attribute].reshape(-1)
+            return
+        position = 0
+        for item in self._items:
+            value = getattr(item, attribute)
+            if isinstance(value, (Vector, tuple, list)):
+                for component in value:
+                    sequence[position] = component
+                    position += 1
+            else:
+                sequence[position] = value
+                position += 1
+
+    def foreach_set(self, attribute, sequence):
+        if self._channels is not None and attribute in self._channels:
+            self._channels[attribute].reshape(-1)[:] = sequence
+            return
+        position = 0
+        for item in self._items:
+            current = getattr(item, attribute)
+            if isinstance(current, Vector):
+                size = len(current)
+                setattr(item, attribute, sequence[position:position + size])
+                position += size
+            else:
+                setattr(item, attribute, sequence[position])
+                position += 1
+
+
+def _channel(name):
+    def getter(self):
+        return Vector(self._channels[name][self._index])
+
+    def setter(self, value):
+        self._channels[name][self._index] = tuple(value)
+
+    return property(getter, setter)
+
+
+class Bone:
+    """Armature (edit/rest) bone. head and tail are relative to the armature."""
+
+    def __init__(self, name, head, tail):
+        self.name = name
+        self.head = Vector(np.array(head, dtype=np.float32))
+        self.tail = Vector(np.array(tail, dtype=np.float32))
+        self.head_local = self.head
+        self.tail_local = self.tail
+        self.parent = None
+        self.children = []
+
+    @property
+    def length(self):
+        return float(np.linalg.norm(self.tail._values - self.head._values))
+
+
+class Constraint:
+    def __init__(self, name, type, influence=1.0, subtarget="", chain_count=0):
+        self.name = name
+        self.type = type
+        self.influence = influence
+        self.subtarget = subtarget
+        self.chain_count = chain_count
+        self.target = None
+
+
+class PoseBone:
+    def __init__(self, name, bone, channels, index):
+        self.name = name
+        self.bone = bone
+        self.parent = None
+        self.children = []
+        self.constraints = []
+        self.rotation_mode = 'QUATERNION'
+        self._channels = channels
+        self._index = index
+        self._properties = {}
+
+    rotation_euler = _channel("rotation_euler")
+    location = _channel("location")
+    scale = _channel("scale")
+
+    def keys(self):
+        return self._properties.keys()
+
+    def __getitem__(self, key):
+        return self._properties[key]
+
+    def __setitem__(self, key, value):
+        self._properties[key] = value
+
+    def keyframe_insert(self, data_path, index=-1, frame=None):
+        ops.calls["keyframe_insert"] += 1
+        return True
+
+
+class KeyframePoints:
+    """Mimics FCurveKeyframePoints: add() allocates points at (0, 0), "co" is bulk accessible."""
+
+    def __init__(self):
+        self._co = np.zeros((0, 2), dtype=np.float32)
+
+    def __len__(self):
+        return len(self._co)
+
+    def add(self, count=1):
+        self._co = np.concatenate([self._co, np.zeros((count, 2), dtype=np.float32)])
+
+    def insert(self, frame, value, options=set()):
+        existing = np.flatnonzero(self._co[:, 0] == frame)
+        if len(existing):
+            self._co[existing[0], 1] = value
+        else:
+            self.add(1)
+            self._co[-1] = (frame, value)
+
+    def foreach_get(self, attribute, sequence):
+        sequence[:] = getattr(self, "_" + attribute).reshape(-1)
+
+    def foreach_set(self, attribute, sequence):
+        getattr(self, "_" + attribute).reshape(-1)[:] = sequence
+
+
+class FCurve:
+    def __init__(self, data_path, index=0, action_group=""):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = action_group
+        self.keyframe_points = KeyframePoints()
+
+    def update(self):
+        # Sorts keys by frame like Blender does
+        co = self.keyframe_points._co
+        self.keyframe_points._co = co[np.argsort(co[:, 0], kind="stable")]
+
+
+class _FCurves(list):
+    def new(self, data_path, index=0, action_group=""):
+        if self.find(data_path, index) is not None:
+            raise RuntimeError(f"F-Curve '{data_path}[{index}]' already exists in action")
+        fcurve = FCurve(data_path, index, action_group)
+        self.append(fcurve)
+        return fcurve
+
+    def find(self, data_path, index=0):
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+
+class Action:
+    id_type = 'ACTION'
+
+    def __init__(self, name):
+        self.name = name
+        self.fcurves = _FCurves()
+
+    def as_pointer(self):
+        return id(self)
+
+
+class _Actions(Collection):
+    def new(self, name):
+        action = Action(name)
+        self.link(action)
+        return action
+
+
+class ArmatureData:
+    id_type = 'ARMATURE'
+
+    def __init__(self, name, bones):
+        self.name = name
+        self.bones = bones
+
+    def as_pointer(self):
+        return id(self)
+
+
+class Object:
+    id_type = 'OBJECT'
+
+    def __init__(self, name, type='ARMATURE'):
+        self._name = name
+        self.type = type
+        self.users = 1
+        self.pose = None
+        self.data = None
+        self.animation_data = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        old_name = self._name
+        self._name = value
+        data.objects._rename(self, old_name)
+
+    def as_pointer(self):
+        return id(self)
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = types.SimpleNamespace(action=None)
+        return self.animation_data
+
+    def keys(self):
+        return []
+
+
+class _ObjectOps:
+    def mode_set(self, mode='OBJECT'):
+        ops.calls["mode_set"] += 1
+        return {'FINISHED'}
+
+
+class _ViewLayer:
+    def __init__(self):
+        self.objects = types.SimpleNamespace(active=None)
+
+    def update(self):
+        ops.calls["view_layer_update"] += 1
+
+
+class _Scene:
+    id_type = 'SCENE'
+
+    def __init__(self):
+        self.frame_current = 1
+        self.render = types.SimpleNamespace(fps=24, fps_base=1.0)
+        self.timeline_markers = types.SimpleNamespace(new=lambda name, frame=1: None)
+
+    def frame_set(self, frame):
+        ops.calls["frame_set"] += 1
+        self.frame_current = frame
+
+
+class _Timers:
+    """Registered functions are only stored; call run() to step them."""
+
+    def __init__(self):
+        self.registered = []
+
+    def register(self, function, first_interval=0.0, persistent=False):
+        self.registered.append(function)
+
+    def unregister(self, function):
+        self.registered.remove(function)
+
+    def is_registered(self, function):
+        return function in self.registered
+
+    def run(self):
+        """Calls every registered function once, dropping those that return None."""
+        for function in list(self.registered):
+            if function() is None and function in self.registered:
+                self.registered.remove(function)
+
+
+# Module level API, same names as bpy
+data = types.SimpleNamespace(objects=Collection(), actions=_Actions())
+ops = types.SimpleNamespace(object=_ObjectOps(),
+                            calls={"mode_set": 0, "keyframe_insert": 0, "frame_set": 0, "view_layer_update": 0})
+context = types.SimpleNamespace(view_layer=_ViewLayer(), scene=_Scene(), space_data=None)
+app = types.SimpleNamespace(timers=_Timers(),
+                            handlers=types.SimpleNamespace(depsgraph_update_post=[], load_post=[]))
+path = types.SimpleNamespace(abspath=lambda relative: os.path.join(os.getcwd(), relative.lstrip("/")))
+utils = types.SimpleNamespace(escape_identifier=lambda string: string.replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def install():
+    """Registers this module as bpy, so `import bpy` in the controller modules gets the fake."""
+    sys.modules["bpy"] = sys.modules[__name__]
+    return sys.modules[__name__]
+
+
+def reset():
+    """Removes every object and zeroes the operator call counters."""
+    data.objects = Collection()
+    data.actions = _Actions()
+    app.timers.registered.clear()
+    for name in ops.calls:
+        ops.calls[name] = 0
+
+
+def build_armature(name, bone_specs):
+    """
+    Creates an armature object from bone specs and adds it to data.objects.
+
+    bone_specs (list): dictionaries with "name", "parent" (name or None), and optionally "head", "tail",
+                       "constraints" (list of dictionaries with Constraint's fields) and "custom_properties".
+                       Parents must come before their children.
+    """
+    bone_count = len(bone_specs)
+    channels = {
+        "rotation_euler": np.zeros((bone_count, 3), dtype=np.float32),
+        "location": np.zeros((bone_count, 3), dtype=np.float32),
+        "scale": np.ones((bone_count, 3), dtype=np.float32)
+    }
+    bones = []
+    pose_bones = []
+    by_name = {}
+    for index, spec in enumerate(bone_specs):
+        parent = by_name.get(spec.get("parent"))
+        head = spec.get("head")
+        if head is None:
+            head = parent.bone.tail._values if parent is not None else (0.0, 0.0, 0.0)
+        tail = spec.get("tail")
+        if tail is None:
+            tail = np.asarray(head, dtype=np.float32) + _synthetic_direction(index)
+
+        bone = Bone(spec["name"], head, tail)
+        pose_bone = PoseBone(spec["name"], bone, channels, index)
+        if parent is not None:
+            bone.parent = parent.bone
+            parent.bone.children.append(bone)
+            pose_bone.parent = parent
+            parent.children.append(pose_bone)
+        for constraint in spec.get("constraints", ()):
+            pose_bone.constraints.append(Constraint(constraint.get("name", constraint["type"]), constraint["type"],
+                                                    constraint.get("influence", 1.0),
+                                                    constraint.get("subtarget", ""),
+                                                    constraint.get("chain_count", 0)))
+        for key, value in spec.get("custom_properties", {}).items():
+            pose_bone[key] = value
+
+        bones.append(bone)
+        pose_bones.append(pose_bone)
+        by_name[spec["name"]] = pose_bone
+
+    armature = Object(name, 'ARMATURE')
+    armature.data = ArmatureData(name, Collection(bones))
+    armature.pose = types.SimpleNamespace(bones=Collection(pose_bones, channels=channels))
+    data.objects.link(armature)
+    return armature
+
+
+def load_model_tree(json_path, name=None):
+    """Builds an armature from a model_tree.json export (see controller/model_tree.py)."""
+    with open(json_path, "r") as f:
+        exported = json.load(f)
+    return build_armature(name or exported["object_name"], exported["bones"])
+
+
+def make_synthetic_rig(name, bone_count, branching=3):
+    """
+    Builds a rig with bone_count bones in a tree where every bone has up to `branching` children.
+    Every 10th bone gets an IK constraint and every 7th copies the transforms of its parent.
+    """
+    specs = []
+    for index in range(bone_count):
+        parent = f"bone_{(index - 1) // branching:05d}" if index else None
+        constraints = []
+        if index and index % 10 == 0:
+            constraints.append({"name": "IK", "type": "IK", "chain_count": 2})
+        if index and index % 7 == 0:
+            constraints.append({"name": "Copy Transforms", "type": "COPY_TRANSFORMS", "subtarget": parent})
+        specs.append({"name": f"bone_{index:05d}", "parent": parent, "constraints": constraints,
+                      "custom_properties": {"follow": 1.0} if index % 5 == 0 else {}})
+    return build_armature(name, specs)
+
+
+def notify_depsgraph(*ids):
+    """Calls the depsgraph_update_post handlers as if the given IDs (objects, armature data, ...) were updated."""
+    depsgraph = types.SimpleNamespace(updates=[types.SimpleNamespace(id=id_data) for id_data in ids])
+    for handler in list(app.handlers.depsgraph_update_post):
+        handler(context.scene, depsgraph)
+
+
+def add_object(name, type='MESH'):
+    """Adds a non-armature object, such as a prop, to data.objects."""
+    obj = Object(name, type)
+    data.objects.link(obj)
+    return obj
+
+
+def _synthetic_direction(index):
+    # Deterministic, non-zero bone vectors between 0.05 and 0.3 long
+    angle = index * 2.399963  # golden angle
+    length = 0.05 + (index % 6) * 0.05
+    return np.array([np.cos(angle) * 0.3, np.sin(angle) * 0.3, 1.0], dtype=np.float32) * length
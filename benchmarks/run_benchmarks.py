@@ -0,0 +1,254 @@
+"""
+Headless benchmarks for the controller's hot paths, run against the fake bpy in fake_bpy.py.
+
+Covers controller.action, actuation smoothing, gyro sampling, starter.change_ryp, starter.reset, starter.transform_multiple_bones_in_pose_mode,
+capabilities_gen.generate_capabilities_json, model_tree.export_rig_hierarchy and rig_model.RigModel, on the
+ClassicMan_Rigify bones from controller/model_tree.json and on synthetic rigs.
+
+Requires numpy and the controller's requirements (feagi_connector, python-dotenv).
+
+Examples:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --bones 100 1000 10000 --bursts 500 --json bench_output.json
+    python benchmarks/run_benchmarks.py --baseline bench_output.json --tolerance 0.25
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+CONTROLLER_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "controller")
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, CONTROLLER_DIR)
+
+import fake_bpy  # noqa: E402
+
+fake_bpy.install()
+
+import starter  # noqa: E402
+import routing  # noqa: E402
+import gyro  # noqa: E402
+import actuation  # noqa: E402
+import capabilities_gen  # noqa: E402
+import capabilities_cache  # noqa: E402
+import model_tree  # noqa: E402
+import rig_model  # noqa: E402
+import controller  # noqa: E402
+
+
+def summarize(name, rig, samples, calls_per_sample=1):
+    """Latency percentiles (ms) per sample and calls per second."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "benchmark": name,
+        "rig": rig,
+        "samples": len(ordered),
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+        "calls_per_second": (len(ordered) * calls_per_sample) / total if total > 0 else float("inf")
+    }
+
+
+def measure(function, repeat):
+    """Runs function repeat times with stdout silenced and returns each run's duration in seconds."""
+    samples = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def setup_controller(work_dir):
+    """Generates capabilities for the scene and wires the controller globals the way controller.py's main does."""
+    capabilities_path = os.path.join(work_dir, "capabilities.json")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        armature_names = capabilities_gen.get_all_armature_names()
+        capabilities_gen.generate_capabilities_json(armature_names, capabilities_path)
+        with open(capabilities_path, "r") as f:
+            capabilities = json.load(f)["capabilities"]
+        controller.starter = starter
+        controller.model_list = starter.get_name_and_update_index(armature_names)
+        controller.routing_table = routing.build_routing_table(capabilities["output"]["servo"],
+                                                               controller.model_list)
+    return armature_names, capabilities
+
+
+def bench_rig(rig, armature, args, work_dir):
+    results = []
+    rng = random.Random(0)
+    armature_names, capabilities = setup_controller(work_dir)
+    servo_indexes = [int(key) for key in capabilities["output"]["servo"]]
+    bone_names = [bone.name for bone in armature.pose.bones]
+
+    # One burst that drives every servo of the scene
+    bursts = [{"servo": {index: rng.uniform(-1.0, 1.0) for index in servo_indexes}} for _ in range(8)]
+    burst_iter = iter(range(args.bursts))
+    results.append(summarize("controller.action", rig,
+                             measure(lambda: controller.action(bursts[next(burst_iter) % len(bursts)]),
+                                     args.bursts)))
+
+    results.append(summarize("routing.build_routing_table", rig,
+                             measure(lambda: routing.build_routing_table(capabilities["output"]["servo"],
+                                                                         controller.model_list), args.repeat)))
+    compiled = capabilities_cache.compile_cache(capabilities["output"]["servo"], controller.model_list, bytes(20))
+    results.append(summarize("routing.build_routing_table_from_arrays", rig,
+                             measure(lambda: routing.build_routing_table_from_arrays(
+                                 compiled.servo_indexes, compiled.servo_name_ids, compiled.names,
+                                 controller.model_list), args.repeat)))
+
+    # Every burst retargets every bone; each step moves them all a frame closer
+    actuator = actuation.SmoothedActuator(controller.routing_table, capabilities["output"]["servo"], frame_rate=60)
+    pose_commands = [{slot: [rng.uniform(-1.0, 1.0), None, rng.uniform(-1.0, 1.0)]
+                      for slot in range(len(controller.routing_table.bones))} for _ in range(8)]
+    step_iter = iter(range(args.bursts))
+
+    def actuation_step():
+        step = next(step_iter)
+        if step % 4 == 0:  # a burst every 4 frames
+            actuator.set_targets(pose_commands[step // 4 % len(pose_commands)])
+        actuator.step(1.0 / 60)
+
+    results.append(summarize("actuation.SmoothedActuator.step", rig, measure(actuation_step, args.bursts)))
+
+    sampler = gyro.GyroSampler(controller.model_list)
+    results.append(summarize("gyro.GyroSampler.sample", rig, measure(sampler.sample, args.bursts)))
+    results.append(summarize("gyro.gather_gyro_data", rig,
+                             measure(lambda: [gyro.gather_gyro_data(fake_bpy.data.objects[name],
+                                                                    controller.model_list[name][0])
+                                              for name in controller.model_list], args.bursts)))
+
+    calls = min(args.calls, len(bone_names))
+    targets = [(rng.choice(bone_names), (rng.uniform(-1, 1), None, rng.uniform(-1, 1))) for _ in range(calls)]
+    results.append(summarize("starter.change_ryp", rig,
+                             measure(lambda: [starter.change_ryp(armature.name, bone_name, ryp)
+                                              for bone_name, ryp in targets], args.repeat), calls))
+
+    def change_ryp_deferred():
+        for bone_name, ryp in targets:
+            starter.change_ryp(armature.name, bone_name, ryp, defer_update=True)
+        starter.update_view_layer()
+
+    results.append(summarize("starter.change_ryp (defer_update)", rig, measure(change_ryp_deferred, args.repeat),
+                             calls))
+    results.append(summarize("starter.reset", rig, measure(lambda: starter.reset(armature.name), args.repeat)))
+
+    bone_transforms = {bone_name: {"location": (0.0, 0.1, 0.0), "rotation": (0.1, 0.0, 0.2)}
+                       for bone_name in bone_names}
+    results.append(summarize("starter.transform_multiple_bones_in_pose_mode", rig,
+                             measure(lambda: starter.transform_multiple_bones_in_pose_mode(
+                                 armature.name, bone_transforms, frame=1, keyframe=True), args.repeat)))
+
+    clip = np.random.default_rng(0).uniform(-1.0, 1.0, (100, len(bone_names), 3)).astype(np.float32)
+    results.append(summarize("starter.bake_bone_channels (100 frames)", rig,
+                             measure(lambda: starter.bake_bone_channels(armature.name, bone_names, clip, 1),
+                                     args.repeat)))
+
+    capabilities_path = os.path.join(work_dir, "capabilities_bench.json")
+    results.append(summarize("capabilities_gen.generate_capabilities_json", rig,
+                             measure(lambda: capabilities_gen.generate_capabilities_json(armature_names,
+                                                                                         capabilities_path,
+                                                                                         incremental=False),
+                                     args.repeat)))
+    results.append(summarize("capabilities_gen.generate_capabilities_json (unchanged)", rig,
+                             measure(lambda: capabilities_gen.generate_capabilities_json(armature_names,
+                                                                                         capabilities_path),
+                                     args.repeat)))
+
+    model_tree_path = os.path.join(work_dir, "model_tree_bench.json")
+    results.append(summarize("model_tree.export_rig_hierarchy", rig,
+                             measure(lambda: model_tree.export_rig_hierarchy(armature.name, model_tree_path),
+                                     args.repeat)))
+    compact_path = model_tree_path + ".compact"
+    results.append(summarize("model_tree.export_rig_hierarchy (compact)", rig,
+                             measure(lambda: model_tree.export_rig_hierarchy(armature.name, compact_path, compact=True),
+                                     args.repeat)))
+    results.append(summarize("model_tree.export_rig_changes (unchanged)", rig,
+                             measure(lambda: model_tree.export_rig_changes(armature.name, model_tree_path + ".changes",
+                                                                           model_tree_path), args.repeat)))
+    results.append(summarize("rig_model.RigModel.load + diff", rig,
+                             measure(lambda: rig_model.RigModel.load(model_tree_path).diff(
+                                 rig_model.RigModel.load(model_tree_path)), args.repeat)))
+    return results
+
+
+def scenes(args):
+    """Yields (label, armature) with the fake scene holding only that armature."""
+    fake_bpy.reset()
+    yield "ClassicMan_Rigify", fake_bpy.load_model_tree(os.path.join(CONTROLLER_DIR, "model_tree.json"))
+    for bone_count in args.bones:
+        fake_bpy.reset()
+        yield f"synthetic_{bone_count}", fake_bpy.make_synthetic_rig(f"Synthetic_{bone_count}", bone_count)
+
+
+def print_table(results):
+    header = f"{'benchmark':<56} {'rig':<20} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'calls/s':>12}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(f"{result['benchmark']:<56} {result['rig']:<20} {result['p50_ms']:>9.3f} {result['p90_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result['max_ms']:>9.3f} {result['calls_per_second']:>12.1f}")
+
+
+def compare_to_baseline(results, baseline_path, tolerance):
+    """Returns the results whose p50 got slower than the baseline by more than tolerance (a fraction)."""
+    with open(baseline_path, "r") as f:
+        baseline = {(entry["benchmark"], entry["rig"]): entry for entry in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["benchmark"], result["rig"]))
+        if previous and result["p50_ms"] > previous["p50_ms"] * (1 + tolerance):
+            regressions.append((result, previous))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the controller's hot paths with a fake bpy.")
+    parser.add_argument("--bones", type=int, nargs="*", default=[100, 1000, 10000],
+                        help="Bone counts of the synthetic rigs.")
+    parser.add_argument("--bursts", type=int, default=200, help="Bursts per action/gyro benchmark.")
+    parser.add_argument("--calls", type=int, default=200, help="change_ryp calls per sample.")
+    parser.add_argument("--repeat", type=int, default=10, help="Samples for the slower benchmarks.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="JSON results to compare against. Exits with 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p50 slowdown against the baseline, as a fraction.")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rig, armature in scenes(args):
+            results.extend(bench_rig(rig, armature, args, work_dir))
+
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=4)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        for result, previous in regressions:
+            print(f"REGRESSION {result['benchmark']} on {result['rig']}: "
+                  f"p50 {previous['p50_ms']:.3f} ms -> {result['p50_ms']:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import time
+
+import bpy
+import numpy as np
+
+import registry
+import starter
+from log_utils import get_logger
+
+logger = get_logger("actuation")
+
+
+class SmoothedActuator:
+    """
+    Moves the routed bones toward FEAGI's latest pose at Blender's frame rate instead of snapping per burst.
+
+    FEAGI bursts only set targets. step() then advances every bone at once, on (bones, 3) arrays:
+      - critically damped smoothing toward the target (smoothing_time seconds to close most of the gap),
+        or a straight move when smoothing_time is 0;
+      - then a rate limit of max_power (servo capabilities, radians per frame tick) on every axis.
+    Only bones that are still moving are written back, with one foreach_set() per armature.
+
+    Rows follow the routing table's bone slots, so rebind after the routing table is rebuilt.
+
+    Attributes:
+        target (numpy.ndarray): float64 (bones, 3), the newest FEAGI value per axis, NaN if never driven.
+        current (numpy.ndarray): float64 (bones, 3), the rotation last written (or read at bind time).
+        velocity (numpy.ndarray): float64 (bones, 3), radians per second, for the smoothing.
+        max_step (numpy.ndarray): float64 (bones, 3), max_power of each axis, inf when it has none.
+    """
+
+    def __init__(self, routing_table, servo_capabilities, smoothing_time=0.1, frame_rate=None,
+                 settle_epsilon=1e-4, max_dt=0.25, clock=time.perf_counter, armature_registry=None):
+        """
+        Parameters:
+            routing_table (routing.RoutingTable): Where each FEAGI index goes.
+            servo_capabilities (dict): capabilities['output']['servo'], for max_power.
+            smoothing_time (float): Seconds of critically damped smoothing. 0 moves straight at max_power.
+            frame_rate (float): Ticks per second. Defaults to the scene's fps.
+            settle_epsilon (float): Radians below which a bone snaps to its target and stops being written.
+            max_dt (float): Longest step, so a stall in Blender doesn't turn into a jump.
+            armature_registry (registry.ArmatureRegistry): Where the bones' pose.bones indexes are looked up.
+                                                           Defaults to the shared one.
+        """
+        self.servo_capabilities = servo_capabilities
+        self.smoothing_time = smoothing_time
+        self.frame_rate = frame_rate
+        self.settle_epsilon = settle_epsilon
+        self.max_dt = max_dt
+        self.clock = clock
+        self.armature_registry = armature_registry if armature_registry is not None else registry.default_registry
+        self.last_step = None
+        self.stats = {"steps": 0, "bones_written": 0, "rate_limited": 0, "stale_commands": 0}
+        self.bind(routing_table)
+
+    def bind(self, routing_table):
+        """Rebuilds the arrays for routing_table's bone slots, starting from the bones' current rotations."""
+        self.routing_table = routing_table
+        bone_count = len(routing_table.bones)
+        self.current = np.array([tuple(bone.rotation_euler) for bone in routing_table.bones],
+                                dtype=np.float64).reshape(bone_count, 3)
+        self.target = np.full((bone_count, 3), np.nan)
+        self.velocity = np.zeros((bone_count, 3))
+        self.max_step = np.full((bone_count, 3), np.inf)
+        for feagi_index, route in routing_table.routes.items():
+            servo_data = self.servo_capabilities.get(str(feagi_index))
+            max_power = servo_data.get("max_power") if servo_data else None
+            if max_power:
+                self.max_step[route[3], route[2]] = abs(max_power)
+        self.moving = np.zeros(bone_count, dtype=bool)
+
+        # armature object -> (bone slots, their pose.bones indexes), for write_pose_channel()
+        groups = {}
+        for slot, (armature_obj, bone) in enumerate(zip(routing_table.armatures, routing_table.bones)):
+            if bone.rotation_mode != 'XYZ':
+                bone.rotation_mode = 'XYZ'  # the written channel is rotation_euler
+            armature_slot = self.armature_registry.slot(armature_obj.name)
+            pose_row = self.armature_registry.bone_index(armature_slot, bone.name) if armature_slot is not None else None
+            if pose_row is None:
+                logger.warning("Bone '%s' of '%s' isn't registered, it won't be actuated", bone.name,
+                               armature_obj.name)
+                continue
+            _, slots, pose_rows = groups.setdefault(armature_obj.name, (armature_obj, [], []))
+            slots.append(slot)
+            pose_rows.append(pose_row)
+        self.armature_groups = [(armature_obj, np.array(slots, dtype=np.intp), np.array(pose_rows, dtype=np.intp))
+                                for armature_obj, slots, pose_rows in groups.values()]
+        logger.debug("Actuator bound to %d bones", bone_count)
+
+    def set_targets(self, bone_rotations):
+        """
+        Takes a pose command from controller.decode_pose_command(): bone_slot -> [x, y, z], None for axes
+        FEAGI didn't send. Nothing is written until the next step().
+
+        A command stamped with another routing table than the bound one (it was decoded before a rebuild)
+        is dropped, since its slots may name other bones. Returns False if it was dropped.
+        """
+        if not bone_rotations:
+            return True
+        if getattr(bone_rotations, "routing_table", self.routing_table) is not self.routing_table:
+            self.stats["stale_commands"] += 1
+            return False
+        slots = np.fromiter(bone_rotations.keys(), dtype=np.intp, count=len(bone_rotations))
+        values = np.array(list(bone_rotations.values()), dtype=np.float64)  # None -> NaN
+        in_range = (slots >= 0) & (slots < len(self.target))
+        if not in_range.all():
+            slots = slots[in_range]
+            values = values[in_range]
+        self.target[slots] = np.where(np.isnan(values), self.target[slots], values)
+        self.moving[slots] = True
+        return True
+
+    def frame_interval(self):
+        """Seconds per tick: 1 / frame_rate, or the scene's fps."""
+        if self.frame_rate:
+            return 1.0 / self.frame_rate
+        render = bpy.context.scene.render
+        return render.fps_base / render.fps
+
+    def step(self, dt=None):
+        """
+        Advances every moving bone by dt seconds (time since the last step by default) and writes them.
+
+        Returns:
+            int: Number of bones written.
+        """
+        now = self.clock()
+        if dt is None:
+            dt = now - self.last_step if self.last_step is not None else self.frame_interval()
+        self.last_step = now
+        dt = min(max(dt, 0.0), self.max_dt)
+        self.stats["steps"] += 1
+
+        rows = np.flatnonzero(self.moving)
+        if not len(rows) or dt == 0.0:
+            return 0
+        current = self.current[rows]
+        target = self.target[rows]
+        driven = ~np.isnan(target)
+        target = np.where(driven, target, current)
+        velocity = self.velocity[rows]
+
+        if self.smoothing_time > 0:
+            # Critically damped spring, closed form (Game Programming Gems 4, 1.10), stable for any dt
+            omega = 2.0 / self.smoothing_time
+            x = omega * dt
+            decay = 1.0 / (1.0 + x + 0.48 * x * x + 0.235 * x * x * x)
+            change = current - target
+            temp = (velocity + omega * change) * dt
+            velocity = (velocity - omega * temp) * decay
+            moved = target + (change + temp) * decay
+        else:
+            moved = target
+
+        # max_power is per frame tick; scale it by how many ticks dt covers so timer jitter doesn't change speed
+        limit = self.max_step[rows] * (dt / self.frame_interval())
+        delta = moved - current
+        clipped = np.clip(delta, -limit, limit)
+        limited = clipped != delta
+        if limited.any():
+            self.stats["rate_limited"] += int(np.count_nonzero(limited.any(axis=1)))
+        if self.smoothing_time > 0:
+            velocity = np.where(limited, clipped / dt, velocity)
+        else:
+            velocity = clipped / dt
+        moved = current + clipped
+
+        settled = np.abs(target - moved) < self.settle_epsilon
+        settled &= np.abs(velocity) * dt < self.settle_epsilon
+        moved = np.where(settled, target, moved)
+        velocity = np.where(settled, 0.0, velocity)
+
+        self.current[rows] = moved
+        self.velocity[rows] = velocity
+        self.moving[rows] = ~settled.all(axis=1)
+
+        # Axes FEAGI never drove are NaN, which write_pose_channel() leaves as they are on the bone
+        values = np.full_like(self.current, np.nan)
+        values[rows] = np.where(driven, moved, np.nan)
+        written_slots = np.zeros(len(values), dtype=bool)
+        written_slots[rows] = True
+        written = 0
+        for armature_obj, slots, pose_rows in self.armature_groups:
+            selected = written_slots[slots]
+            if selected.any():
+                starter.write_pose_channel(armature_obj, "rotation_euler", pose_rows[selected],
+                                           values[slots[selected]])
+                written += int(np.count_nonzero(selected))
+        self.stats["bones_written"] += written
+        return written
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from log_utils import get_logger
+
+logger = get_logger("capabilities_cache")
+
+CACHE_MAGIC = b"FGCC"
+CACHE_VERSION = 1
+
+# magic, version, sha1 of the sources, servo count, name count, name blob size, armature count,
+# armature name blob size
+_HEADER = struct.Struct("<4sI20sIIIII")
+
+
+class CapabilitiesCache:
+    """
+    What the controller derives from capabilities.json at startup, as packed arrays.
+
+    The cache file is memory-mapped, so opening it costs a header read. Arrays are views into the mapping;
+    names are decoded only when asked for.
+
+    Attributes:
+        digest (bytes): sha1 of the capabilities.json (and manifest) the cache was compiled from.
+        servo_indexes (numpy.ndarray): int32, every servo FEAGI index, ascending.
+        servo_name_ids (numpy.ndarray): int32, servo row -> row in names.
+        armature_ranges (numpy.ndarray): int32 (armatures, 2), [first, last] servo index of each armature.
+    """
+
+    def __init__(self, digest, servo_indexes, servo_name_ids, name_offsets, name_blob,
+                 armature_ranges, armature_name_offsets, armature_name_blob, buffer=None):
+        self.digest = digest
+        self.servo_indexes = servo_indexes
+        self.servo_name_ids = servo_name_ids
+        self.armature_ranges = armature_ranges
+        self._name_offsets = name_offsets
+        self._name_blob = name_blob
+        self._armature_name_offsets = armature_name_offsets
+        self._armature_name_blob = armature_name_blob
+        self._names = None
+        self._buffer = buffer  # keeps the mapping open while the arrays are in use
+
+    def __len__(self):
+        return len(self.servo_indexes)
+
+    @property
+    def names(self):
+        """Distinct servo custom_names, in first-seen order."""
+        if self._names is None:
+            self._names = _decode_names(self._name_offsets, self._name_blob)
+        return self._names
+
+    def servo_names(self):
+        """Yields (feagi_index, custom_name) for every servo, for routing.build_routing_table_from_names()."""
+        names = self.names
+        return zip(self.servo_indexes.tolist(), [names[name_id] for name_id in self.servo_name_ids.tolist()])
+
+    def map_translation(self):
+        """FEAGI servo index -> custom_name."""
+        return dict(self.servo_names())
+
+    def model_list(self):
+        """armature name -> [first servo index, last servo index], or None if the cache has no layout."""
+        if not len(self.armature_ranges):
+            return None
+        armature_names = _decode_names(self._armature_name_offsets, self._armature_name_blob)
+        return {armature_name: [int(first), int(last)]
+                for armature_name, (first, last) in zip(armature_names, self.armature_ranges.tolist())}
+
+    def close(self):
+        if self._buffer is not None:
+            self.servo_indexes = self.servo_name_ids = self.armature_ranges = None
+            self._name_offsets = self._armature_name_offsets = None
+            self._name_blob = self._armature_name_blob = None
+            self._buffer.close()
+            self._buffer = None
+
+
+def cache_path_for(json_path):
+    """capabilities.json -> capabilities.cache, next to it."""
+    return os.path.splitext(json_path)[0] + ".cache"
+
+
+def source_digest(json_path, manifest_path=None):
+    """sha1 over capabilities.json and, if it exists, the capabilities_gen manifest."""
+    digest = hashlib.sha1()
+    for path in (json_path, manifest_path):
+        if path is None or not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.digest()
+
+
+def compile_cache(servo_capabilities, model_list, digest):
+    """
+    Packs servo indexes, their custom_names and the armature ranges into an in-memory CapabilitiesCache.
+
+    Parameters:
+        servo_capabilities (dict): capabilities['output']['servo']
+        model_list (dict): armature name -> [first servo index, last servo index], or None
+        digest (bytes): source_digest() of the files these came from.
+    """
+    rows = sorted((int(key), servo_data.get("custom_name") or "") for key, servo_data in servo_capabilities.items())
+    name_ids = {}
+    for _, custom_name in rows:
+        name_ids.setdefault(custom_name, len(name_ids))
+    name_offsets, name_blob = _encode_names(list(name_ids))
+    armature_names = list(model_list or {})
+    armature_ranges = np.array([model_list[armature_name] for armature_name in armature_names],
+                               dtype=np.int32).reshape(-1, 2)
+    armature_name_offsets, armature_name_blob = _encode_names(armature_names)
+    return CapabilitiesCache(digest,
+                             np.array([feagi_index for feagi_index, _ in rows], dtype=np.int32),
+                             np.array([name_ids[custom_name] for _, custom_name in rows], dtype=np.int32),
+                             name_offsets, name_blob, armature_ranges, armature_name_offsets, armature_name_blob)
+
+
+def write_cache(cache, cache_path):
+    """Writes the cache to a temporary file and moves it into place."""
+    header = _HEADER.pack(CACHE_MAGIC, CACHE_VERSION, cache.digest, len(cache.servo_indexes), len(cache.names),
+                          len(cache._name_blob), len(cache.armature_ranges), len(cache._armature_name_blob))
+    temporary_path = cache_path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        for section in (cache.servo_indexes, cache.servo_name_ids, cache._name_offsets,
+                        _padded(cache._name_blob), cache.armature_ranges, cache._armature_name_offsets,
+                        _padded(cache._armature_name_blob)):
+            f.write(np.ascontiguousarray(section).tobytes() if isinstance(section, np.ndarray) else section)
+    os.replace(temporary_path, cache_path)
+
+
+def read_cache(cache_path):
+    """Memory-maps a cache file. Returns None if it is missing, truncated or from another version."""
+    try:
+        with open(cache_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # ValueError: empty file
+        return None
+    try:
+        magic, version, digest, servo_count, name_count, name_blob_size, armature_count, armature_blob_size = \
+            _HEADER.unpack_from(buffer, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            buffer.close()
+            return None
+        offset = _HEADER.size
+        sections = []
+        for dtype, count in ((np.int32, servo_count), (np.int32, servo_count), (np.int32, name_count + 1),
+                             (np.uint8, _aligned(name_blob_size)), (np.int32, armature_count * 2),
+                             (np.int32, armature_count + 1), (np.uint8, _aligned(armature_blob_size))):
+            sections.append(np.frombuffer(buffer, dtype=dtype, count=count, offset=offset))
+            offset += sections[-1].nbytes
+    except (struct.error, ValueError):
+        buffer.close()
+        return None
+    servo_indexes, servo_name_ids, name_offsets, name_blob, armature_ranges, armature_name_offsets, \
+        armature_name_blob = sections
+    return CapabilitiesCache(digest, servo_indexes, servo_name_ids, name_offsets, name_blob[:name_blob_size],
+                             armature_ranges.reshape(-1, 2), armature_name_offsets,
+                             armature_name_blob[:armature_blob_size], buffer=buffer)
+
+
+def load_or_build(json_path, servo_capabilities=None, model_list=None, cache_path=None):
+    """
+    Returns the cache for json_path, compiling and writing it first if the JSON (or manifest) changed.
+
+    Parameters:
+        json_path (str): capabilities.json
+        servo_capabilities (dict): capabilities['output']['servo'] if it was already parsed. Only used when
+                                   the cache is rebuilt; read from json_path if None.
+        model_list (dict or callable): Armature ranges to store, or a function returning them. Only used
+                                       when the cache is rebuilt.
+        cache_path (str): Where the cache lives. Defaults to cache_path_for(json_path).
+    """
+    cache_path = cache_path or cache_path_for(json_path)
+    manifest_path = os.path.splitext(json_path)[0] + ".manifest.json"
+    digest = source_digest(json_path, manifest_path)
+
+    cache = read_cache(cache_path)
+    if cache is not None and cache.digest == digest:
+        logger.info("Capabilities cache hit: %d servos, %d armatures", len(cache), len(cache.armature_ranges))
+        return cache
+    if cache is not None:
+        cache.close()
+
+    if servo_capabilities is None:
+        with open(json_path, "r") as f:
+            servo_capabilities = json.load(f)["capabilities"]["output"]["servo"]
+    if callable(model_list):
+        model_list = model_list()
+    cache = compile_cache(servo_capabilities, model_list, digest)
+    try:
+        write_cache(cache, cache_path)
+        logger.info("Capabilities cache rebuilt: %s", cache_path)
+    except OSError as error:  # e.g. read-only folder, or the old file still mapped on Windows
+        logger.warning("Could not write capabilities cache %s: %s", cache_path, error)
+    return cache
+
+
+def _encode_names(names):
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum([len(name) for name in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def _decode_names(offsets, blob):
+    blob = bytes(blob)
+    offsets = offsets.tolist()
+    return [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+
+def _aligned(size):
+    return (size + 3) & ~3
+
+
+def _padded(blob):
+    return bytes(blob) + b"\0" * (_aligned(len(blob)) - len(blob))
@@ -2,6 +2,11 @@ import bpy
 import json
 import os 
 import math
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger("blender_connector.capabilities_gen")
 
 def compute_bone_length(bone):
     """
@@ -52,26 +57,86 @@ def compute_servo_range(bone):
         
     return {"max_value": dynamic_range, "min_value": -dynamic_range} 
 
-def get_all_armature_names():
-    """stores all armature names in list removing duplicates (not yet)"""
-    armature_names = []
-    metarig_names = []
+def read_bone_geometry(armature):
+    """
+    Reads the head and tail of every bone with one bulk foreach_get each, instead of per-bone RNA access.
+
+    Parameters:
+        armature: A Blender armature object.
+
+    Returns:
+        tuple: (bone names in pose.bones order, heads, tails). heads and tails are (bones, 3) float32 arrays
+               in the same order as the names.
+    """
+    bone_names = armature.pose.bones.keys()
+    bones = armature.data.bones
+    heads = np.empty(len(bones) * 3, dtype=np.float32)
+    tails = np.empty(len(bones) * 3, dtype=np.float32)
+    bones.foreach_get("head", heads)
+    bones.foreach_get("tail", tails)
+    heads = heads.reshape(-1, 3)
+    tails = tails.reshape(-1, 3)
+
+    data_bone_names = bones.keys()
+    if data_bone_names != bone_names:  # armature bones can be ordered differently than pose bones
+        rows = {bone_name: row for row, bone_name in enumerate(data_bone_names)}
+        order = [rows[bone_name] for bone_name in bone_names]
+        heads = heads[order]
+        tails = tails[order]
+    return bone_names, heads, tails
+
+def compute_bone_lengths(heads, tails):
+    """Array version of compute_bone_length(), for (bones, 3) head and tail arrays."""
+    delta = tails.astype(np.float64) - heads
+    dx, dy, dz = delta[:, 0], delta[:, 1], delta[:, 2]
+    return np.sqrt(dx*dx + dy*dy + dz*dz)
+
+def compute_ranges(lengths):
+    """
+    Array version of compute_gyro_range() and compute_servo_range(), which use the same formula.
+
+    Returns:
+        numpy.ndarray: The dynamic range of each bone. max_value is the range, min_value its negative.
+    """
+    k = 0.5  # Same constant as compute_gyro_range() and compute_servo_range().
+    too_short = lengths < 1e-6
+    return np.where(too_short, k, k / np.where(too_short, 1.0, lengths))
+
+RIGIFY_SUFFIX = "_Rigify"
+
+# Last discovery result, keyed on the names in bpy.data.objects
+_armature_names_cache = {"key": None, "armature_names": []}
+
+def get_all_armature_names(use_cache=True):
+    """
+    Returns the names of all armatures in the file, sorted, without the metarigs of generated Rigify rigs.
+
+    A rig called "<name>_Rigify" hides the armature "<name>" (its metarig). The scan is one pass
+    with set lookups, and the result is reused until an object is added, removed or renamed.
+
+    Parameters:
+        use_cache (bool): False scans bpy.data.objects even if the object set didn't change.
+
+    Returns:
+        list: Armature names.
+    """
+    objects = bpy.data.objects
+    key = tuple(objects.keys())  # an object's type can't change, so its name is enough
+    if use_cache and key == _armature_names_cache["key"]:
+        return list(_armature_names_cache["armature_names"])
 
-    for obj in bpy.data.objects:
+    armature_names = set()
+    metarig_names = set()
+    for obj in objects:
         if obj.type == 'ARMATURE':
-            if "_Rigify" in obj.name:                       # check if armature is Rigify
-                
-                rig_idx = obj.name.index("_Rigify")         # get index of _Rigify postfix
-                metarig_name = obj.name[0:rig_idx]          # get metarig substring
-                metarig_names.append(metarig_name)          # add metarig name to metarig list
-                armature_names.append(obj.name)             # add rigify name to armature list
-            else:
-                armature_names.append(obj.name)
-        
-        for metarig in metarig_names:                       # iterate through list of metarig names
-            if metarig in armature_names:                   # remove if in armature list
-                armature_names.remove(metarig)
-    return armature_names
+            armature_names.add(obj.name)
+            if RIGIFY_SUFFIX in obj.name:                   # check if armature is Rigify
+                metarig_names.add(obj.name[:obj.name.index(RIGIFY_SUFFIX)])
+
+    result = sorted(armature_names - metarig_names)
+    _armature_names_cache["key"] = key
+    _armature_names_cache["armature_names"] = result
+    return list(result)
 
 def check_capabilities_ranges(gyro_caps, servo_caps):
     mismatch_found = False
@@ -84,18 +149,189 @@ def check_capabilities_ranges(gyro_caps, servo_caps):
             servo_min_list = [servo_entry["min_value"]] * len(gyro_caps[gyro_key]["min_value"])
             if (gyro_caps[gyro_key]["max_value"] != servo_max_list or
                 gyro_caps[gyro_key]["min_value"] != servo_min_list):
-                print(f"Warning: Mismatch for bone '{gyro_caps[gyro_key]['custom_name']}' (gyro key {gyro_key}):")
-                print(f"  Gyro: max {gyro_caps[gyro_key]['max_value']}, min {gyro_caps[gyro_key]['min_value']}")
-                print(f"  Servo: max {servo_max_list}, min {servo_min_list}")
+                logger.warning("Mismatch for bone '%s' (gyro key %s):\n  Gyro: max %s, min %s\n  Servo: max %s, min %s",
+                               gyro_caps[gyro_key]['custom_name'], gyro_key, gyro_caps[gyro_key]['max_value'],
+                               gyro_caps[gyro_key]['min_value'], servo_max_list, servo_min_list)
                 mismatch_found = True
         else:
-            print(f"Warning: Servo entry for bone index {bone_index} not found.")
+            logger.warning("Servo entry for bone index %d not found.", bone_index)
             mismatch_found = True
 
     if not mismatch_found:
-        print("all values match.")
+        logger.info("all values match.")
+
+MANIFEST_VERSION = 1
+
+def manifest_path_for(output_path):
+    """capabilities.json -> capabilities.manifest.json, next to it."""
+    return os.path.splitext(output_path)[0] + ".manifest.json"
+
+def fingerprint_armature(armature, geometry=None):
+    """
+    Hashes what the generated entries depend on: bone order, names, parents and head/tail positions.
+    Pose changes don't alter it, so moving a character doesn't trigger a regeneration.
+
+    Parameters:
+        armature: A Blender armature object.
+        geometry (tuple): read_bone_geometry(armature), if it was already read.
+
+    Returns:
+        str: A hex digest.
+    """
+    bone_names, heads, tails = geometry if geometry is not None else read_bone_geometry(armature)
+    digest = hashlib.sha1()
+    for bone_name, bone in zip(bone_names, armature.pose.bones):
+        digest.update(bone_name.encode("utf-8"))
+        digest.update(b"\0")
+        if bone.parent is not None:
+            digest.update(bone.parent.name.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(np.ascontiguousarray(heads, dtype="<f4").tobytes())
+    digest.update(np.ascontiguousarray(tails, dtype="<f4").tobytes())
+    return digest.hexdigest()
+
+def load_manifest(output_path):
+    """Returns the manifest written with output_path, or None if it is missing, unreadable or outdated."""
+    try:
+        with open(manifest_path_for(output_path), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def load_layout(output_path):
+    """
+    Reads the servo index range of every armature from the manifest written with output_path.
+
+    Returns:
+        dict: armature name -> [first servo index, last servo index], or None without a manifest.
+    """
+    manifest = load_manifest(output_path)
+    if manifest is None:
+        return None
+    return {armature_name: [entry["start"] * 3, (entry["start"] + entry["bone_count"]) * 3 - 1]
+            for armature_name, entry in manifest["armatures"].items()}
+
+def generate_armature_entries(armature, start, geometry=None):
+    """
+    Creates the gyro and servo entries of one armature whose first bone gets index `start`.
+
+    Bone lengths and ranges are computed for the whole armature at once from read_bone_geometry(),
+    so the loop below only builds dictionaries.
 
-def generate_capabilities_json(armature_names, output_path):
+    Parameters:
+        armature: A Blender armature object.
+        start (int): Index of the armature's first bone.
+        geometry (tuple): read_bone_geometry(armature), if it was already read.
+
+    Returns:
+        tuple: (gyro_capabilities, servo_capabilities)
+    """
+    bone_names, heads, tails = geometry if geometry is not None else read_bone_geometry(armature)
+    dynamic_ranges = compute_ranges(compute_bone_lengths(heads, tails)).tolist()
+
+    gyro_capabilities = {}
+    servo_capabilities = {}
+
+    # For each bone, create three servo entries and one gyro entry.
+    for bone_index, (bone_name, dynamic_range) in enumerate(zip(bone_names, dynamic_ranges)):
+        cont_index = start + bone_index
+        for axis in range(3):
+            final_index = cont_index * 3 + axis
+
+            # Create the output servo capability for this axis of the bone.
+            servo_capabilities[str(final_index)] = {
+                "custom_name": bone_name,  # same name for each axis.
+                "default_value": 0,
+                "disabled": False,
+                "feagi_index": final_index,
+                "max_power": 0.05,
+                "max_value": dynamic_range,
+                "min_value": -dynamic_range
+            }
+
+        # Temp workaround, TODO: Fix Feagi connector on gyro overlapping
+        # Create the input gyro capability for the bone, same range on every axis.
+        gyro_capabilities[str(bone_index)] = {
+            "custom_name": bone_name,
+            "disabled": False,
+            "feagi_index": bone_index * 3,
+            "max_value": [dynamic_range, dynamic_range, dynamic_range],
+            "min_value": [-dynamic_range, -dynamic_range, -dynamic_range]
+        }
+
+    return gyro_capabilities, servo_capabilities
+
+def reuse_armature_entries(servo_caps, start, bone_count):
+    """
+    Takes an unchanged armature's entries from a previous capabilities.json instead of reading its bones again.
+    Gyro entries carry the same range as the bone's first servo entry, so they are rebuilt from it.
+
+    Returns:
+        tuple: (gyro_capabilities, servo_capabilities), or None if an entry is missing.
+    """
+    gyro_capabilities = {}
+    servo_capabilities = {}
+    for bone_index in range(bone_count):
+        for axis in range(3):
+            key = str((start + bone_index) * 3 + axis)
+            if key not in servo_caps:
+                return None
+            servo_capabilities[key] = servo_caps[key]
+        first_servo = servo_capabilities[str((start + bone_index) * 3)]
+        gyro_capabilities[str(bone_index)] = {
+            "custom_name": first_servo["custom_name"],
+            "disabled": False,
+            "feagi_index": bone_index * 3,
+            "max_value": [first_servo["max_value"]] * 3,
+            "min_value": [first_servo["min_value"]] * 3
+        }
+    return gyro_capabilities, servo_capabilities
+
+def plan_layout(armature_names, bone_counts, fingerprints, previous):
+    """
+    Decides where each armature's bones start.
+
+    Armatures keep their previous start as long as their bones still fit in the range they had,
+    so servo indices of untouched characters never move. Grown or new armatures go after the last
+    index any armature ever used. The ranges of removed armatures are kept as "retired" entries,
+    so they stay reserved, and an armature that comes back gets its old range again if it still fits.
+    Without a previous manifest the layout is contiguous in armature_names order.
+
+    Returns:
+        tuple: (layout, changed, retired) - layout maps name -> {"start", "bone_count", "reserved", "fingerprint"},
+               changed is the set of names whose entries must be regenerated and retired maps the names of
+               previous armatures missing from armature_names to their last entry.
+    """
+    previous_armatures = {}
+    if previous:
+        previous_armatures.update(previous.get("retired", {}))
+        previous_armatures.update(previous["armatures"])
+    layout = {}
+    changed = set()
+    for armature_name in armature_names:
+        entry = previous_armatures.get(armature_name)
+        if entry is not None and bone_counts[armature_name] <= entry["reserved"]:
+            layout[armature_name] = {"start": entry["start"], "bone_count": bone_counts[armature_name],
+                                     "reserved": entry["reserved"], "fingerprint": fingerprints[armature_name]}
+            if entry["fingerprint"] != fingerprints[armature_name]:
+                changed.add(armature_name)
+    retired = {armature_name: entry for armature_name, entry in previous_armatures.items()
+               if armature_name not in armature_names}
+    next_start = max((entry["start"] + entry["reserved"]
+                      for entry in list(previous_armatures.values()) + list(layout.values())), default=0)
+    for armature_name in armature_names:
+        if armature_name not in layout:
+            layout[armature_name] = {"start": next_start, "bone_count": bone_counts[armature_name],
+                                     "reserved": bone_counts[armature_name],
+                                     "fingerprint": fingerprints[armature_name]}
+            next_start += bone_counts[armature_name]
+            changed.add(armature_name)
+    return {armature_name: layout[armature_name] for armature_name in armature_names}, changed, retired
+
+def generate_capabilities_json(armature_names, output_path, compact=False, incremental=True):
     """
     Generates a capabilities.json file for the given armatures.
 
@@ -106,11 +342,48 @@ def generate_capabilities_json(armature_names, output_path):
     The indexing is such that for bone 0, the entries are at indices 0, 1, and 2;
     for bone 1, at 3, 4, and 5; and so on.
 
+    A manifest (see manifest_path_for()) is written next to the file with a fingerprint and the index
+    range of every armature. With incremental=True, only armatures whose fingerprint changed are read
+    again, the others keep their entries and indices, and nothing is written if no armature changed.
+
     Parameters:
         armature_name (str[]): Names of the armature objects in Blender.
         output_path (str): File path where the JSON file will be written.
+        compact (bool): Write the JSON without indentation or spaces. Much smaller for big rigs.
+        incremental (bool): Reuse the previous output where possible. False always regenerates everything.
+
+    Returns:
+        bool: True if the file was written, False if it was up to date or an armature was missing.
     """
-    cont_index = 0  # track indices over all armatures 
+    armatures = {}
+    geometries = {}
+    bone_counts = {}
+    fingerprints = {}
+    for armature_name in armature_names:
+        armature = bpy.data.objects.get(armature_name)
+        logger.info("Current armature: %s", armature_name)
+        if not armature or armature.type != 'ARMATURE':
+            logger.warning("Armature '%s' not found or is not an armature", armature_name)
+            return False
+        armatures[armature_name] = armature
+        geometries[armature_name] = read_bone_geometry(armature)
+        bone_counts[armature_name] = len(geometries[armature_name][0])
+        fingerprints[armature_name] = fingerprint_armature(armature, geometries[armature_name])
+
+    previous = load_manifest(output_path) if incremental and os.path.exists(output_path) else None
+    layout, changed, retired = plan_layout(armature_names, bone_counts, fingerprints, previous)
+    if previous is not None and not changed and previous.get("compact") == compact and \
+            list(previous["armatures"]) == list(armature_names):
+        logger.info("capabilities unchanged, %s not rewritten", output_path)
+        return False
+
+    previous_servo = {}
+    if previous is not None and len(changed) < len(armature_names):
+        try:
+            with open(output_path, "r") as f:
+                previous_servo = json.load(f)["capabilities"]["output"]["servo"]
+        except (OSError, ValueError, KeyError):
+            changed = set(armature_names)
 
     capabilities = {
             "capabilities": {
@@ -124,49 +397,16 @@ def generate_capabilities_json(armature_names, output_path):
         }
 
     for armature_name in armature_names:
-        armature = bpy.data.objects.get(armature_name)
-        print(f"Current armature:{armature_name}")
-        if not armature or armature.type != 'ARMATURE':
-            print(f"Armature '{armature_name}' not found or is not an armature")
-            return
-        
-        gyro_capabilities = {}
-        servo_capabilities = {}
-    
-        # Iterate over all pose bones in the armature.
-        # For each bone, create three entries.
-        feagi_index_for_gyro = 0
-        for bone_index, bone in enumerate(armature.pose.bones):
-            gyro_range = compute_gyro_range(bone)
-            servo_range = compute_servo_range(bone)
-            for axis in range(3):
-                final_index = cont_index * 3 + axis
-                
-                # Create the output servo capability for this axis of the bone.
-                servo_capabilities[str(final_index)] = {
-                    "custom_name": bone.name,  # same name for each axis.
-                    "default_value": 0,
-                    "disabled": False,
-                    "feagi_index": final_index,
-                    "max_power": 0.05,
-                    "max_value": servo_range["max_value"],
-                    "min_value": servo_range["min_value"]
-                }
-
-                # Temp workaround, TODO: Fix Feagi connector on gyro overlapping
-                # Create the input gyro capability for this axis of the bone.
-                gyro_capabilities[str(bone_index)] = {
-                    "custom_name": bone.name,  # same custom name for each axis.
-                    "disabled": False,
-                    "feagi_index": feagi_index_for_gyro,
-                    "max_value": [gyro_range["max_value"], gyro_range["max_value"], gyro_range["max_value"]],
-                    "min_value": [gyro_range["min_value"], gyro_range["min_value"], gyro_range["min_value"]]
-                }
-            feagi_index_for_gyro += 3 # temp.....zzz
-
-            cont_index+=1
-
-        check_capabilities_ranges(gyro_capabilities, servo_capabilities)
+        entry = layout[armature_name]
+        entries = None
+        if armature_name not in changed:
+            entries = reuse_armature_entries(previous_servo, entry["start"], entry["bone_count"])
+        if entries is None:
+            logger.info("Regenerating %s", armature_name)
+            entries = generate_armature_entries(armatures[armature_name], entry["start"],
+                                                geometries[armature_name])
+            check_capabilities_ranges(*entries)
+        gyro_capabilities, servo_capabilities = entries
 
         # Insert our generated entries into the capabilities dictionary.
         capabilities["capabilities"]["input"]["gyro"].update(gyro_capabilities)
@@ -174,14 +414,24 @@ def generate_capabilities_json(armature_names, output_path):
 
     # Write the JSON data to the specified file.
     with open(output_path, "w") as outfile:
-        json.dump(capabilities, outfile, indent=4)            
+        if compact:
+            json.dump(capabilities, outfile, separators=(",", ":"))
+        else:
+            json.dump(capabilities, outfile, indent=4)
+    with open(manifest_path_for(output_path), "w") as outfile:
+        json.dump({"version": MANIFEST_VERSION, "compact": compact, "armatures": layout, "retired": retired},
+                  outfile, indent=4)
+    return True
     
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
     blend_dir = bpy.path.abspath("//")
     json_path = os.path.join(blend_dir, "capabilities.json")
 
-    generate_capabilities_json(get_all_armature_names(), json_path)
+    # CAPABILITIES_COMPACT=true writes the JSON without indentation
+    compact = os.getenv("CAPABILITIES_COMPACT", "false").lower() == "true"
+    generate_capabilities_json(get_all_armature_names(), json_path, compact=compact)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -17,8 +17,12 @@ limitations under the License.
 ==============================================================================
 """
 import os
+import atexit
 import bpy
+import logging
+import time
 import threading
+from collections import deque
 import sys
 from time import sleep
 from feagi_connector import sensors
@@ -36,85 +40,154 @@ from dotenv import load_dotenv
 # Global variable section
 camera_data = {"vision": []}  # This will be heavily rely for vision
 model_list = {}
+routing_table = None  # FEAGI servo index -> (armature, pose bone, axis), built once at startup
+instruments = None  # instrumentation.Instrumentation, falsy while profiling is off
+bones_rotated = None  # log_utils.Aggregator, one "N bones rotated in X ms" line per second
+logger = None  # log_utils.get_logger("controller"), once the controller folder is importable
 
 
-def generate_map_translation(capabilities):
-    translation = {}
-    seen = set()
-    index = 0
-    servo_capabilities = capabilities.get("output", {}).get("servo", {})
-    for key, servo_data in servo_capabilities.items():
-        custom_name = servo_data.get("custom_name", None)
-        if custom_name not in seen:
-            seen.add(custom_name)
-            translation[index] = custom_name
-    return translation
-
+class PoseCommand(dict):
+    """
+    bone_slot -> [x, y, z], stamped with the routing table whose bone slots it uses.
 
-def xyz_to_bone(data_position):
-    return data_position // 3
+    The FEAGI worker thread decodes against whatever table is current at the time, and the timer may rebuild
+    the table before applying the command, so slots are only meaningful together with their table.
+    """
 
+    def __init__(self, table, *args):
+        super().__init__(*args)
+        self.routing_table = table
 
-def verify_which_xyz(number):
-    fractional_part = number - int(number)
-    if fractional_part == 0:
-        return 0  # x
-    elif abs(fractional_part - 0.33) < 0.01:
-        return 1  # y
-    elif abs(fractional_part - 0.66) < 0.01:
-        return 2  # z
-    else:
-        return None
+    def is_current(self):
+        return self.routing_table is routing_table
 
 
-def feagi_index_to_bone(feagi_index):
-    if feagi_index in map_translation:
-        return map_translation[feagi_index]
-    else:
-        return None
+def collect_bone_rotations(servo_data, bone_rotations):
+    """
+    Groups FEAGI servo values by bone through the routing table and merges their x/y/z components.
 
+    servo_data: dictionary. FEAGI index -> value, such as {0: 0.50, 1: 0.20, 2: 0.30}
+    bone_rotations: dictionary. bone_slot -> [x, y, z]. Updated in place. A PoseCommand is filled through
+                    the table it is stamped with, anything else through the current one.
 
-def action(obtained_data):
+    Returns: number of indexes that had no route and were dropped.
     """
-    This is where you can make the robot do something based on FEAGI data. The variable
-    obtained_data contains the data from FEAGI. The variable capabilities comes from
-    the configuration.json file. It will need the capability to measure how much power it can control
-    and calculate using the FEAGI data.
-
-    obtained_data: dictionary.
-    capabilities: dictionary.
+    routes = getattr(bone_rotations, "routing_table", routing_table).routes
+    dropped = 0
+    for feagi_index in servo_data:
+        route = routes.get(feagi_index)
+        if route is None:
+            dropped += 1
+            continue
+        bone_slot = route[3]
+        if bone_slot not in bone_rotations:
+            bone_rotations[bone_slot] = [None, None, None]  # If the axis is none, it will be skipped.
+        bone_rotations[bone_slot][route[2]] = servo_data[feagi_index]
+    return dropped
+
+
+def decode_pose_command(obtained_data):
+    """
+    Turns decoded OPU data into a pose command: bone_slot -> [x, y, z], where a None axis is left unchanged.
+    Doesn't touch bpy, so it can run on the FEAGI worker thread.
     """
     # recieve_motor_data = actuators.get_motor_data(obtained_data)
     receive_servo_data = actuators.get_servo_data(obtained_data)
     receive_servo_position_data = actuators.get_servo_position_data(obtained_data)
-    selected_name = ""
+    bone_rotations = PoseCommand(routing_table)  # the worker thread reads the global once
+    dropped = 0
 
     if receive_servo_position_data:
-        # pass # output like {0:0.50, 1:0.20, 2:0.30} # example but the data comes from your capabilities' servo range
-        for feagi_index in receive_servo_position_data:
-            movement_data = [None, None, None]  # initialize the ryp. If the index is none, it should be skipped.
-            movement_data[verify_which_xyz(feagi_index / 3)] = receive_servo_position_data[feagi_index]  # will update which index from FEAGI
-            bone_name = feagi_index_to_bone(feagi_index)
-            for model_name in model_list:
-                if model_list[model_name][0] <= feagi_index <= model_list[model_name][1]:
-                    selected_name = model_name
-            if bone_name is not None:
-                starter.change_ryp(selected_name, bone_name, movement_data)
+        # output like {0:0.50, 1:0.20, 2:0.30} # example but the data comes from your capabilities' servo range
+        dropped += collect_bone_rotations(receive_servo_position_data, bone_rotations)
 
     if receive_servo_data:
-        for feagi_index in receive_servo_data:
-            movement_data = [None, None, None]
-            movement_data[verify_which_xyz(feagi_index / 3)] = receive_servo_data[
-                feagi_index]  # will update which index from FEAGI
-            bone_name = feagi_index_to_bone(feagi_index)
-            for model_name in model_list:
-                if model_list[model_name][0] <= feagi_index <= model_list[model_name][1]:
-                    selected_name = model_name
-            if bone_name is not None:
-                starter.change_ryp(selected_name, bone_name, movement_data)
+        dropped += collect_bone_rotations(receive_servo_data, bone_rotations)
 
     # if recieve_motor_data:  # example output: {0: 0.245, 2: 1.0}
     #     pass
+    if instruments and dropped:
+        instruments.count("indices_dropped", dropped)
+    return bone_rotations
+
+
+def decode_servo_command(obtained_data):
+    """
+    Decoded OPU data as {FEAGI index: value}, for the sharded mode where the workers do the routing.
+    Like decode_pose_command(), servo values win over servo_position values for the same index.
+    """
+    servo_data = {}
+    receive_servo_position_data = actuators.get_servo_position_data(obtained_data)
+    if receive_servo_position_data:
+        servo_data.update(receive_servo_position_data)
+    receive_servo_data = actuators.get_servo_data(obtained_data)
+    if receive_servo_data:
+        servo_data.update(receive_servo_data)
+    return servo_data
+
+
+def apply_pose_command(bone_rotations):
+    """
+    Writes a pose command from decode_pose_command() onto the bones. Must run on Blender's main thread.
+    A command decoded against an older routing table is dropped: its bone slots may name other bones now.
+
+    Returns: (number of bones touched, time spent applying in seconds)
+    """
+    if not bone_rotations:
+        return 0, 0.0
+    if isinstance(bone_rotations, PoseCommand) and not bone_rotations.is_current():
+        if instruments:
+            instruments.count("commands_stale")
+        return 0, 0.0
+    start = time.perf_counter()
+    bones = routing_table.bones
+    bones_touched = starter.write_bone_rotations((bones[slot], bone_rotations[slot]) for slot in bone_rotations
+                                                 if 0 <= slot < len(bones))
+    elapsed = time.perf_counter() - start
+    if instruments:
+        instruments.record("action", elapsed)
+        instruments.count("bones_written", bones_touched)
+    if bones_rotated is not None:
+        bones_rotated.add(bones_touched, elapsed)
+    return bones_touched, elapsed
+
+
+def coalesce_pose_commands(pose_commands):
+    """
+    Merges pose commands that piled up while Blender was busy into one, so stale frames
+    are never applied. For every bone axis the newest value wins. All commands must share one routing table.
+    """
+    if len(pose_commands) == 1:
+        return pose_commands[0]
+    merged = PoseCommand(pose_commands[-1].routing_table)
+    for bone_rotations in pose_commands:
+        for slot, new_ryp in bone_rotations.items():
+            if slot not in merged:
+                merged[slot] = list(new_ryp)
+            else:
+                current = merged[slot]
+                for axis in range(3):
+                    if new_ryp[axis] is not None:
+                        current[axis] = new_ryp[axis]
+    return merged
+
+
+def action(obtained_data):
+    """
+    This is where you can make the robot do something based on FEAGI data. The variable
+    obtained_data contains the data from FEAGI. The variable capabilities comes from
+    the configuration.json file. It will need the capability to measure how much power it can control
+    and calculate using the FEAGI data.
+
+    All servo and servo_position values of the burst are grouped per bone first, so each bone
+    is written once per burst.
+
+    obtained_data: dictionary.
+    capabilities: dictionary.
+
+    Returns: (number of bones touched, time spent applying in seconds)
+    """
+    return apply_pose_command(decode_pose_command(obtained_data))
 
 
 if __name__ == "__main__":
@@ -153,20 +226,37 @@ if __name__ == "__main__":
         # Or if you want to update the environment with this value:
         os.environ["FEAGI_OPU_PORT"] = feagi_opu_port
 
-        print("RUN_ENV:", run_env)
-        print("Using FEAGI_OPU_PORT:", feagi_opu_port)
-
     import importlib
 
-    try:
-        import starter
-        from capabilities_gen import get_all_armature_names
-
-        importlib.reload(starter)  # reload from disk instead of using cached module
-        importlib.reload(get_all_armature_names)
-    except ImportError:
-        import starter
-        from capabilities_gen import get_all_armature_names
+    import registry
+    import influence
+    import starter
+    import routing
+    import gyro
+    import pipeline
+    import scheduler
+    import instrumentation
+    import log_utils
+    import capabilities_gen
+    import capabilities_cache
+    import recorder
+    import actuation
+    import vision
+    import shared_buffers
+    import sharding
+    import pose_bus
+
+    for local_module in (registry, influence, starter, routing, gyro, pipeline, scheduler, instrumentation, log_utils, capabilities_gen,
+                         capabilities_cache, recorder, actuation, vision, shared_buffers, sharding, pose_bus):
+        importlib.reload(local_module)  # reload from disk instead of using cached module
+    from capabilities_gen import get_all_armature_names
+
+    # Per-bone and per-call messages are DEBUG; set FEAGI_LOG_LEVEL="DEBUG" in .env to see them
+    logger = log_utils.get_logger("controller")
+    log_utils.setup_logging()
+    bones_rotated = log_utils.Aggregator(logger, "bones rotated")
+    logger.info("RUN_ENV: %s", os.getenv("RUN_ENV", "local"))
+    logger.info("Using FEAGI_OPU_PORT: %s", os.getenv("FEAGI_OPU_PORT"))
 
     config = feagi.build_up_from_configuration(current_dir)
     feagi_settings = config['feagi_settings'].copy()
@@ -174,17 +264,32 @@ if __name__ == "__main__":
     default_capabilities = config['default_capabilities'].copy()
     message_to_feagi = config['message_to_feagi'].copy()
     capabilities = config['capabilities'].copy()
-    map_translation = generate_map_translation(capabilities)
-    print("map_translation:", map_translation)
+    # Servo index -> bone name and the armature ranges, compiled once into a memory-mapped binary cache
+    # that is rebuilt only when capabilities.json or its manifest change
+    capabilities_path = os.path.join(current_dir, "capabilities.json")
+    compiled_capabilities = capabilities_cache.load_or_build(
+        capabilities_path, capabilities['output']['servo'],
+        model_list=lambda: capabilities_gen.load_layout(capabilities_path))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("map_translation: %s", compiled_capabilities.map_translation())
 
     # Simply copying and pasting the code below will do the full work for you. It basically checks
     # and updates the network to ensure that it can connect with FEAGI. If it doesn't find FEAGI,
     # it will just wait and display "waiting on FEAGI...".
-    # # # FEAGI registration # # # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-    feagi_settings, runtime_data, api_address, feagi_ipu_channel, feagi_opu_channel = \
-        feagi.connect_to_feagi(feagi_settings, runtime_data, agent_settings, capabilities,
-                               __version__)
-    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # Opt-in sidecar mode: FEAGI_SIDECAR="true" runs the feagi_connector client in its own process (pose_bus.py)
+    # and Blender only exchanges servo targets and gyro rows with it through shared memory.
+    # FEAGI_SIDECAR="fake" drives the servos with a built-in fake FEAGI instead, for testing without one.
+    sidecar_mode = os.getenv("FEAGI_SIDECAR", "false").lower()
+    if sidecar_mode in ("true", "fake"):
+        feagi_ipu_channel = None
+        feagi_settings.setdefault('feagi_burst_speed', float(os.getenv("FEAGI_SIDECAR_BURST_SPEED", "0.01")))
+    else:
+        sidecar_mode = None
+        # # # FEAGI registration # # # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        feagi_settings, runtime_data, api_address, feagi_ipu_channel, feagi_opu_channel = \
+            feagi.connect_to_feagi(feagi_settings, runtime_data, agent_settings, capabilities,
+                                   __version__)
+        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     # The function `create_runtime_default_list` will design and generate a complete JSON object
     # in the configuration, mainly for vision only. Once it's done, it will get the configuration JSON,
@@ -194,70 +299,311 @@ if __name__ == "__main__":
 
     # This is for processing the data and updating in real-time based on the user's activity in BV,
     # such as cortical size, blink, reload genome, and other backend tasks.
-    if capabilities:
+    # The offscreen camera (FEAGI_CAMERA) runs the retina itself, on the vision thread below.
+    if capabilities and not sidecar_mode and not os.getenv("FEAGI_CAMERA"):
         if "camera" in capabilities['input']:
             threading.Thread(target=retina.vision_progress,
                              args=(default_capabilities, feagi_settings, camera_data['vision'],),
                              daemon=True).start()
 
-    for x in capabilities['output']['servo']:
-        feagi_index = x
-        feagi_index_int = int(x)
-        map_translation[feagi_index_int] = capabilities['output']['servo'][feagi_index]['custom_name']
-
-    model_list = starter.get_name_and_update_index(get_all_armature_names())
-
-
-    def gather_gyro_data(armature, index):
-        gyro_data = {}
-        for idx, bone in enumerate(armature.pose.bones):
-            # location_values = [bone.location[0], bone.location[1], bone.location[2]]  # Full (x, y, z) location this will goes to a different cortical area.
-            rotation_values = [bone.rotation_euler[0], bone.rotation_euler[1],
-                               bone.rotation_euler[2]]  # Full (x, y, z) rotation
-            # scale_values    = [bone.scale[0], bone.scale[1], bone.scale[2]]  # Full (x, y, z) scale # this will goes to a different cortical area.
-
-            # Create a dictionary with keys "0", "1", and "2"
-            # bone_data = {
-            #     "0":location_values,
-            #     "1":rotation_values,
-            #     "2":scale_values
-            # }
-
-            # Assign this dictionary to the bone's index key (as a string)
-            gyro_data[str(idx + index)] = rotation_values
-        return gyro_data
-
-
-    def feagi_update():
-        # The controller will grab the data from FEAGI in real-time
-        message_from_feagi = pns.message_from_feagi
-        if message_from_feagi:  # Verify if the feagi data is not empty
-            # Translate from feagi data to human readable data
-            pns.check_genome_status_no_vision(message_from_feagi)
-            obtained_signals = pns.obtain_opu_data(message_from_feagi)
-            action(obtained_signals)
-
-        gyro_data = {}
-        for name in model_list:
-            armature = bpy.data.objects.get(name)
-            if not gyro_data:
-                gyro_data = gather_gyro_data(armature, model_list[name][0])
-            else:
-                gyro_data.update(gather_gyro_data(armature, model_list[name][0]))
+    # The manifest capabilities_gen writes knows each armature's servo range, even when they aren't contiguous
+    model_list = compiled_capabilities.model_list()
+    if model_list is None:
+        model_list = starter.get_name_and_update_index(get_all_armature_names())
+    # Armature and pose-bone handles are resolved once, and re-resolved only when the depsgraph reports changes
+    armature_registry = registry.default_registry
+    for name in model_list:
+        armature_registry.register(name)
+    registry.install_handlers(armature_registry)
+
+
+    def build_routing_table():
+        # Straight from the cache's arrays, without a Python (index, name) pair per servo
+        return routing.build_routing_table_from_arrays(compiled_capabilities.servo_indexes,
+                                                       compiled_capabilities.servo_name_ids,
+                                                       compiled_capabilities.names, model_list)
+
+
+    routing_table = build_routing_table()
+    gyro_sampler = gyro.GyroSampler(model_list)
+
+    # Opt-in sharded mode: FEAGI_SHARDS="4" runs the armatures on 4 `blender --background` workers (opened
+    # from the saved .blend), and this process only fans servo values out and merges their gyro rows
+    shard_coordinator = None
+    if int(os.getenv("FEAGI_SHARDS", "0")) > 0:
+        shard_coordinator = sharding.ShardCoordinator(model_list, capabilities_path, int(os.environ["FEAGI_SHARDS"]),
+                                                      blender_binary=os.getenv("FEAGI_BLENDER_BINARY"))
+        shard_coordinator.start()
+        atexit.register(shard_coordinator.stop)
+
+    servo_bus = None
+    if sidecar_mode:
+        servo_bus = pose_bus.PoseBus(max(int(index) for index in capabilities['output']['servo']) + 1,
+                                     max(64, 2 * len(gyro_sampler.buffer)), current_dir,
+                                     fake_feagi=sidecar_mode == "fake", python=os.getenv("FEAGI_SIDECAR_PYTHON"))
+        servo_bus.start()
+        atexit.register(servo_bus.stop)
+
+    # Opt-in delta mode: only send bones that moved, with a full keyframe every N bursts
+    gyro_delta_filter = None
+    if os.getenv("GYRO_DELTA_MODE", "false").lower() == "true":
+        gyro_delta_filter = gyro.GyroDeltaFilter(epsilon=float(os.getenv("GYRO_DELTA_EPSILON", "0.001")),
+                                                 keyframe_interval=int(os.getenv("GYRO_KEYFRAME_INTERVAL", "100")))
+        logger.info("Gyro delta mode on: %s rad, keyframe every %d bursts", gyro_delta_filter.epsilon,
+                    gyro_delta_filter.keyframe_interval)
+
+
+    # Per-stage timers and counters, off unless FEAGI_PROFILE="true"
+    instruments = instrumentation.Instrumentation(enabled=os.getenv("FEAGI_PROFILE", "false").lower() == "true",
+                                                  dump_path=os.getenv("FEAGI_PROFILE_PATH"),
+                                                  dump_interval=float(os.getenv("FEAGI_PROFILE_INTERVAL", "10")))
+
+
+    def decode_feagi_message(message):
+        started = instruments.begin() if instruments else None
+        # Translate from feagi data to human readable data
+        pns.check_genome_status_no_vision(message)
+        if shard_coordinator:
+            pose_command = decode_servo_command(pns.obtain_opu_data(message))
+        else:
+            pose_command = decode_pose_command(pns.obtain_opu_data(message))
+        if instruments:
+            instruments.end("opu_decode", started)
+        return pose_command
 
-        # the data should be "{'0': [x,y,z]} taken care of from gather_gyro_data"
+
+    def send_gyro_frame(gyro_data):
+        started = instruments.begin() if instruments else None
+        # the data should be "{'0': [x,y,z]}", which the gyro frame provides
         message_to_feagi_local = sensors.create_data_for_feagi('gyro', capabilities, message_to_feagi,
                                                                current_data=gyro_data, symmetric=True,
                                                                measure_enable=True)
+        if instruments:
+            instruments.end("gyro_encode", started)
+            instruments.count("entries_sent", len(gyro_data))
+            started = instruments.begin()
+
         # Sends to feagi data
         pns.signals_to_feagi(message_to_feagi_local, feagi_ipu_channel, agent_settings, feagi_settings)
+        if instruments:
+            instruments.end("send", started)
+            instruments.count("frames_sent")
 
         # Clear data that is created by controller such as sensors
         message_to_feagi.clear()
 
-        # cool down everytime
-        return feagi_settings['feagi_burst_speed']
+
+    def send_ipu_message(message):
+        # An already encoded message, such as a vision frame. Only the thread that sends the gyro may call this.
+        pns.signals_to_feagi(message, feagi_ipu_channel, agent_settings, feagi_settings)
+
+
+    # Messages queued by other threads for the timer to send when there is no FEAGI I/O thread
+    pending_ipu_messages = deque(maxlen=2)
+
+
+    # Decoding, encoding and sending run on a worker thread unless FEAGI_IO_THREAD="false"
+    feagi_pipeline = None
+    if os.getenv("FEAGI_IO_THREAD", "true").lower() != "false" and not servo_bus:
+        feagi_pipeline = pipeline.FeagiPipeline(lambda: pns.message_from_feagi, decode_feagi_message,
+                                                send_gyro_frame, send_message=send_ipu_message)
+        feagi_pipeline.start()
+
+
+    # Opt-in smoothing: bursts only set targets, and the bones move toward them at the scene's frame rate,
+    # no faster than each servo's max_power per frame
+    actuator = None
+    if os.getenv("FEAGI_SMOOTHING", "false").lower() == "true" and not shard_coordinator:
+        actuator = actuation.SmoothedActuator(routing_table, capabilities['output']['servo'],
+                                              smoothing_time=float(os.getenv("FEAGI_SMOOTHING_TIME", "0.1")))
+        logger.info("Smoothed actuation on: %s s smoothing, %d bones", actuator.smoothing_time,
+                    len(routing_table.bones))
+
+
+    def actuation_tick():
+        started = time.perf_counter()
+        bones_touched = actuator.step()
+        if bones_touched:
+            elapsed = time.perf_counter() - started
+            if instruments:
+                instruments.record("action", elapsed)
+                instruments.count("bones_written", bones_touched)
+            bones_rotated.add(bones_touched, elapsed)
+        return actuator.frame_interval()
+
+
+    def update_pose():
+        # The controller will grab the data from FEAGI in real-time. Returns the pose command it applied.
+        bone_rotations = None
+        if servo_bus:
+            bone_rotations = servo_bus.read_servo()
+            if bone_rotations and not shard_coordinator:
+                servo_data = bone_rotations
+                bone_rotations = PoseCommand(routing_table)
+                dropped = collect_bone_rotations(servo_data, bone_rotations)
+                if instruments and dropped:
+                    instruments.count("indices_dropped", dropped)
+        elif feagi_pipeline:
+            pose_commands = feagi_pipeline.drain_commands()
+            if pose_commands and shard_coordinator:
+                bone_rotations = {}
+                for servo_data in pose_commands:  # newest value wins
+                    bone_rotations.update(servo_data)
+            elif pose_commands:
+                # Commands decoded before the routing table was rebuilt use the old bone slots
+                current = [pose_command for pose_command in pose_commands if pose_command.is_current()]
+                if len(current) < len(pose_commands):
+                    logger.debug("Dropped %d pose commands decoded against an old routing table",
+                                 len(pose_commands) - len(current))
+                    if instruments:
+                        instruments.count("commands_stale", len(pose_commands) - len(current))
+                if current:
+                    bone_rotations = coalesce_pose_commands(current)
+        else:
+            message_from_feagi = pns.message_from_feagi
+            if message_from_feagi:  # Verify if the feagi data is not empty
+                bone_rotations = decode_feagi_message(message_from_feagi)
+        if bone_rotations:
+            if shard_coordinator:
+                shard_coordinator.dispatch(bone_rotations)
+            elif actuator:
+                actuator.set_targets(bone_rotations)
+            else:
+                apply_pose_command(bone_rotations)
+        return bone_rotations
+
+
+    def publish_gyro(burst):
+        # Gyro runs at its own rate, and is skipped when actuation already used up this tick's budget.
+        # Returns the full sample, or None when the gyro wasn't due.
+        if not burst.gyro_due():
+            return None
+
+        started = instruments.begin() if instruments else None
+        # One bulk read per armature into the sampler's buffer. The frame is a zero-copy
+        # "{'0': [x,y,z]}" view of that buffer.
+        gyro_data = sampled = shard_coordinator.gather_gyro() if shard_coordinator else gyro_sampler.sample()
+        if gyro_delta_filter:
+            gyro_data = gyro_delta_filter.filter(gyro_data)
+        if instruments:
+            instruments.end("gyro_gather", started)
+        if not gyro_data:  # Nothing moved since the last burst
+            return sampled
+
+        if servo_bus:
+            servo_bus.publish_gyro(gyro_data)
+        elif feagi_pipeline:
+            feagi_pipeline.submit_frame(gyro_data.copy())  # the sampler reuses its buffer next burst
+        else:
+            send_gyro_frame(gyro_data)
+        return sampled
+
+
+    # Opt-in vision: FEAGI_CAMERA names a camera that is rendered offscreen every burst (when the tick's budget
+    # allows) and handed to the retina on its own thread
+    camera_capture = None
+    vision_worker = None
+    if os.getenv("FEAGI_CAMERA") and servo_bus:
+        logger.warning("FEAGI_CAMERA is ignored in sidecar mode")
+    elif os.getenv("FEAGI_CAMERA"):
+        if "camera" not in capabilities['input']:
+            logger.warning("FEAGI_CAMERA is set but capabilities.json has no camera input; vision stays off")
+        else:
+            camera_capture = vision.CameraCapture(
+                os.environ["FEAGI_CAMERA"],
+                render_size=vision.parse_size(os.getenv("FEAGI_CAMERA_SIZE", "256x256")),
+                retina_size=vision.parse_size(os.getenv("FEAGI_CAMERA_RETINA_SIZE")),
+                ring_capacity=int(os.getenv("FEAGI_CAMERA_RING", "4")))
+            vision_state = {"previous_frame_data": {}, "rgb": {}}
+
+
+            def send_vision_frame(frame):
+                # Runs the retina here, but leaves the sending to the thread that sends the gyro: the IPU
+                # socket isn't thread-safe. Every frame gets its own message dict, since it's sent later.
+                global default_capabilities
+                vision_state["previous_frame_data"], vision_state["rgb"], default_capabilities = \
+                    retina.process_visual_stimuli(frame, default_capabilities, vision_state["previous_frame_data"],
+                                                  vision_state["rgb"], capabilities)
+                if vision_state["rgb"]:
+                    message = pns.generate_feagi_data(vision_state["rgb"], {})
+                    if feagi_pipeline:
+                        feagi_pipeline.submit_message(message)
+                    else:
+                        pending_ipu_messages.append(message)
+
+
+            vision_worker = vision.VisionWorker(camera_capture.ring, send_vision_frame)
+            vision_worker.start()
+            atexit.register(vision_worker.stop)
+            logger.info("Vision on: camera '%s', %s render, %s frames", camera_capture.camera_name,
+                        camera_capture.render_size, camera_capture.frame_size)
+
+
+    def capture_camera(burst):
+        # Optional work like the gyro: skipped when this tick already used up its budget
+        if burst.budget_left() <= 0:
+            return
+        started = instruments.begin() if instruments else None
+        camera_capture.capture()
+        if instruments:
+            instruments.end("camera_capture", started)
+
+
+    # Opt-in session recording: FEAGI_RECORD_PATH="sessions/feagi-%Y%m%d-%H%M%S.fgpr" (strftime codes allowed)
+    pose_recorder = None
+    if os.getenv("FEAGI_RECORD_PATH") and shard_coordinator:
+        logger.warning("FEAGI_RECORD_PATH is ignored in sharded mode")
+    elif os.getenv("FEAGI_RECORD_PATH"):
+        pose_recorder = recorder.PoseRecorder(time.strftime(os.environ["FEAGI_RECORD_PATH"]))
+        pose_recorder.start()
+        atexit.register(pose_recorder.stop)
+
+
+    recorded_layout = {"routing_table": None, "gyro_generation": None}
+
+
+    def record_burst(bone_rotations, sampled):
+        # Rows follow the routing table's bone slots and the sampler's rows; a rebuild starts a new layout
+        if recorded_layout["routing_table"] is not routing_table or \
+                recorded_layout["gyro_generation"] != gyro_sampler.generation:
+            recorded_layout["routing_table"] = routing_table
+            recorded_layout["gyro_generation"] = gyro_sampler.generation
+            pose_recorder.set_layout([(armature.name, bone.name)
+                                      for armature, bone in zip(routing_table.armatures, routing_table.bones)],
+                                     gyro_sampler.row_bones())
+        pose_recorder.record(bone_rotations, sampled.array if sampled is not None else None)
+
+
+    def feagi_update(burst):
+        global routing_table
+        started = instruments.begin() if instruments else None
+        # Renamed, added or deleted armatures/bones: rebuild the routes from the new handles
+        if armature_registry.refresh() or routing_table.generation != armature_registry.generation:
+            routing_table = build_routing_table()
+            if actuator:
+                actuator.bind(routing_table)
+        bone_rotations = update_pose()
+        sampled = publish_gyro(burst)
+        while pending_ipu_messages:
+            send_ipu_message(pending_ipu_messages.popleft())
+        if camera_capture:
+            capture_camera(burst)
+        if pose_recorder:
+            record_burst(bone_rotations, sampled)
+        if instruments:
+            instruments.end("tick", started)
+            instruments.maybe_dump()
+
+
+    # Keeps a steady burst rate: the wait after each tick is corrected for the time the tick took
+    burst_scheduler = scheduler.BurstScheduler(
+        feagi_update,
+        target_interval=lambda: feagi_settings['feagi_burst_speed'],
+        gyro_interval=float(os.environ["GYRO_BURST_SPEED"]) if os.getenv("GYRO_BURST_SPEED") else None,
+        time_budget=float(os.environ["TICK_TIME_BUDGET"]) if os.getenv("TICK_TIME_BUDGET") else None)
 
 
     # Register the timer callback so that it runs periodically without freezing Blender
-    bpy.app.timers.register(feagi_update)
+    bpy.app.timers.register(burst_scheduler.tick)
+    if actuator:
+        bpy.app.timers.register(actuation_tick)
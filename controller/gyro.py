@@ -0,0 +1,178 @@
+import numpy as np
+import registry
+from collections.abc import Mapping
+
+
+class GyroFrame(Mapping):
+    """
+    Read-only view of one gyro sample, shaped like the dictionary sensors.create_data_for_feagi() expects:
+    {'0': [x, y, z], '1': [x, y, z], ...}
+
+    Values are rows of the sampler's buffer (NumPy views), so nothing is copied per bone.
+    """
+
+    def __init__(self, buffer, key_rows):
+        self._buffer = buffer
+        self._key_rows = key_rows  # gyro key (str) -> row in buffer
+        self._row_keys = None  # row -> gyro key, built on first use by subset()
+        self._index_rows = None  # built on first use by index_rows()
+
+    def __getitem__(self, key):
+        return self._buffer[self._key_rows[key]]
+
+    def __iter__(self):
+        return iter(self._key_rows)
+
+    def __len__(self):
+        return len(self._key_rows)
+
+    @property
+    def layout(self):
+        """gyro key -> buffer row. Kept by copies and replaced on every rebuild, so it identifies the layout."""
+        return self._key_rows
+
+    @property
+    def array(self):
+        """The whole (bones, 3) float32 buffer behind this frame."""
+        return self._buffer
+
+    def copy(self):
+        """Returns a frame with its own copy of the rotations, safe to hand to another thread."""
+        frame = GyroFrame(self._buffer.copy(), self._key_rows)
+        frame._row_keys = self._row_keys
+        frame._index_rows = self._index_rows
+        return frame
+
+    def index_rows(self):
+        """(int32 gyro keys, buffer rows) of this frame as two arrays, built once per frame."""
+        if self._index_rows is None:
+            self._index_rows = (np.fromiter((int(key) for key in self._key_rows), dtype=np.int32,
+                                            count=len(self._key_rows)),
+                                np.fromiter(self._key_rows.values(), dtype=np.intp, count=len(self._key_rows)))
+        return self._index_rows
+
+    def subset(self, rows):
+        """Returns a frame over the same buffer that only contains the given rows."""
+        if self._row_keys is None:
+            self._row_keys = [None] * len(self._buffer)
+            for key, row in self._key_rows.items():
+                self._row_keys[row] = key
+        row_keys = self._row_keys
+        return GyroFrame(self._buffer, {row_keys[row]: row for row in rows if row_keys[row] is not None})
+
+
+class GyroSampler:
+    """
+    Reads the rotation_euler of every pose bone of every armature into one preallocated
+    float32 buffer, with a single foreach_get() call per armature.
+
+    The buffer has one row per bone. Rows are laid out armature after armature in model_list order,
+    and gyro keys follow the same numbering as before: str(bone index + first FEAGI index of the armature).
+    Armatures are read through the registry's handles, and the layout is rebuilt when the registry changes.
+    """
+
+    def __init__(self, model_list, armature_registry=None):
+        self.registry = armature_registry if armature_registry is not None else registry.default_registry
+        self.model_list = {}
+        self.generation = None
+        self.slices = []  # (armature slot, first row, bone count)
+        self.buffer = np.zeros((0, 3), dtype=np.float32)
+        self.frame = GyroFrame(self.buffer, {})
+        self.rebuild(model_list)
+
+    def rebuild(self, model_list):
+        """Allocates the buffer and key layout for the armatures in model_list."""
+        self.model_list = model_list
+        self.slices = []
+        key_rows = {}
+        row = 0
+        for name in model_list:
+            armature = self.registry.armature(name)
+            if armature is None:
+                continue
+            bone_count = len(self.registry.bones[self.registry.slot(name)])
+            self.slices.append((self.registry.slot(name), row, bone_count))
+            for idx in range(bone_count):
+                key_rows[str(idx + model_list[name][0])] = row + idx  # later armatures win, like dict.update did
+            row += bone_count
+
+        self.buffer = np.zeros((row, 3), dtype=np.float32)
+        self.frame = GyroFrame(self.buffer, key_rows)
+        self.generation = self.registry.generation
+
+    def row_bones(self):
+        """(armature name, bone name) of every buffer row."""
+        row_bones = []
+        for slot, row, bone_count in self.slices:
+            armature_name = self.registry.armature_names[slot]
+            row_bones.extend((armature_name, bone_name) for bone_name in self.registry.bone_names[slot][:bone_count])
+        return row_bones
+
+    def sample(self):
+        """
+        Refreshes the buffer from the current pose and returns the GyroFrame view of it.
+        The layout is rebuilt if the registry's handles changed (an armature gained or lost bones, ...).
+        """
+        if self.generation != self.registry.generation:
+            self.rebuild(self.model_list)
+        flat = self.buffer.reshape(-1)
+        armatures = self.registry.armatures
+        for slot, row, bone_count in self.slices:
+            armature = armatures[slot]
+            if armature is None:
+                continue
+            armature.pose.bones.foreach_get("rotation_euler", flat[row * 3:(row + bone_count) * 3])
+        return self.frame
+
+
+def gather_gyro_data(armature, index):
+    """
+    Returns the rotation of every pose bone of one armature as {'<bone index + index>': [x, y, z]}.
+    Use GyroSampler for the per-burst path; this builds Python lists and is meant for one-off reads.
+    """
+    bone_count = len(armature.pose.bones)
+    rotations = np.empty(bone_count * 3, dtype=np.float32)
+    armature.pose.bones.foreach_get("rotation_euler", rotations)
+    rotations = rotations.reshape(bone_count, 3).tolist()
+    return {str(idx + index): rotations[idx] for idx in range(bone_count)}
+
+
+class GyroDeltaFilter:
+    """
+    Change detection for gyro publishing. Only bones that rotated more than epsilon (radians, on any axis)
+    since they were last sent go out. Every keyframe_interval bursts the full frame is sent so FEAGI can resync,
+    and so is the first frame of a new layout (the sampler rebuilt after armatures or bones changed).
+
+    Parameters:
+        epsilon (float): Smallest change on any axis that counts as movement.
+        keyframe_interval (int): Send a full snapshot every N bursts. 1 sends every burst in full.
+    """
+
+    def __init__(self, epsilon=0.001, keyframe_interval=100):
+        self.epsilon = epsilon
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.last_sent = None
+        self.last_layout = None
+        self.burst_count = 0
+
+    def reset(self):
+        """Forces the next burst to be a full keyframe."""
+        self.last_sent = None
+
+    def filter(self, frame):
+        """
+        Returns the part of the frame that should be sent this burst. The result may be empty.
+        """
+        rotations = frame.array
+        keyframe = self.burst_count % self.keyframe_interval == 0
+        self.burst_count += 1
+
+        if keyframe or self.last_sent is None or frame.layout is not self.last_layout:
+            self.last_sent = rotations.copy()
+            self.last_layout = frame.layout
+            return frame
+
+        changed = np.abs(rotations - self.last_sent).max(axis=1) > self.epsilon
+        rows = np.flatnonzero(changed)
+        self.last_sent[rows] = rotations[rows]
+        return frame.subset(rows.tolist())
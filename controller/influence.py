@@ -0,0 +1,153 @@
+from collections import deque
+
+import numpy as np
+
+from log_utils import get_logger
+from model_tree import load_rig_hierarchy
+
+logger = get_logger("influence")
+
+# Constraints that make their owner follow the subtarget bone
+COPY_CONSTRAINT_TYPES = frozenset(("COPY_TRANSFORMS", "COPY_LOCATION", "COPY_ROTATION", "COPY_SCALE"))
+
+
+class InfluenceGraph:
+    """
+    Which bones move when a bone moves, for a whole armature.
+
+    Edges, from the bone being moved to the bones that follow it:
+      - FK: a bone moves all its children.
+      - IK: a bone with an IK constraint moves the bones of its chain (chain_count parents, 0 = up to the root).
+      - Copy constraints (COPY_TRANSFORMS/LOCATION/ROTATION/SCALE): the subtarget moves the constraint's owner.
+
+    Only the edges are built up front, in O(bones + constraints). A bone's transitive closure is walked the
+    first time it is asked for and then kept, so a repeated affected_indices() costs a dictionary lookup.
+    Building every closure eagerly would be O(bones^2) on deep chains: an IK constraint reaching the root
+    makes almost every closure the whole rig.
+
+    Attributes:
+        bone_names (list): bone index -> name, in pose.bones (or model_tree.json) order.
+        index (dict): bone name -> bone index.
+        parents (numpy.ndarray): int32, bone index -> parent index, -1 for roots.
+    """
+
+    def __init__(self, bone_names, parents, ik_chains=(), copy_edges=()):
+        """
+        Parameters:
+            bone_names (list): Bone names.
+            parents (list): Parent index of every bone, -1 for roots.
+            ik_chains (iterable): (bone index, chain_count) of every IK constraint.
+            copy_edges (iterable): (subtarget index, owner index) of every copy constraint.
+        """
+        self.bone_names = list(bone_names)
+        self.index = {bone_name: bone_index for bone_index, bone_name in enumerate(self.bone_names)}
+        self.parents = np.asarray(parents, dtype=np.int32).reshape(-1)
+        bone_count = len(self.bone_names)
+
+        edges = [[] for _ in range(bone_count)]
+        for child, parent in enumerate(self.parents.tolist()):
+            if parent >= 0:
+                edges[parent].append(child)
+        for bone_index, chain_count in ik_chains:
+            ancestor = self.parents[bone_index]
+            length = 1
+            while ancestor >= 0 and (chain_count <= 0 or length < chain_count):
+                edges[bone_index].append(int(ancestor))
+                ancestor = self.parents[ancestor]
+                length += 1
+        for subtarget, owner in copy_edges:
+            if subtarget != owner:
+                edges[subtarget].append(owner)
+        self.edges = edges
+        self._closures = {}  # bone index -> read-only int32 closure, filled by affected_indices()
+
+    def __len__(self):
+        return len(self.bone_names)
+
+    def _reach(self, start):
+        # Breadth-first, so the moved bone comes first and nearer bones before farther ones
+        seen = {start}
+        order = [start]
+        pending = deque((start,))
+        edges = self.edges
+        while pending:
+            for neighbour in edges[pending.popleft()]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    order.append(neighbour)
+                    pending.append(neighbour)
+        return order
+
+    def affected_indices(self, bone_index):
+        """Indices of the bones that move with bone_index, itself first. A read-only array, walked on first use."""
+        closure = self._closures.get(bone_index)
+        if closure is None:
+            closure = np.array(self._reach(bone_index), dtype=np.int32)
+            closure.flags.writeable = False
+            self._closures[bone_index] = closure
+        return closure
+
+    def affected(self, bone_name):
+        """Names of the bones that move with bone_name, itself first. Empty if the bone doesn't exist."""
+        bone_index = self.index.get(bone_name)
+        if bone_index is None:
+            return []
+        return [self.bone_names[affected] for affected in self.affected_indices(bone_index).tolist()]
+
+    def affected_mask(self, bone_indices):
+        """Boolean array over all bones: True for every bone moved by any of bone_indices."""
+        mask = np.zeros(len(self.bone_names), dtype=bool)
+        for bone_index in bone_indices:
+            mask[self.affected_indices(bone_index)] = True
+        return mask
+
+    def affects(self, moved_index, other_index):
+        """True if moving moved_index moves other_index."""
+        return bool(np.any(self.affected_indices(moved_index) == other_index))
+
+    @classmethod
+    def from_pose_bones(cls, armature_obj):
+        """Builds the graph from an armature object's pose bones and constraints."""
+        pose_bones = armature_obj.pose.bones
+        bone_names = pose_bones.keys()
+        index = {bone_name: bone_index for bone_index, bone_name in enumerate(bone_names)}
+        parents = []
+        ik_chains = []
+        copy_edges = []
+        for bone_index, pose_bone in enumerate(pose_bones):
+            parents.append(index[pose_bone.parent.name] if pose_bone.parent is not None else -1)
+            for constraint in pose_bone.constraints:
+                if constraint.type == 'IK':
+                    ik_chains.append((bone_index, constraint.chain_count))
+                elif constraint.type in COPY_CONSTRAINT_TYPES:
+                    target = getattr(constraint, "target", None)
+                    subtarget = index.get(getattr(constraint, "subtarget", ""))
+                    if subtarget is not None and (target is None or target == armature_obj):
+                        copy_edges.append((subtarget, bone_index))
+        return cls(bone_names, parents, ik_chains, copy_edges)
+
+    @classmethod
+    def from_model_tree(cls, model_tree):
+        """
+        Builds the graph from a model_tree.json export (a path, plain or gzip, or the loaded dictionary).
+        Exports without "chain_count" treat IK chains as reaching the root; without "subtarget",
+        copy constraints add no edges.
+        """
+        if isinstance(model_tree, str):
+            model_tree = load_rig_hierarchy(model_tree)
+        bones = model_tree["bones"]
+        index = {bone["name"]: bone_index for bone_index, bone in enumerate(bones)}
+        parents = []
+        ik_chains = []
+        copy_edges = []
+        for bone_index, bone in enumerate(bones):
+            parents.append(index.get(bone.get("parent"), -1))
+            for constraint in bone.get("constraints", ()):
+                if constraint["type"] == "IK":
+                    ik_chains.append((bone_index, constraint.get("chain_count", 0)))
+                elif constraint["type"] in COPY_CONSTRAINT_TYPES:
+                    target = constraint.get("target")
+                    subtarget = index.get(constraint.get("subtarget") or "")
+                    if subtarget is not None and target in (None, model_tree.get("object_name")):
+                        copy_edges.append((subtarget, bone_index))
+        return cls([bone["name"] for bone in bones], parents, ik_chains, copy_edges)
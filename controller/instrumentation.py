@@ -0,0 +1,145 @@
+import csv
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Upper edges, in milliseconds, of the histogram buckets in snapshots. The last bucket is open ended.
+HISTOGRAM_EDGES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+
+class StageTimer:
+    """Rolling window of the most recent durations (seconds) of one stage."""
+
+    def __init__(self, window):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.position = 0
+        self.total_count = 0
+        self.total_time = 0.0
+
+    def add(self, seconds):
+        self.samples[self.position] = seconds
+        self.position = (self.position + 1) % len(self.samples)
+        self.total_count += 1
+        self.total_time += seconds
+
+    def summary(self):
+        window = self.samples[:min(self.total_count, len(self.samples))] * 1000  # ms
+        if not len(window):
+            return {"count": 0}
+        p50, p90, p99 = np.percentile(window, (50, 90, 99))
+        histogram = np.histogram(window, bins=(0,) + HISTOGRAM_EDGES_MS + (np.inf,))[0]
+        return {
+            "count": self.total_count,
+            "total_ms": self.total_time * 1000,
+            "mean_ms": float(window.mean()),
+            "p50_ms": float(p50),
+            "p90_ms": float(p90),
+            "p99_ms": float(p99),
+            "max_ms": float(window.max()),
+            "histogram": histogram.tolist()
+        }
+
+
+class Instrumentation:
+    """
+    Timers and counters for the stages of feagi_update.
+
+    Stages are timed with begin()/end() on a monotonic clock and kept in rolling windows. Counters are plain
+    running totals. The object is falsy while disabled, so call sites guard with `if instruments:` and cost
+    a single truth test when profiling is off.
+
+    Stages used by the controller: tick, opu_decode, action, gyro_gather, gyro_encode, send.
+    Counters: bones_written, indices_dropped, entries_sent (gyro entries handed to
+    pns.signals_to_feagi), frames_sent.
+
+    Parameters:
+        enabled (bool): Collect data.
+        window (int): Samples kept per stage for percentiles and histograms.
+        dump_path (str): File that maybe_dump() appends snapshots to. A .csv path gets one row per stage
+                         and snapshot; anything else gets one JSON object per line.
+        dump_interval (float): Seconds between dumps.
+    """
+
+    def __init__(self, enabled=False, window=1024, dump_path=None, dump_interval=10.0):
+        self.enabled = enabled
+        self.window = window
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.stages = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self.last_dump = time.monotonic()
+        self._lock = threading.Lock()  # stages are recorded from Blender's thread and the FEAGI worker
+
+    def __bool__(self):
+        return self.enabled
+
+    def begin(self):
+        return time.perf_counter()
+
+    def end(self, stage, started):
+        self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.stages.get(stage)
+            if timer is None:
+                timer = self.stages[stage] = StageTimer(self.window)
+            timer.add(seconds)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Everything collected so far, as a JSON-serializable dictionary."""
+        with self._lock:
+            return {
+                "time": time.time(),
+                "uptime": time.time() - self.started_at,
+                "histogram_edges_ms": list(HISTOGRAM_EDGES_MS),
+                "stages": {name: timer.summary() for name, timer in self.stages.items()},
+                "counters": dict(self.counters)
+            }
+
+    def maybe_dump(self):
+        """Appends a snapshot to dump_path if dump_interval has passed since the last one."""
+        if not self.enabled or not self.dump_path:
+            return False
+        now = time.monotonic()
+        if now - self.last_dump < self.dump_interval:
+            return False
+        self.last_dump = now
+        self.dump(self.dump_path)
+        return True
+
+    def dump(self, path):
+        snapshot = self.snapshot()
+        if path.endswith(".csv"):
+            write_header = not os.path.exists(path)
+            with open(path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(["time", "stage", "count", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms",
+                                     "counters"])
+                for name, summary in snapshot["stages"].items():
+                    writer.writerow([f"{snapshot['time']:.3f}", name, summary["count"],
+                                     summary.get("mean_ms"), summary.get("p50_ms"), summary.get("p90_ms"),
+                                     summary.get("p99_ms"), summary.get("max_ms"),
+                                     json.dumps(snapshot["counters"])])
+        else:
+            with open(path, "a") as f:
+                f.write(json.dumps(snapshot) + "\n")
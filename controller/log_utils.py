@@ -0,0 +1,114 @@
+import logging
+import os
+import sys
+import time
+
+LOGGER_NAME = "blender_connector"
+
+
+def get_logger(name):
+    """Returns the logger for one controller module, such as get_logger("starter")."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records with the same logger and message template through per `interval` seconds.
+    The next record that gets through says how many were suppressed in between.
+
+    Records are grouped by their unformatted message, so log with arguments
+    (logger.warning("Bone '%s' not found", name)) rather than f-strings to have them grouped.
+    """
+
+    def __init__(self, interval=1.0, burst=5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.windows = {}  # (logger name, template) -> [window start, records in window, suppressed]
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            self.windows[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+class Aggregator:
+    """
+    Sums up a hot-path event and logs it once per interval instead of once per call,
+    for example "412 bones rotated in 3.1 ms (20 bursts)".
+
+    Parameters:
+        logger (logging.Logger): Where the summary goes.
+        what (str): What is being counted, such as "bones rotated".
+        interval (float): Seconds between summaries.
+        level (int): Logging level of the summary.
+    """
+
+    def __init__(self, logger, what, interval=1.0, level=logging.INFO):
+        self.logger = logger
+        self.what = what
+        self.interval = interval
+        self.level = level
+        self.count = 0
+        self.seconds = 0.0
+        self.calls = 0
+        self.window_start = time.monotonic()
+
+    def add(self, count, seconds=0.0):
+        self.count += count
+        self.seconds += seconds
+        self.calls += 1
+        now = time.monotonic()
+        if now - self.window_start >= self.interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        if self.calls and self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%d %s in %.1f ms (%d calls)", self.count, self.what, self.seconds * 1000,
+                            self.calls)
+        self.count = 0
+        self.seconds = 0.0
+        self.calls = 0
+        self.window_start = now if now is not None else time.monotonic()
+
+
+def setup_logging(level=None, interval=1.0, burst=5):
+    """
+    Configures the blender_connector loggers: one console handler with rate limiting.
+    Safe to call again (e.g. when controller.py is run a second time); the previous handler is replaced.
+
+    Parameters:
+        level (str or int): Defaults to the FEAGI_LOG_LEVEL environment variable, or INFO.
+                            Per-bone and per-call messages are DEBUG, so they are silent by default.
+        interval (float): Rate limit window in seconds.
+        burst (int): Records with the same template allowed per window.
+    """
+    if level is None:
+        level = os.getenv("FEAGI_LOG_LEVEL", "INFO")
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if getattr(handler, "blender_connector", False):
+            logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.blender_connector = True
+    handler.setFormatter(logging.Formatter("[%(levelname)s] %(name)s: %(message)s"))
+    handler.addFilter(RateLimitFilter(interval=interval, burst=burst))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
@@ -1,106 +1,260 @@
-import bpy
+try:
+    import bpy
+except ImportError:  # reading exports (load_rig_hierarchy) also works outside Blender, for rig_model and influence
+    bpy = None
+import gzip
+import itertools
 import json
 import os
+import logging
 
-def convert_idprops_to_python(value):
+logger = logging.getLogger("blender_connector.model_tree")
+
+# Constraint types export_rig_hierarchy() includes
+ALLOWED_CONSTRAINT_TYPES = (
+    "ACTION",
+    "ARMATURE",
+    "CHILD_OF",
+    "COPY_LOCATION",
+    "COPY_ROTATION",
+    "COPY_SCALE",
+    "COPY_TRANSFORMS",
+    "DAMPED_TRACK",
+    "IK",
+    "LIMIT_DISTANCE",
+    "LIMIT_ROTATION",
+    "PIVOT",
+    "STRETCH_TO",
+    "TRANSFORM",
+)
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Bones per json encode call in the indented export
+PRETTY_BATCH_SIZE = 256
+
+
+def convert_idprops_to_python(value, memo=None):
     """
     Recursively convert Blender's ID properties into basic Python types
     that can be serialized by json.dump().
+
+    memo (dict): Optional cache shared across calls for ID datablocks (objects, materials, ...) that
+                 properties point to. Each one is converted once, keyed by as_pointer(). Other values are
+                 new wrappers on every access, so they aren't cached. Converted IDs are shared, so don't
+                 modify them.
     """
     # Basic serializable types:
     if isinstance(value, (str, int, float, bool, type(None))):
         return value
 
+    if memo is None or getattr(value, "id_type", None) is None or not hasattr(value, "as_pointer"):
+        return _convert_container(value, memo)
+    key = value.as_pointer()
+    converted = memo.get(key)
+    if converted is None:
+        converted = memo[key] = _convert_container(value, memo)
+    return converted
+
+
+def _convert_container(value, memo):
+    # IDPropertyGroup / IDPropertyArray: one C call instead of an item access per element
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    elif hasattr(value, "to_list"):
+        value = value.to_list()
+
     # Convert list or tuple items
-    elif isinstance(value, (list, tuple)):
-        return [convert_idprops_to_python(v) for v in value]
+    if isinstance(value, (list, tuple)):
+        return [convert_idprops_to_python(v, memo) for v in value]
 
     # If it's an IDPropertyGroup or a similar mapping type, convert to dict
     elif hasattr(value, "keys") and hasattr(value, "__getitem__"):
         d = {}
         for k in value.keys():
-            d[k] = convert_idprops_to_python(value[k])
+            d[k] = convert_idprops_to_python(value[k], memo)
         return d
 
     # Fallback: just store string representation
     else:
         return str(value)
 
-def export_rig_hierarchy(armature_name, output_path):
-    """
-    Export the hierarchy, constraints, and custom properties of an Armature object into a JSON file.
-    Only constraints of certain types are included:
-        COPY_LOCATION, COPY_ROTATION, COPY_TRANSFORMS, TRANSFORM, STRETCH_TO,
-        ACTION, ARMATURE, CHILD_OF, PIVOT, IK, LIMIT_ROTATION
-    armature_name: Name of the armature object in the scene (string).
-    output_path: File path where the JSON data will be saved (string).
-    """
-
-    # Find the armature object by name
+def get_armature_object(armature_name):
+    """Looks up an armature object by name, raising like export_rig_hierarchy() always did."""
     arm_obj = bpy.data.objects.get(armature_name)
     if arm_obj is None:
         raise ValueError(f"No object named '{armature_name}' found in the current scene.")
 
     if arm_obj.type != 'ARMATURE':
         raise TypeError(f"Object '{arm_obj.name}' is not an Armature.")
+    return arm_obj
 
-    # Define which constraint types to include
-    allowed_constraint_types = {
-        "COPY_LOCATION",
-        "COPY_ROTATION",
-        "COPY_TRANSFORMS",
-        "TRANSFORM",
-        "STRETCH_TO",
-        "ACTION",
-        "ARMATURE",
-        "CHILD_OF",
-        "PIVOT",
-        "IK",
-        "LIMIT_ROTATION",
-        "COPY_SCALE",
-        "LIMIT_DISTANCE",
-        "DAMPED_TRACK"
+
+def get_bone_info(pbone, allowed_constraint_types=ALLOWED_CONSTRAINT_TYPES, memo=None):
+    """
+    The export entry of one pose bone: name, parent, allowed constraints and custom properties.
+    memo is passed to convert_idprops_to_python().
+    """
+    bone_info = {
+        "name": pbone.name,
+        "parent": pbone.parent.name if pbone.parent else None,
+        "constraints": [],
+        "custom_properties": {}
     }
 
+    # Gather only the allowed constraints
+    for c in pbone.constraints:
+        if c.type in allowed_constraint_types:
+            c_info = {
+                "name": c.name,
+                "type": c.type,
+                "influence": c.influence
+            }
+            # What influence.InfluenceGraph needs for IK chains and copy constraints
+            if c.type == "IK":
+                c_info["chain_count"] = c.chain_count
+            target = getattr(c, "target", None)
+            if target is not None:
+                c_info["target"] = target.name
+            if getattr(c, "subtarget", ""):
+                c_info["subtarget"] = c.subtarget
+            bone_info["constraints"].append(c_info)
+
+    # Gather custom properties, converting them to JSON-serializable formats
+    for prop_name in pbone.keys():
+        bone_info["custom_properties"][prop_name] = convert_idprops_to_python(pbone[prop_name], memo)
+    return bone_info
+
+
+def open_export(path, mode="r", binary=None):
+    """
+    Opens a rig export as text. binary=True writes gzip; when reading, gzip is detected from the file.
+    """
+    if binary is None and "r" in mode:
+        with open(path, "rb") as f:
+            binary = f.read(2) == GZIP_MAGIC
+    if binary:
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def load_rig_hierarchy(path):
+    """Reads an export written by export_rig_hierarchy() or export_rig_changes(), gzip or not."""
+    with open_export(path) as f:
+        return json.load(f)
+
+
+def write_rig_hierarchy(f, header, bones, compact=False):
+    """
+    Streams an export: header fields first, then the bones one at a time, so the whole rig is never
+    held as one document. Without compact, the output is the same as json.dump(..., indent=4).
+
+    Parameters:
+        f: A text file.
+        header (dict): The top-level fields written before "bones".
+        bones (iterable): Bone entries (get_bone_info()), consumed lazily.
+        compact (bool): No indentation or spaces, one bone per line.
 
-    # Build the export data structure
-    arm_data = {
+    Returns:
+        int: Number of bones written.
+    """
+    if compact:
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        f.write("{")
+        for key, value in header.items():
+            f.write(f"{dumps(key)}:{dumps(value)},")
+        f.write('"bones":[')
+        count = 0
+        for bone_info in bones:
+            f.write(("\n" if not count else ",\n") + dumps(bone_info))
+            count += 1
+        f.write("]}\n")
+        return count
+
+    # The indenting encoder is pure Python and costly to set up, so bones are encoded a batch at a time
+    dumps = json.JSONEncoder(indent=4).encode
+    f.write("{\n")
+    for key, value in header.items():
+        f.write(f"    {dumps(key)}: {dumps(value).replace(chr(10), chr(10) + '    ')},\n")
+    f.write('    "bones": [')
+    count = 0
+    bones = iter(bones)
+    while True:
+        batch = list(itertools.islice(bones, PRETTY_BATCH_SIZE))
+        if not batch:
+            break
+        # "[\n    {...},\n    {...}\n]" -> the items, indented one level deeper
+        items = dumps(batch)[2:-2].replace("\n", "\n    ")
+        f.write(("\n    " if not count else ",\n    ") + items)
+        count += len(batch)
+    f.write("\n    ]\n}" if count else "]\n}")
+    return count
+
+
+def export_rig_hierarchy(armature_name, output_path, compact=False, binary=False):
+    """
+    Export the hierarchy, constraints, and custom properties of an Armature object into a JSON file.
+    Only constraints of certain types are included (ALLOWED_CONSTRAINT_TYPES):
+        ACTION, ARMATURE, CHILD_OF, COPY_LOCATION, COPY_ROTATION, COPY_SCALE, COPY_TRANSFORMS,
+        DAMPED_TRACK, IK, LIMIT_DISTANCE, LIMIT_ROTATION, PIVOT, STRETCH_TO, TRANSFORM
+    Bones are converted and written one at a time, and ID properties shared between bones are converted once.
+    armature_name: Name of the armature object in the scene (string).
+    output_path: File path where the JSON data will be saved (string).
+    compact: Write without indentation (bool).
+    binary: gzip the JSON (bool). load_rig_hierarchy() reads either.
+    """
+    arm_obj = get_armature_object(armature_name)
+    header = {
         "object_name": arm_obj.name,
-        "possible_constraint_types": list(allowed_constraint_types),
-        "bones": []
+        "possible_constraint_types": list(ALLOWED_CONSTRAINT_TYPES),
     }
+    memo = {}
+    with open_export(output_path, "w", binary) as f:
+        write_rig_hierarchy(f, header, (get_bone_info(pbone, memo=memo) for pbone in arm_obj.pose.bones), compact)
 
-    # Iterate over pose bones
-    for pbone in arm_obj.pose.bones:
-        bone_info = {
-            "name": pbone.name,
-            "parent": pbone.parent.name if pbone.parent else None,
-            "constraints": [],
-            "custom_properties": {}
-        }
+    logger.info("Rig data for '%s' exported to: %s", armature_name, output_path)
 
-        # Gather only the allowed constraints
-        for c in pbone.constraints:
-            if c.type in allowed_constraint_types:
-                c_info = {
-                    "name": c.name,
-                    "type": c.type,
-                    "influence": c.influence
-                }
-                bone_info["constraints"].append(c_info)
 
-        # Gather custom properties, converting them to JSON-serializable formats
-        for prop_name in pbone.keys():
-            value = pbone[prop_name]
-            bone_info["custom_properties"][prop_name] = convert_idprops_to_python(value)
+def export_rig_changes(armature_name, output_path, base_path, compact=False, binary=False):
+    """
+    Exports only the bones that were added, or whose parent, constraints or custom properties changed,
+    since the full export at base_path. Bones missing from the armature are listed in "removed_bones".
+    apply_rig_changes() turns the base and the changes back into a full export.
 
-        arm_data["bones"].append(bone_info)
+    Returns:
+        int: Number of bones written.
+    """
+    arm_obj = get_armature_object(armature_name)
+    base_bones = {bone["name"]: bone for bone in load_rig_hierarchy(base_path)["bones"]}
+    live_names = set(arm_obj.pose.bones.keys())
+    header = {
+        "object_name": arm_obj.name,
+        "possible_constraint_types": list(ALLOWED_CONSTRAINT_TYPES),
+        "base": os.path.basename(base_path),
+        "removed_bones": [bone_name for bone_name in base_bones if bone_name not in live_names],
+    }
+    memo = {}
+    changed = (bone_info for bone_info in (get_bone_info(pbone, memo=memo) for pbone in arm_obj.pose.bones)
+               if base_bones.get(bone_info["name"]) != bone_info)
+    with open_export(output_path, "w", binary) as f:
+        count = write_rig_hierarchy(f, header, changed, compact)
+
+    logger.info("%d changed bones of '%s' exported to: %s", count, armature_name, output_path)
+    return count
 
-    # Write the data to a JSON file
-    with open(output_path, "w") as f:
-        json.dump(arm_data, f, indent=4)
 
-    print(f"Rig data for '{armature_name}' exported to: {output_path}")
+def apply_rig_changes(base, changes):
+    """
+    Merges an export_rig_changes() document into the full export it was taken against.
+    Changed bones replace their old entry in place, new bones are appended and removed bones dropped.
+    """
+    changed = {bone["name"]: bone for bone in changes["bones"]}
+    removed = set(changes.get("removed_bones", ()))
+    bones = [changed.pop(bone["name"], bone) for bone in base["bones"] if bone["name"] not in removed]
+    bones.extend(changed.values())
+    merged = {key: value for key, value in changes.items() if key not in ("base", "removed_bones", "bones")}
+    merged["bones"] = bones
+    return merged
 
 
 def verify_exported_constraints(json_path, armature_name):
@@ -111,16 +265,15 @@ def verify_exported_constraints(json_path, armature_name):
     """
     # Load the exported JSON file
     if not os.path.exists(json_path):
-        print(f"JSON file not found at {json_path}")
+        logger.warning("JSON file not found at %s", json_path)
         return
 
-    with open(json_path, 'r') as f:
-        exported_data = json.load(f)
+    exported_data = load_rig_hierarchy(json_path)
 
     # Get the armature object
     arm_obj = bpy.data.objects.get(armature_name)
     if not arm_obj:
-        print(f"Armature '{armature_name}' not found in the current scene.")
+        logger.warning("Armature '%s' not found in the current scene.", armature_name)
         return
 
     # Create a quick mapping from bone name -> constraints (by name)
@@ -135,17 +288,19 @@ def verify_exported_constraints(json_path, armature_name):
         exported_constraints = [c['name'] for c in bone_data.get('constraints', [])]
 
         if bone_name not in scene_bone_constraints:
-            print(f"Bone '{bone_name}' not found in armature. (Possibly hidden or removed.)")
+            logger.warning("Bone '%s' not found in armature. (Possibly hidden or removed.)", bone_name)
             continue
 
         actual_constraints = scene_bone_constraints[bone_name]
 
         if set(exported_constraints) == set(actual_constraints):
-            print(f"Bone '{bone_name}' constraints match.")
+            logger.debug("Bone '%s' constraints match.", bone_name)
         else:
-            print(f"Bone '{bone_name}' mismatch!\n  Exported: {exported_constraints}\n  Actual:   {actual_constraints}")
+            logger.warning("Bone '%s' mismatch!\n  Exported: %s\n  Actual:   %s", bone_name, exported_constraints,
+                           actual_constraints)
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     # Build the file path in the same directory as the .blend file
     blend_dir = bpy.path.abspath("//")  # directory where the current .blend is located
     json_path = os.path.join(blend_dir, "model_tree.json")
@@ -0,0 +1,152 @@
+import threading
+from collections import deque
+from log_utils import get_logger
+
+logger = get_logger("pipeline")
+
+
+class FeagiPipeline:
+    """
+    Runs FEAGI I/O on a worker thread so Blender's timer callback only touches bpy data.
+
+    The worker thread:
+      - decodes every new OPU message into a ready-to-apply pose command and queues it for the timer.
+      - encodes and sends the gyro frames the timer queued.
+      - sends the ready-made IPU messages other threads queued (vision), so every message to FEAGI leaves
+        from this one thread. ZMQ sockets aren't thread-safe.
+
+    Both queues are bounded deques. When one is full the oldest entry is dropped and counted.
+    Appending and popping a deque are atomic, so neither side takes a lock.
+
+    Parameters:
+        read_message (callable): Returns the latest message from FEAGI, such as pns.message_from_feagi.
+        decode (callable): message -> pose command. Must not touch bpy.
+        send (callable): frame -> None. Encodes and sends one sensor frame to FEAGI. Must not touch bpy.
+        max_commands (int): How many decoded pose commands can wait for the timer.
+        max_frames (int): How many sensor frames can wait to be sent.
+        send_message (callable): message -> None. Sends one IPU message that is already encoded.
+        max_messages (int): How many such messages can wait to be sent.
+        poll_interval (float): Seconds the worker sleeps when there is nothing to do.
+    """
+
+    def __init__(self, read_message, decode, send, max_commands=8, max_frames=4, send_message=None,
+                 max_messages=2, poll_interval=0.001):
+        self.read_message = read_message
+        self.decode = decode
+        self.send = send
+        self.send_message = send_message
+        self.poll_interval = poll_interval
+        self.commands = deque(maxlen=max_commands)
+        self.frames = deque(maxlen=max_frames)
+        self.messages = deque(maxlen=max_messages)
+        self.counters = {
+            "messages_decoded": 0,
+            "commands_applied": 0,
+            "commands_dropped": 0,
+            "frames_sent": 0,
+            "frames_dropped": 0,
+            "messages_sent": 0,
+            "messages_dropped": 0,
+            "errors": 0
+        }
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feagi-io", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # Called from Blender's main thread
+    def drain_commands(self):
+        """Pops every pose command that is ready, oldest first."""
+        drained = []
+        while True:
+            try:
+                drained.append(self.commands.popleft())
+            except IndexError:
+                break
+        self.counters["commands_applied"] += len(drained)
+        return drained
+
+    def submit_frame(self, frame):
+        """Queues a sensor frame for sending. The frame must not be modified afterwards."""
+        if len(self.frames) == self.frames.maxlen:
+            self.counters["frames_dropped"] += 1
+        self.frames.append(frame)
+        self._wake.set()
+
+    def submit_message(self, message):
+        """Queues an encoded IPU message for send_message. Safe to call from any thread."""
+        if len(self.messages) == self.messages.maxlen:
+            self.counters["messages_dropped"] += 1
+        self.messages.append(message)
+        self._wake.set()
+
+    def stats(self):
+        """Queue depths and counters, as a plain dictionary."""
+        stats = dict(self.counters)
+        stats["command_queue_depth"] = len(self.commands)
+        stats["frame_queue_depth"] = len(self.frames)
+        stats["message_queue_depth"] = len(self.messages)
+        stats["running"] = self.is_running()
+        return stats
+
+    # Worker thread
+    def _run(self):
+        last_message = None
+        while not self._stop.is_set():
+            busy = False
+            message = self.read_message()
+            if message and message is not last_message:
+                last_message = message
+                busy = True
+                self._guarded(self._decode_message, message)
+
+            while self.frames:
+                busy = True
+                self._guarded(self._send_frame, self.frames.popleft())
+
+            while self.messages:
+                busy = True
+                self._guarded(self._send_message, self.messages.popleft())
+
+            if not busy:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _decode_message(self, message):
+        command = self.decode(message)
+        self.counters["messages_decoded"] += 1
+        if command:
+            if len(self.commands) == self.commands.maxlen:
+                self.counters["commands_dropped"] += 1
+            self.commands.append(command)
+
+    def _send_frame(self, frame):
+        self.send(frame)
+        self.counters["frames_sent"] += 1
+
+    def _send_message(self, message):
+        self.send_message(message)
+        self.counters["messages_sent"] += 1
+
+    def _guarded(self, function, argument):
+        try:
+            function(argument)
+        except Exception:
+            self.counters["errors"] += 1
+            logger.exception("FEAGI worker failed in %s", function.__name__)
@@ -0,0 +1,241 @@
+"""
+Sidecar mode: the feagi_connector client runs in its own Python process, and Blender only reads servo targets
+from and writes gyro rows to shared memory (shared_buffers.SharedArray, double-buffered with sequence counters).
+
+The controller starts the sidecar itself. To run one by hand, against FEAGI or the built-in fake:
+
+    python controller/pose_bus.py --spec '<json spec>' [--fake-feagi]
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import shared_buffers
+from log_utils import get_logger
+
+logger = get_logger("pose_bus")
+
+# One gyro row on the bus. The key has its own int32 field: in a float32 column keys above 2**24 would round.
+GYRO_ROW = np.dtype([("key", np.int32), ("rotation", np.float32, 3)])
+
+
+class PoseBus:
+    """
+    Blender's end of the bus. Owns the two segments and the sidecar process.
+
+      - servo: float32 (servo_count,), the newest value FEAGI sent for every servo index, NaN if never sent.
+        Written by the sidecar.
+      - gyro: GYRO_ROW (gyro_capacity,), one (gyro key, [x, y, z]) row per bone, key -1 for unused rows.
+        Written by Blender.
+
+    Parameters:
+        servo_count (int): Highest FEAGI servo index + 1.
+        gyro_capacity (int): Most gyro rows a frame can carry.
+        config_dir (str): The controller folder, for the sidecar's feagi_connector configuration.
+        fake_feagi (bool): Run the sidecar against FakeFeagi instead of FEAGI.
+        python (str): Interpreter for the sidecar. Defaults to this one (Blender's Python inside Blender).
+    """
+
+    def __init__(self, servo_count, gyro_capacity, config_dir, fake_feagi=False, python=None):
+        prefix = f"feagi_bus_{os.getpid()}"
+        self.servo = shared_buffers.SharedArray(f"{prefix}_servo", (servo_count,), create=True)
+        self.gyro = shared_buffers.SharedArray(f"{prefix}_gyro", (gyro_capacity,), dtype=GYRO_ROW, create=True)
+        self.config_dir = config_dir
+        self.fake_feagi = fake_feagi
+        self.python = python or sys.executable
+        self.targets = np.empty(servo_count, dtype=np.float32)
+        self.applied = np.full(servo_count, np.nan, dtype=np.float32)
+        self.gyro_rows = np.zeros(gyro_capacity, dtype=GYRO_ROW)
+        self.gyro_rows["key"] = -1
+        self.process = None
+        self.counters = {"servo_reads": 0, "servo_values": 0, "gyro_frames": 0, "gyro_rows_truncated": 0}
+
+    def spec(self):
+        """What the sidecar needs, passed on its command line."""
+        return {"servo": self.servo.name, "servo_count": len(self.targets), "gyro": self.gyro.name,
+                "gyro_capacity": len(self.gyro_rows), "config_dir": self.config_dir, "parent_pid": os.getpid()}
+
+    def start(self):
+        command = [self.python, os.path.abspath(__file__), "--spec", json.dumps(self.spec())]
+        if self.fake_feagi:
+            command.append("--fake-feagi")
+        self.process = subprocess.Popen(command)
+        logger.info("FEAGI sidecar started, pid %d%s", self.process.pid, " (fake FEAGI)" if self.fake_feagi else "")
+
+    def read_servo(self):
+        """
+        {FEAGI index: value} of every servo whose target changed since the last call, or {} if nothing did.
+        Shaped like actuators.get_servo_data(), so controller.collect_bone_rotations() can route it.
+        """
+        if self.servo.read(self.targets) is None:
+            return {}
+        changed = np.flatnonzero(~np.isnan(self.targets) & (self.targets != self.applied))
+        self.applied[changed] = self.targets[changed]
+        self.counters["servo_reads"] += 1
+        self.counters["servo_values"] += len(changed)
+        return dict(zip(changed.tolist(), self.targets[changed].tolist()))
+
+    def publish_gyro(self, frame):
+        """Writes a gyro.GyroFrame (or a subset of one) for the sidecar to send."""
+        keys, rows = frame.index_rows()
+        count = min(len(keys), len(self.gyro_rows))
+        if count < len(keys):
+            self.counters["gyro_rows_truncated"] += len(keys) - count
+        self.gyro_rows["key"][:count] = keys[:count]
+        self.gyro_rows["rotation"][:count] = frame.array[rows[:count]]
+        self.gyro_rows["key"][count:] = -1
+        self.gyro.write(self.gyro_rows)
+        self.counters["gyro_frames"] += 1
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats["sidecar_alive"] = self.process is not None and self.process.poll() is None
+        return stats
+
+    def stop(self, timeout=5.0):
+        """Closes the segments, which tells the sidecar to exit, and waits for it."""
+        self.servo.close()
+        self.gyro.close()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                logger.warning("FEAGI sidecar didn't exit, terminating it")
+                self.process.terminate()
+            self.process = None
+
+
+class FeagiClient:
+    """The sidecar's FEAGI side: connects with feagi_connector, decodes servo data and sends gyro."""
+
+    def __init__(self, config_dir):
+        from feagi_connector import actuators
+        from feagi_connector import sensors
+        from feagi_connector import pns_gateway as pns
+        from feagi_connector import feagi_interface as feagi
+        from feagi_connector.version import __version__
+
+        self.actuators = actuators
+        self.sensors = sensors
+        self.pns = pns
+        config = feagi.build_up_from_configuration(config_dir)
+        self.agent_settings = config['agent_settings'].copy()
+        self.capabilities = config['capabilities'].copy()
+        self.message_to_feagi = config['message_to_feagi'].copy()
+        self.feagi_settings, _, _, self.feagi_ipu_channel, _ = \
+            feagi.connect_to_feagi(config['feagi_settings'].copy(), {}, self.agent_settings, self.capabilities,
+                                   __version__)
+        self.last_message = None
+
+    def receive(self):
+        """{FEAGI index: value} of the newest OPU message, or None if there is no new one."""
+        message = self.pns.message_from_feagi
+        if not message or message is self.last_message:
+            return None
+        self.last_message = message
+        self.pns.check_genome_status_no_vision(message)
+        obtained_data = self.pns.obtain_opu_data(message)
+        servo_data = {}
+        for received in (self.actuators.get_servo_position_data(obtained_data),
+                         self.actuators.get_servo_data(obtained_data)):
+            if received:
+                servo_data.update(received)
+        return servo_data
+
+    def send_gyro(self, gyro_data):
+        message = self.sensors.create_data_for_feagi('gyro', self.capabilities, self.message_to_feagi,
+                                                     current_data=gyro_data, symmetric=True, measure_enable=True)
+        self.pns.signals_to_feagi(message, self.feagi_ipu_channel, self.agent_settings, self.feagi_settings)
+        self.message_to_feagi.clear()
+
+
+class FakeFeagi:
+    """
+    Stands in for FEAGI when testing the bus: sends every servo a slow sine wave at burst_rate and counts the
+    gyro frames it gets back.
+    """
+
+    def __init__(self, servo_count, burst_rate=30.0, amplitude=0.5, period=4.0, clock=time.perf_counter):
+        self.servo_count = servo_count
+        self.interval = 1.0 / burst_rate
+        self.amplitude = amplitude
+        self.period = period
+        self.clock = clock
+        self.start = clock()
+        self.next_burst = self.start
+        self.phases = np.linspace(0.0, 2.0 * math.pi, servo_count, endpoint=False)
+        self.counters = {"bursts": 0, "gyro_frames": 0, "gyro_rows": 0}
+
+    def receive(self):
+        now = self.clock()
+        if now < self.next_burst:
+            return None
+        self.next_burst = max(self.next_burst + self.interval, now)
+        self.counters["bursts"] += 1
+        values = self.amplitude * np.sin(2.0 * math.pi * (now - self.start) / self.period + self.phases)
+        return dict(enumerate(values.tolist()))
+
+    def send_gyro(self, gyro_data):
+        self.counters["gyro_frames"] += 1
+        self.counters["gyro_rows"] += len(gyro_data)
+
+
+def run_sidecar(spec, client, poll_interval=0.001, stats_interval=10.0):
+    """
+    The sidecar's loop: FEAGI servo data into the servo segment, the gyro segment out to FEAGI, until
+    Blender closes the bus (or exits).
+    """
+    servo = shared_buffers.SharedArray(spec["servo"], (spec["servo_count"],))
+    gyro = shared_buffers.SharedArray(spec["gyro"], (spec["gyro_capacity"],), dtype=GYRO_ROW)
+    targets = np.full(spec["servo_count"], np.nan, dtype=np.float32)
+    gyro_rows = np.empty(spec["gyro_capacity"], dtype=GYRO_ROW)
+    last_stats = time.monotonic()
+    logger.info("FEAGI sidecar ready: %d servos, %d gyro rows", spec["servo_count"], spec["gyro_capacity"])
+
+    while not servo.closed:
+        busy = False
+        servo_data = client.receive()
+        if servo_data:
+            indexes = np.fromiter(servo_data.keys(), dtype=np.int64, count=len(servo_data))
+            values = np.fromiter(servo_data.values(), dtype=np.float32, count=len(servo_data))
+            in_range = (indexes >= 0) & (indexes < len(targets))
+            targets[indexes[in_range]] = values[in_range]
+            servo.write(targets)
+            busy = True
+        if gyro.read(gyro_rows) is not None:
+            used = gyro_rows[gyro_rows["key"] >= 0]
+            client.send_gyro(dict(zip(map(str, used["key"].tolist()), used["rotation"].tolist())))
+            busy = True
+        if hasattr(client, "counters") and time.monotonic() - last_stats >= stats_interval:
+            last_stats = time.monotonic()
+            logger.info("FEAGI sidecar: %s", client.counters)
+        if not busy:
+            if spec.get("parent_pid") and os.getppid() != spec["parent_pid"]:
+                logger.warning("Blender exited without closing the bus")
+                break
+            time.sleep(poll_interval)
+    servo.close()
+    gyro.close()
+    logger.info("FEAGI sidecar stopped")
+
+
+if __name__ == "__main__":
+    import log_utils
+
+    log_utils.setup_logging()
+    parser = argparse.ArgumentParser(description="FEAGI client sidecar for the Blender connector")
+    parser.add_argument("--spec", required=True, help="JSON spec from PoseBus")
+    parser.add_argument("--fake-feagi", action="store_true", help="Drive servos with FakeFeagi instead of FEAGI")
+    arguments = parser.parse_args()
+    bus_spec = json.loads(arguments.spec)
+    run_sidecar(bus_spec, FakeFeagi(bus_spec["servo_count"]) if arguments.fake_feagi else
+                FeagiClient(bus_spec["config_dir"]))
@@ -0,0 +1,395 @@
+import json
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import bpy
+import numpy as np
+
+import registry
+import starter
+from log_utils import get_logger
+
+logger = get_logger("recorder")
+
+LOG_MAGIC = b"FGPR"
+LOG_VERSION = 1
+
+_FILE_HEADER = struct.Struct("<4sI")  # magic, version
+_RECORD_HEADER = struct.Struct("<4sQ")  # tag, payload size
+_CHUNK_HEADER = struct.Struct("<III")  # frames, servo bones, gyro rows
+
+LAYOUT_TAG = b"LAYO"  # JSON: {"bones": [[armature, bone], ...], "gyro_bones": [...], "started": epoch seconds}
+CHUNK_TAG = b"CHNK"  # _CHUNK_HEADER, times float64[frames], servo float32[frames, bones, 3],
+                     # gyro float32[frames, gyro rows, 3]
+COMPRESSED_CHUNK_TAG = b"CHNZ"  # CHNK payload, zlib compressed
+
+
+class PoseRecorder:
+    """
+    Records what FEAGI drove during a session: the servo rotations applied in each burst and the gyro sample,
+    into a chunked binary log.
+
+    Frames go into a preallocated chunk. A full chunk is handed to a writer thread, so the timer never
+    touches the disk or blocks on it. At most max_pending_chunks wait for the writer; past that whole chunks
+    are dropped and counted, so memory stays bounded no matter how long the session runs.
+
+    Each chunk carries the layout it was recorded with, and the writer writes that layout first whenever it
+    changes. A layout can't be dropped, even when the chunks around it are.
+
+    Axes that weren't driven in a burst, and gyro rows of bursts without a gyro sample, are NaN.
+
+    Parameters:
+        path (str): Log file. Replaced if it exists.
+        chunk_frames (int): Frames per chunk.
+        max_pending_chunks (int): Chunks that can wait for the writer thread.
+        flush_interval (float): Seconds after which a partly filled chunk is written anyway, so a crash
+                                loses at most that much.
+        compress (bool): zlib-compress chunks on the writer thread. Undriven (NaN) axes compress very well.
+        clock (callable): Seconds, monotonic.
+    """
+
+    def __init__(self, path, chunk_frames=256, max_pending_chunks=8, flush_interval=1.0, compress=True,
+                 clock=time.perf_counter):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.bones = []
+        self.gyro_bones = []
+        self.counters = {
+            "frames_recorded": 0,
+            "frames_dropped": 0,
+            "chunks_written": 0,
+            "bytes_written": 0,
+            "errors": 0
+        }
+        self.max_pending_chunks = max_pending_chunks
+        self._queue = queue.Queue(maxsize=max_pending_chunks)
+        self._layout = None  # payload of the layout the buffered frames belong to
+        self._file = None
+        self._thread = None
+        self._finishing = None  # a stopped writer thread that was still busy
+        self._stopping = threading.Event()
+        self._started = None
+        self._chunk_started = None
+        self._new_chunk()
+
+    def start(self):
+        """Opens the log and starts the writer thread."""
+        if self._thread is not None:
+            return
+        if self._finishing is not None:
+            self._finishing.join()  # it still writes and closes the previous log
+            self._finishing = None
+        self._stopping.clear()
+        self._queue = queue.Queue(maxsize=self.max_pending_chunks)
+        self._file = open(self.path, "wb")
+        self._file.write(_FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+        self._started = self.clock()
+        self._layout = self._layout_payload()
+        self._thread = threading.Thread(target=self._run, name="pose-recorder", daemon=True)
+        self._thread.start()
+        logger.info("Recording FEAGI session to %s", self.path)
+
+    def stop(self, timeout=5.0):
+        """
+        Writes what is buffered and stops the writer thread, which closes the log once the queued chunks are
+        written. Waits at most timeout seconds for that; a writer still busy after it finishes on its own.
+        """
+        if self._thread is None:
+            return
+        self.flush()
+        self._stopping.set()
+        try:
+            self._queue.put(None, timeout=timeout)  # wakes the writer; if the queue stays full it sees _stopping
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Recorder writer still busy after %g s, it closes %s when done", timeout, self.path)
+            self._finishing = self._thread
+        self._thread = None
+        logger.info("Recording stopped: %d frames, %d dropped, %d bytes", self.counters["frames_recorded"],
+                    self.counters["frames_dropped"], self.counters["bytes_written"])
+
+    def is_recording(self):
+        return self._thread is not None
+
+    def set_layout(self, bones, gyro_bones=()):
+        """
+        Declares what the servo and gyro rows of the next frames are.
+
+        Parameters:
+            bones (list): servo row -> (armature name, bone name), such as the routing table's bone slots.
+            gyro_bones (list): gyro row -> (armature name, bone name), see gyro.GyroSampler.row_bones().
+        """
+        bones = [tuple(bone) for bone in bones]
+        gyro_bones = [tuple(bone) for bone in gyro_bones]
+        if bones == self.bones and gyro_bones == self.gyro_bones:
+            return
+        self.flush()
+        self.bones = bones
+        self.gyro_bones = gyro_bones
+        self._layout = self._layout_payload()
+        self._new_chunk()
+
+    def record(self, bone_rotations=None, gyro_values=None, timestamp=None):
+        """
+        Adds one burst. Cheap enough to call from the timer.
+
+        Parameters:
+            bone_rotations (dict): servo row -> [x, y, z], None for axes that weren't driven. May be None.
+            gyro_values (numpy.ndarray): (gyro rows, 3) sample, copied. May be None.
+            timestamp (float): Seconds since start(). Defaults to now.
+        """
+        if self._thread is None:
+            return
+        now = self.clock()
+        row = self._frame_count
+        self._times[row] = (now - self._started) if timestamp is None else timestamp
+        servo = self._servo[row]
+        servo.fill(np.nan)
+        if bone_rotations:
+            for slot, new_ryp in bone_rotations.items():
+                for axis, value in enumerate(new_ryp):
+                    if value is not None:
+                        servo[slot, axis] = value
+        if gyro_values is not None and len(gyro_values) == len(self.gyro_bones):
+            self._gyro[row] = gyro_values
+        else:
+            self._gyro[row].fill(np.nan)
+        self._frame_count += 1
+        self.counters["frames_recorded"] += 1
+
+        if self._frame_count == self.chunk_frames or now - self._chunk_started >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Hands the frames recorded so far to the writer thread."""
+        count = self._frame_count
+        if not count or self._thread is None:
+            return
+        header = _CHUNK_HEADER.pack(count, len(self.bones), len(self.gyro_bones))
+        sections = [header, self._times[:count], self._servo[:count], self._gyro[:count]]
+        try:
+            self._queue.put_nowait((self._layout, sections))
+        except queue.Full:
+            self.counters["frames_dropped"] += count
+            self._frame_count = 0  # reuse the buffers, the writer can't keep up
+            self._chunk_started = self.clock()
+            return
+        self._new_chunk()
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats["pending_chunks"] = self._queue.qsize()
+        stats["recording"] = self.is_recording()
+        return stats
+
+    def _layout_payload(self):
+        return json.dumps({"bones": self.bones, "gyro_bones": self.gyro_bones, "started": time.time()}).encode("utf-8")
+
+    def _new_chunk(self):
+        # Fresh buffers: the previous ones belong to the writer thread now
+        self._times = np.zeros(self.chunk_frames, dtype=np.float64)
+        self._servo = np.zeros((self.chunk_frames, len(self.bones), 3), dtype=np.float32)
+        self._gyro = np.zeros((self.chunk_frames, len(self.gyro_bones), 3), dtype=np.float32)
+        self._frame_count = 0
+        self._chunk_started = self.clock()
+
+    # Writer thread
+    def _run(self):
+        try:
+            self._write_chunks()
+        finally:
+            self._file.close()
+
+    def _write_chunks(self, poll_interval=0.1):
+        written_layout = None
+        while True:
+            try:
+                item = self._queue.get(timeout=poll_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            if item is None:
+                break
+            layout, sections = item
+            try:
+                if layout is not written_layout:
+                    self._write_record(LAYOUT_TAG, [layout])
+                    written_layout = layout
+                payload = [section if isinstance(section, bytes) else np.ascontiguousarray(section).tobytes()
+                           for section in sections]
+                tag = CHUNK_TAG
+                if self.compress:
+                    tag = COMPRESSED_CHUNK_TAG
+                    payload = [zlib.compress(b"".join(payload), 1)]
+                self._write_record(tag, payload)
+                self.counters["chunks_written"] += 1
+            except Exception:
+                self.counters["errors"] += 1
+                logger.exception("Writing %s failed", self.path)
+
+    def _write_record(self, tag, payload):
+        size = sum(len(part) for part in payload)
+        self._file.write(_RECORD_HEADER.pack(tag, size))
+        for part in payload:
+            self._file.write(part)
+        self._file.flush()
+        self.counters["bytes_written"] += _RECORD_HEADER.size + size
+
+
+class PoseReplayer:
+    """
+    Reads a PoseRecorder log back one chunk at a time, so the whole session is never in memory.
+
+    Parameters:
+        path (str): Log file written by PoseRecorder.
+        armature_registry (registry.ArmatureRegistry): Where pose bones are looked up. Defaults to the shared one.
+    """
+
+    def __init__(self, path, armature_registry=None):
+        self.path = path
+        self.armature_registry = armature_registry
+        self._timer = None
+
+    def chunks(self):
+        """Yields (layout, times, servo, gyro) per chunk. servo is (frames, bones, 3), gyro (frames, rows, 3)."""
+        layout = {"bones": [], "gyro_bones": []}
+        with open(self.path, "rb") as f:
+            magic, version = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+            if magic != LOG_MAGIC or version != LOG_VERSION:
+                raise ValueError(f"{self.path} is not a version {LOG_VERSION} pose log")
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    return
+                tag, size = _RECORD_HEADER.unpack(header)
+                payload = f.read(size)
+                if len(payload) < size:
+                    logger.warning("%s ends with a partial record, ignored", self.path)
+                    return
+                if tag == LAYOUT_TAG:
+                    layout = json.loads(payload.decode("utf-8"))
+                    continue
+                if tag == COMPRESSED_CHUNK_TAG:
+                    payload = zlib.decompress(payload)
+                    tag = CHUNK_TAG
+                if tag == CHUNK_TAG:
+                    frames, bone_count, gyro_rows = _CHUNK_HEADER.unpack_from(payload, 0)
+                    offset = _CHUNK_HEADER.size
+                    times = np.frombuffer(payload, dtype=np.float64, count=frames, offset=offset)
+                    offset += times.nbytes
+                    servo = np.frombuffer(payload, dtype=np.float32, count=frames * bone_count * 3, offset=offset)
+                    offset += servo.nbytes
+                    gyro = np.frombuffer(payload, dtype=np.float32, count=frames * gyro_rows * 3, offset=offset)
+                    yield layout, times, servo.reshape(frames, bone_count, 3), gyro.reshape(frames, gyro_rows, 3)
+
+    def frames(self):
+        """Yields (layout, time, servo, gyro) per recorded burst."""
+        for layout, times, servo, gyro in self.chunks():
+            for row in range(len(times)):
+                yield layout, float(times[row]), servo[row], gyro[row]
+
+    def resolve(self, layout):
+        """Pose bone for every servo row of a layout, None where the armature or bone is gone."""
+        armature_registry = self._registry()
+        return [armature_registry.pose_bone(armature_name, bone_name) for armature_name, bone_name in layout["bones"]]
+
+    def apply(self, pose_bones, servo):
+        """Writes one frame's driven axes onto the bones. Returns the number of bones written."""
+        driven = np.isfinite(servo)
+        rows = np.flatnonzero(driven.any(axis=1))
+        values = servo.tolist()
+        mask = driven.tolist()
+        return starter.write_bone_rotations(
+            (pose_bones[row], [value if axis_driven else None for value, axis_driven in zip(values[row], mask[row])])
+            for row in rows.tolist() if pose_bones[row] is not None)
+
+    def play(self, speed=1.0):
+        """
+        Streams the log into the armatures in real time, from a bpy.app.timers callback.
+        Frames that are due together are applied in order within one tick. Returns immediately.
+        """
+        self.stop()
+        frames = self.frames()
+        state = {"next": next(frames, None), "layout": None, "bones": None, "started": time.perf_counter()}
+
+        def _replay_tick():
+            now = (time.perf_counter() - state["started"]) * speed
+            frame = state["next"]
+            while frame is not None and frame[1] <= now:
+                layout, _, servo, _ = frame
+                if layout is not state["layout"]:
+                    state["layout"] = layout
+                    state["bones"] = self.resolve(layout)
+                self.apply(state["bones"], servo)
+                frame = next(frames, None)
+            state["next"] = frame
+            if frame is None:
+                self._timer = None
+                logger.info("Replay of %s finished", self.path)
+                return None
+            return max(0.0, (frame[1] - now) / speed)
+
+        self._timer = _replay_tick
+        bpy.app.timers.register(_replay_tick)
+
+    def _registry(self):
+        return self.armature_registry if self.armature_registry is not None else registry.default_registry
+
+    def stop(self):
+        """Stops a replay started with play()."""
+        if self._timer is not None and bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        self._timer = None
+
+    def bake(self, start_frame=1, fps=None, batch_frames=4096):
+        """
+        Bakes the servo rotations into rotation_euler F-curves of each armature's action with
+        starter.bake_bone_channels(). Chunks are collected into batches of batch_frames and appended
+        to the F-curves batch by batch, so memory stays bounded for long sessions.
+
+        Parameters:
+            start_frame (int): Scene frame of the first recorded burst.
+            fps (float): Scene frames per recorded second. Defaults to the scene's frame rate.
+            batch_frames (int): Frames kept in memory before they are written to the F-curves.
+
+        Returns:
+            int: Number of keyframes added.
+        """
+        if fps is None:
+            render = bpy.context.scene.render
+            fps = render.fps / render.fps_base
+        keys_added = 0
+        batch = []
+        batch_layout = None
+        for layout, times, servo, _ in self.chunks():
+            if batch and (layout is not batch_layout or sum(len(chunk[0]) for chunk in batch) >= batch_frames):
+                keys_added += self._bake_batch(batch_layout, batch, start_frame, fps)
+                batch = []
+            batch_layout = layout
+            batch.append((times, servo))
+        if batch:
+            keys_added += self._bake_batch(batch_layout, batch, start_frame, fps)
+        logger.info("Baked %d keyframes from %s", keys_added, self.path)
+        return keys_added
+
+    def _bake_batch(self, layout, batch, start_frame, fps):
+        frames = start_frame + np.concatenate([times for times, _ in batch]) * fps
+        servo = np.concatenate([servo for _, servo in batch])
+        columns = {}  # armature name -> ([bone names], [servo rows])
+        for row, (armature_name, bone_name) in enumerate(layout["bones"]):
+            bone_names, rows = columns.setdefault(armature_name, ([], []))
+            bone_names.append(bone_name)
+            rows.append(row)
+        keys_added = 0
+        for armature_name, (bone_names, rows) in columns.items():
+            keys_added += starter.bake_bone_channels(armature_name, bone_names, servo[:, rows], frames)
+        return keys_added
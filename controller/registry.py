@@ -0,0 +1,219 @@
+import bpy
+
+from log_utils import get_logger
+
+logger = get_logger("registry")
+
+
+class ArmatureRegistry:
+    """
+    Resolves armature objects and pose bones once and keeps them in index-addressed lists,
+    so hot paths never look objects or bones up by name.
+
+    Handles stay valid across bursts. on_depsgraph_update() (see install_handlers()) marks the entries
+    affected by renames, additions, deletions and bone edits, and refresh() re-resolves only those.
+    Every time a handle changes, `generation` goes up, so tables built from the handles
+    (routing.RoutingTable, gyro.GyroSampler) know when to rebuild.
+
+    Attributes:
+        armature_names (list): armature slot -> object name
+        armatures (list): armature slot -> armature object, or None while it is missing
+        bones (list): armature slot -> list of pose bones, in pose.bones order
+        bone_names (list): armature slot -> list of bone names, same order as bones
+        generation (int): Increases whenever any handle changed.
+    """
+
+    def __init__(self):
+        self.armature_names = []
+        self.armatures = []
+        self.bones = []
+        self.bone_names = []
+        self.generation = 0
+        self._armature_slots = {}  # name -> armature slot
+        self._bone_indexes = []  # armature slot -> {bone name: bone index}
+        self._object_pointers = {}  # object pointer -> armature slot
+        self._data_pointers = {}  # armature data pointer -> armature slot
+        self._dirty = set()
+        self._check_all = False
+
+    def __len__(self):
+        return len(self.armature_names)
+
+    def register(self, armature_name):
+        """Returns the slot for an armature name, resolving it the first time."""
+        slot = self._armature_slots.get(armature_name)
+        if slot is not None:
+            return slot
+        slot = len(self.armature_names)
+        self._armature_slots[armature_name] = slot
+        self.armature_names.append(armature_name)
+        self.armatures.append(None)
+        self.bones.append([])
+        self.bone_names.append([])
+        self._bone_indexes.append({})
+        self._resolve(slot)
+        return slot
+
+    def slot(self, armature_name):
+        return self._armature_slots.get(armature_name)
+
+    def armature(self, armature_name):
+        """
+        Returns the armature object with this name, or None. A name asked about for the first time is only
+        registered if it is an armature, so typos and other objects don't take up slots. Use register()
+        to track a name that doesn't exist yet.
+        """
+        slot = self._armature_slots.get(armature_name)
+        if slot is None:
+            candidate = bpy.data.objects.get(armature_name)
+            if candidate is None or candidate.type != 'ARMATURE':
+                return None
+            slot = self.register(armature_name)
+        armature_obj = self.armatures[slot]
+        # A missing armature is looked up again by refresh(), after the depsgraph reports new objects
+        if armature_obj is not None and not _is_alive(armature_obj, self.armature_names[slot]):
+            self._resolve(slot)
+            armature_obj = self.armatures[slot]
+        return armature_obj
+
+    def pose_bone(self, armature_name, bone_name):
+        """Returns the pose bone handle, or None if the armature or bone doesn't exist."""
+        armature_obj = self.armature(armature_name)
+        if armature_obj is None:
+            return None
+        slot = self._armature_slots[armature_name]  # armature() registered it
+        bone_index = self._bone_indexes[slot].get(bone_name)
+        if bone_index is None:
+            # Bone added or renamed without a depsgraph update reaching us
+            if armature_obj.pose.bones.get(bone_name) is None:
+                return None
+            self._resolve(slot)
+            bone_index = self._bone_indexes[slot].get(bone_name)
+        return self.bones[slot][bone_index]
+
+    def bone_index(self, armature_slot, bone_name):
+        return self._bone_indexes[armature_slot].get(bone_name)
+
+    def invalidate(self, armature_slot=None):
+        """Marks one armature (or all of them) to be re-resolved on the next refresh()."""
+        if armature_slot is None:
+            self._check_all = True
+        else:
+            self._dirty.add(armature_slot)
+
+    def refresh(self):
+        """
+        Re-resolves the entries marked by invalidate() or the depsgraph handler.
+        Cheap when nothing is marked. Returns True if any handle changed.
+        """
+        if not self._dirty and not self._check_all:
+            return False
+        generation = self.generation
+        if self._check_all:
+            for slot in range(len(self.armature_names)):
+                if not self._is_current(slot):
+                    self._dirty.add(slot)
+            self._check_all = False
+        dirty, self._dirty = self._dirty, set()
+        for slot in dirty:
+            self._resolve(slot)
+        return self.generation != generation
+
+    def _is_current(self, slot):
+        """True if the slot still holds the object that bpy.data.objects has under the slot's name."""
+        armature_obj = self.armatures[slot]
+        current = bpy.data.objects.get(self.armature_names[slot])
+        if armature_obj is None or current is None:
+            return armature_obj is None and current is None
+        return _is_alive(armature_obj) and armature_obj.as_pointer() == current.as_pointer()
+
+    def on_depsgraph_update(self, scene=None, depsgraph=None):
+        """bpy.app.handlers.depsgraph_update_post callback. Only marks entries; refresh() does the work."""
+        if depsgraph is None:
+            self._check_all = True
+            return
+        for update in depsgraph.updates:
+            id_data = getattr(update.id, "original", update.id)
+            id_type = getattr(id_data, "id_type", None)
+            if id_type == 'OBJECT':
+                slot = self._object_pointers.get(id_data.as_pointer())
+                if slot is None:
+                    # A new object, or one that was renamed to a name we track
+                    slot = self._armature_slots.get(id_data.name)
+                    if slot is not None:
+                        self._dirty.add(slot)
+                elif id_data.name != self.armature_names[slot] or \
+                        len(id_data.pose.bones) != len(self.bones[slot]):
+                    self._dirty.add(slot)
+            elif id_type == 'ARMATURE':  # bones added, removed or renamed
+                slot = self._data_pointers.get(id_data.as_pointer())
+                if slot is not None:
+                    self._dirty.add(slot)
+            elif id_type in ('SCENE', 'COLLECTION'):  # objects linked or removed
+                self._check_all = True
+
+    def _resolve(self, slot):
+        name = self.armature_names[slot]
+        old_obj = self.armatures[slot]
+        armature_obj = None
+
+        # An object we track may have been renamed: follow it and keep the slot.
+        # The old name stays mapped to the slot, so tables keyed by it (model_list) keep working.
+        if old_obj is not None and _is_alive(old_obj):
+            if old_obj.name != name and old_obj.name not in self._armature_slots:
+                name = old_obj.name
+                self._armature_slots[name] = slot
+                self.armature_names[slot] = name
+                logger.info("Armature renamed to '%s'", name)
+        candidate = bpy.data.objects.get(name)
+        if candidate is not None and candidate.type == 'ARMATURE':
+            armature_obj = candidate
+
+        if armature_obj is None and old_obj is None:
+            return  # still missing
+        bone_names = [bone.name for bone in armature_obj.pose.bones] if armature_obj is not None else []
+        if armature_obj is not None and old_obj is not None and _is_alive(old_obj) and \
+                old_obj.as_pointer() == armature_obj.as_pointer() and bone_names == self.bone_names[slot]:
+            return  # nothing changed
+
+        for pointers in (self._object_pointers, self._data_pointers):
+            for pointer in [pointer for pointer, owner in pointers.items() if owner == slot]:
+                del pointers[pointer]
+        self.armatures[slot] = armature_obj
+        self.bone_names[slot] = bone_names
+        self.bones[slot] = list(armature_obj.pose.bones) if armature_obj is not None else []
+        self._bone_indexes[slot] = {bone_name: index for index, bone_name in enumerate(bone_names)}
+        if armature_obj is not None:
+            self._object_pointers[armature_obj.as_pointer()] = slot
+            self._data_pointers[armature_obj.data.as_pointer()] = slot
+        else:
+            logger.warning("Armature '%s' not found in bpy.data.objects", name)
+        self.generation += 1
+
+
+def _is_alive(armature_obj, expected_name=None):
+    """False once Blender freed the object (ReferenceError) or, if given, when its name changed."""
+    try:
+        name = armature_obj.name
+    except ReferenceError:
+        return False
+    return expected_name is None or name == expected_name
+
+
+def install_handlers(armature_registry):
+    """Hooks the registry to depsgraph updates and file loads. Replaces handlers from a previous run."""
+    handlers = bpy.app.handlers
+    for handler_list in (handlers.depsgraph_update_post, handlers.load_post):
+        for handler in list(handler_list):
+            if getattr(handler, "__name__", "") == "_armature_registry_handler":
+                handler_list.remove(handler)
+
+    def _armature_registry_handler(scene=None, depsgraph=None):
+        armature_registry.on_depsgraph_update(scene, depsgraph)
+
+    handlers.depsgraph_update_post.append(_armature_registry_handler)
+    handlers.load_post.append(_armature_registry_handler)
+
+
+# Shared by starter's name-based functions and the controller
+default_registry = ArmatureRegistry()
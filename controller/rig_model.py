@@ -0,0 +1,264 @@
+import hashlib
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from log_utils import get_logger
+from model_tree import load_rig_hierarchy
+
+logger = get_logger("rig_model")
+
+# What RigModel.diff() reports, as lists of bone names
+RigDiff = namedtuple("RigDiff", ("added", "removed", "reparented", "constraints_changed", "properties_changed"))
+
+
+def constraints_digest(constraints):
+    """64-bit digest of a bone's exported constraint list. Order matters, like it does in Blender."""
+    return _digest(constraints)
+
+
+def properties_digest(custom_properties):
+    """64-bit digest of a bone's exported custom properties. Key order doesn't matter."""
+    return _digest(custom_properties)
+
+
+def _digest(value):
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "little")
+
+
+class RigModel:
+    """
+    A model_tree.json export as flat arrays, usable without Blender.
+
+    Bones keep their export (pose.bones) order. Everything per bone is an array indexed by that order;
+    everything per constraint is stored CSR-style, bone b owning rows constraint_offsets[b]:constraint_offsets[b + 1].
+
+    Attributes:
+        object_name (str): The exported armature.
+        bone_names (list): bone index -> name.
+        index (dict): bone name -> bone index.
+        parents (numpy.ndarray): int32, bone index -> parent index, -1 for roots (and unknown parents).
+        order (numpy.ndarray): int32, bone indexes in depth-first pre-order. Parents come before their
+                               children and every subtree is a contiguous run.
+        depth (numpy.ndarray): int32, bone index -> number of ancestors.
+        constraint_types (list): constraint code -> constraint type, e.g. "IK".
+        constraint_offsets (numpy.ndarray): int32, (bones + 1) CSR offsets into the constraint arrays.
+        constraint_codes (numpy.ndarray): int16, constraint row -> code in constraint_types.
+        constraint_influence (numpy.ndarray): float32, constraint row -> influence.
+        constraint_subtargets (numpy.ndarray): int32, constraint row -> subtarget bone index in this armature,
+                                               -1 if none or on another object.
+        constraint_chain_counts (numpy.ndarray): int32, constraint row -> IK chain_count, 0 elsewhere.
+        constraint_names (list): constraint row -> constraint name.
+        constraint_digests (numpy.ndarray): uint64, bone index -> constraints_digest() of its constraints.
+        property_digests (numpy.ndarray): uint64, bone index -> properties_digest() of its custom properties.
+    """
+
+    def __init__(self, model_tree):
+        """
+        Parameters:
+            model_tree (dict): A loaded model_tree.json, as written by model_tree.export_rig_hierarchy().
+        """
+        bones = model_tree["bones"]
+        bone_count = len(bones)
+        self.object_name = model_tree.get("object_name")
+        self.bone_names = [bone["name"] for bone in bones]
+        self.index = {bone_name: bone_index for bone_index, bone_name in enumerate(self.bone_names)}
+        if len(self.index) != bone_count:
+            raise ValueError(f"Duplicate bone names in the export of '{self.object_name}'.")
+        index = self.index
+
+        self.parents = np.array([index.get(bone.get("parent"), -1) for bone in bones], dtype=np.int32)
+        self._build_hierarchy()
+
+        self.constraint_types = sorted(model_tree.get("possible_constraint_types", ()))
+        type_codes = {constraint_type: code for code, constraint_type in enumerate(self.constraint_types)}
+        offsets = np.zeros(bone_count + 1, dtype=np.int32)
+        codes = []
+        influence = []
+        subtargets = []
+        chain_counts = []
+        self.constraint_names = []
+        for bone_index, bone in enumerate(bones):
+            constraints = bone.get("constraints", ())
+            offsets[bone_index + 1] = offsets[bone_index] + len(constraints)
+            for constraint in constraints:
+                code = type_codes.get(constraint["type"])
+                if code is None:
+                    code = type_codes[constraint["type"]] = len(self.constraint_types)
+                    self.constraint_types.append(constraint["type"])
+                codes.append(code)
+                influence.append(constraint.get("influence", 1.0))
+                target = constraint.get("target")
+                same_object = target is None or target == self.object_name
+                subtargets.append(index.get(constraint.get("subtarget") or "", -1) if same_object else -1)
+                chain_counts.append(constraint.get("chain_count", 0))
+                self.constraint_names.append(constraint["name"])
+        self.constraint_offsets = offsets
+        self.constraint_codes = np.array(codes, dtype=np.int16)
+        self.constraint_influence = np.array(influence, dtype=np.float32)
+        self.constraint_subtargets = np.array(subtargets, dtype=np.int32)
+        self.constraint_chain_counts = np.array(chain_counts, dtype=np.int32)
+
+        self.constraint_digests = np.fromiter((constraints_digest(bone.get("constraints", [])) for bone in bones),
+                                              dtype=np.uint64, count=bone_count)
+        self.property_digests = np.fromiter((properties_digest(bone.get("custom_properties", {})) for bone in bones),
+                                            dtype=np.uint64, count=bone_count)
+
+    @classmethod
+    def load(cls, json_path):
+        """Reads a model_tree.json, plain or gzip (model_tree.export_rig_hierarchy(binary=True))."""
+        return cls(load_rig_hierarchy(json_path))
+
+    def __len__(self):
+        return len(self.bone_names)
+
+    def __contains__(self, bone_name):
+        return bone_name in self.index
+
+    def _build_hierarchy(self):
+        bone_count = len(self.parents)
+        # Children CSR: a stable sort by parent keeps siblings in export order
+        by_parent = np.argsort(self.parents, kind="stable").astype(np.int32)
+        root_count = int(np.count_nonzero(self.parents < 0))
+        child_counts = np.bincount(self.parents[self.parents >= 0], minlength=bone_count)
+        self.child_offsets = np.zeros(bone_count + 1, dtype=np.int32)
+        np.cumsum(child_counts, out=self.child_offsets[1:])
+        self.child_indices = by_parent[root_count:]
+        roots = by_parent[:root_count].tolist()
+
+        order = []
+        stack = roots[::-1]
+        child_offsets = self.child_offsets.tolist()
+        child_indices = self.child_indices.tolist()
+        while stack:
+            bone_index = stack.pop()
+            order.append(bone_index)
+            stack.extend(reversed(child_indices[child_offsets[bone_index]:child_offsets[bone_index + 1]]))
+        if len(order) != bone_count:
+            raise ValueError(f"Parent cycle in the export of '{self.object_name}'.")
+        self.order = np.array(order, dtype=np.int32)
+
+        # Subtree of bone b = order[position[b]:subtree_end[b]]
+        self.position = np.empty(bone_count, dtype=np.int32)
+        self.position[self.order] = np.arange(bone_count, dtype=np.int32)
+        self.depth = np.zeros(bone_count, dtype=np.int32)
+        subtree_size = np.ones(bone_count, dtype=np.int32)
+        parents = self.parents.tolist()
+        depth = self.depth
+        for bone_index in order:
+            if parents[bone_index] >= 0:
+                depth[bone_index] = depth[parents[bone_index]] + 1
+        for bone_index in reversed(order):
+            if parents[bone_index] >= 0:
+                subtree_size[parents[bone_index]] += subtree_size[bone_index]
+        self.subtree_end = self.position + subtree_size
+
+    def children_indices(self, bone_index):
+        """Direct children of bone_index, in export order."""
+        return self.child_indices[self.child_offsets[bone_index]:self.child_offsets[bone_index + 1]]
+
+    def subtree_indices(self, bone_index):
+        """bone_index and all its descendants, in pre-order. A view, no copy."""
+        return self.order[self.position[bone_index]:self.subtree_end[bone_index]]
+
+    def subtree(self, bone_name):
+        """Names of bone_name and all its descendants, in pre-order. Empty if the bone doesn't exist."""
+        bone_index = self.index.get(bone_name)
+        if bone_index is None:
+            return []
+        return [self.bone_names[descendant] for descendant in self.subtree_indices(bone_index).tolist()]
+
+    def ancestor_indices(self, bone_index):
+        """Parent, grandparent, ... up to the root."""
+        ancestors = np.empty(self.depth[bone_index], dtype=np.int32)
+        parent = self.parents[bone_index]
+        for slot in range(len(ancestors)):
+            ancestors[slot] = parent
+            parent = self.parents[parent]
+        return ancestors
+
+    def ancestors(self, bone_name):
+        """Names of bone_name's parent, grandparent, ... up to the root."""
+        bone_index = self.index.get(bone_name)
+        if bone_index is None:
+            return []
+        return [self.bone_names[ancestor] for ancestor in self.ancestor_indices(bone_index).tolist()]
+
+    def is_ancestor(self, ancestor_index, bone_index):
+        """True if ancestor_index is bone_index or one of its ancestors. O(1)."""
+        return bool(self.position[ancestor_index] <= self.position[bone_index] < self.subtree_end[ancestor_index])
+
+    def constraint_rows(self, bone_index):
+        """Rows of bone_index's constraints in the constraint arrays."""
+        return range(self.constraint_offsets[bone_index], self.constraint_offsets[bone_index + 1])
+
+    def constraints(self, bone_name):
+        """bone_name's constraints as (name, type, influence) tuples, in stack order."""
+        bone_index = self.index.get(bone_name)
+        if bone_index is None:
+            return []
+        return [(self.constraint_names[row], self.constraint_types[self.constraint_codes[row]],
+                 float(self.constraint_influence[row])) for row in self.constraint_rows(bone_index)]
+
+    def constraint_owners(self):
+        """int32, constraint row -> bone index that owns it."""
+        return np.repeat(np.arange(len(self.bone_names), dtype=np.int32), np.diff(self.constraint_offsets))
+
+    def bones_with_constraint(self, constraint_type):
+        """Indices of the bones that have at least one constraint of constraint_type, ascending."""
+        if constraint_type not in self.constraint_types:
+            return np.empty(0, dtype=np.int32)
+        rows = self.constraint_codes == self.constraint_types.index(constraint_type)
+        return np.unique(self.constraint_owners()[rows])
+
+    def influence_graph(self):
+        """The influence.InfluenceGraph of this rig, for the same answers starter gives inside Blender."""
+        import influence
+
+        owners = self.constraint_owners()
+        ik_rows = np.flatnonzero(self.constraint_codes == self.constraint_types.index("IK")) \
+            if "IK" in self.constraint_types else np.empty(0, dtype=np.int64)
+        copy_codes = [code for code, constraint_type in enumerate(self.constraint_types)
+                      if constraint_type in influence.COPY_CONSTRAINT_TYPES]
+        copy_rows = np.flatnonzero(np.isin(self.constraint_codes, copy_codes) & (self.constraint_subtargets >= 0))
+        return influence.InfluenceGraph(self.bone_names, self.parents,
+                                        zip(owners[ik_rows].tolist(), self.constraint_chain_counts[ik_rows].tolist()),
+                                        zip(self.constraint_subtargets[copy_rows].tolist(), owners[copy_rows].tolist()))
+
+    def diff(self, other):
+        """
+        Compares this export with a newer one, matching bones by name. Linear in the number of bones.
+
+        Parameters:
+            other (RigModel): The newer export.
+
+        Returns:
+            RigDiff: Bone names added in other, removed from self, and (for bones in both) reparented, with
+                     changed constraints (names, types, influence, targets, order), or with changed custom
+                     properties. Lists follow export order.
+        """
+        other_index = other.index
+        mapped = np.fromiter((other_index.get(bone_name, -1) for bone_name in self.bone_names),
+                             dtype=np.int32, count=len(self.bone_names))
+        common = np.flatnonzero(mapped >= 0)
+        mapped_common = mapped[common]
+
+        # Parents in other's numbering, -1 for roots and -2 for parents other no longer has
+        own_parents = self.parents[common]
+        own_parents_mapped = np.where(own_parents >= 0, mapped[own_parents], -1)
+        own_parents_mapped[(own_parents >= 0) & (own_parents_mapped < 0)] = -2
+        parent_moved = own_parents_mapped != other.parents[mapped_common]
+
+        constraints_changed = self.constraint_digests[common] != other.constraint_digests[mapped_common]
+        properties_changed = self.property_digests[common] != other.property_digests[mapped_common]
+
+        in_self = np.zeros(len(other.bone_names), dtype=bool)
+        in_self[mapped_common] = True
+        names = self.bone_names
+        return RigDiff(added=[other.bone_names[bone_index] for bone_index in np.flatnonzero(~in_self).tolist()],
+                       removed=[names[bone_index] for bone_index in np.flatnonzero(mapped < 0).tolist()],
+                       reparented=[names[bone_index] for bone_index in common[parent_moved].tolist()],
+                       constraints_changed=[names[bone_index] for bone_index in common[constraints_changed].tolist()],
+                       properties_changed=[names[bone_index] for bone_index in common[properties_changed].tolist()])
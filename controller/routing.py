@@ -0,0 +1,230 @@
+import bisect
+
+import numpy as np
+
+import registry
+from log_utils import get_logger
+
+logger = get_logger("routing")
+
+
+class RoutingTable:
+    """
+    Compiled FEAGI servo index -> (armature, pose bone, axis) routes.
+
+    The table is built once from the servo capabilities, so a burst only does a dictionary lookup
+    per index instead of resolving names, axis fractions and armature ranges.
+
+    Attributes:
+        routes (dict): feagi_index (int) -> (armature object, pose bone, axis (int), bone_slot (int))
+        bones (list): bone_slot -> pose bone. Every routed bone gets one slot.
+        armatures (list): bone_slot -> armature object that owns the bone.
+        generation (int): The registry generation the handles came from. Rebuild when the registry moves on.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.bones = []
+        self.armatures = []
+        self.generation = None
+
+    def __len__(self):
+        return len(self.routes)
+
+    def __contains__(self, feagi_index):
+        return feagi_index in self.routes
+
+    def lookup(self, feagi_index):
+        """Returns (armature object, pose bone, axis) for a FEAGI index, or None if it isn't routed."""
+        route = self.routes.get(feagi_index)
+        if route is None:
+            return None
+        return route[0], route[1], route[2]
+
+
+class IndexRanges:
+    """
+    The armatures' FEAGI index ranges sorted by first index, so finding the owner of an index is a bisection
+    instead of a scan over every armature.
+
+    Ranges are expected not to overlap. If two do anyway (a model_list from an older allocator), the armature
+    that starts later keeps the shared indexes and the earlier range is cut short.
+
+    Parameters:
+        model_list (dict): armature name -> [first FEAGI index, last FEAGI index]
+    """
+
+    def __init__(self, model_list):
+        self.starts = []
+        self.ends = []
+        self.names = []
+        for armature_name, (first, last) in sorted(model_list.items(), key=lambda item: item[1][0]):
+            if self.ends and first <= self.ends[-1]:
+                logger.warning("FEAGI indexes of '%s' (%d-%d) overlap '%s' (%d-%d)", armature_name, first, last,
+                               self.names[-1], self.starts[-1], self.ends[-1])
+                self.ends[-1] = first - 1
+            self.starts.append(first)
+            self.ends.append(last)
+            self.names.append(armature_name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, feagi_index):
+        """Name of the armature whose range holds feagi_index, or None if it falls in a gap."""
+        position = bisect.bisect_right(self.starts, feagi_index) - 1
+        if position >= 0 and feagi_index <= self.ends[position]:
+            return self.names[position]
+        return None
+
+
+def allocate_index_ranges(bone_counts, previous=None, spare_bones=0):
+    """
+    Gives every armature a contiguous range of FEAGI indexes, three per bone (x, y, z), without overlaps.
+
+    Armatures that have a range in previous keep it as long as their bones still fit before the next
+    range starts, so reloading a scene never moves the indexes of untouched characters. New and grown
+    armatures go after the highest index in use, in bone_counts order. spare_bones leaves room after
+    each of them so they can grow later without moving the armatures that follow.
+
+    Parameters:
+        bone_counts (dict): armature name -> number of pose bones, in allocation order.
+        previous (dict): An earlier model_list, such as capabilities_gen.load_layout() returns. Its ranges stay
+            reserved even for armatures that are gone.
+        spare_bones (int): Bones of unused indexes left after every newly placed armature.
+
+    Returns:
+        dict: armature name -> [first FEAGI index, last FEAGI index], in bone_counts order.
+    """
+    previous = previous or {}
+    starts = sorted(index_range[0] for index_range in previous.values())
+    model_list = {}
+    next_start = 0
+    if previous:
+        next_start = max(index_range[1] for index_range in previous.values()) + 1 + spare_bones * 3
+    for armature_name, bone_count in bone_counts.items():
+        index_range = previous.get(armature_name)
+        if index_range is None:
+            continue
+        first = index_range[0]
+        position = bisect.bisect_right(starts, first)
+        if position == len(starts) or first + bone_count * 3 <= starts[position]:
+            model_list[armature_name] = [first, first + bone_count * 3 - 1]
+            next_start = max(next_start, first + (bone_count + spare_bones) * 3)
+    for armature_name, bone_count in bone_counts.items():
+        if armature_name not in model_list:
+            model_list[armature_name] = [next_start, next_start + bone_count * 3 - 1]
+            next_start += (bone_count + spare_bones) * 3
+    return {armature_name: model_list[armature_name] for armature_name in bone_counts}
+
+
+def build_routing_table(servo_capabilities, model_list, armature_registry=None):
+    """
+    Builds the routing table for every servo in capabilities['output']['servo'].
+
+    The axis comes straight from the integer index (bone * 3 + axis), the same layout
+    capabilities_gen.generate_capabilities_json() writes.
+
+    Parameters:
+        servo_capabilities (dict): capabilities['output']['servo']
+        model_list (dict): armature name -> [first FEAGI index, last FEAGI index]
+        armature_registry (registry.ArmatureRegistry): Where the handles come from. Defaults to the shared one.
+
+    Returns:
+        RoutingTable
+    """
+    servo_names = ((int(key), servo_data.get("custom_name")) for key, servo_data in servo_capabilities.items())
+    return build_routing_table_from_names(servo_names, model_list, armature_registry)
+
+
+def build_routing_table_from_names(servo_names, model_list, armature_registry=None):
+    """
+    Same as build_routing_table(), from (feagi_index, custom_name) pairs such as
+    capabilities_cache.CapabilitiesCache.servo_names().
+    """
+    if armature_registry is None:
+        armature_registry = registry.default_registry
+    armature_registry.refresh()
+    table = RoutingTable()
+    bone_slots = {}  # (armature_name, bone_name) -> bone_slot
+    skipped = 0
+    index_ranges = IndexRanges(model_list)
+
+    for feagi_index, bone_name in servo_names:
+        armature_name = index_ranges.find(feagi_index)
+        armature_obj = armature_registry.armature(armature_name) if armature_name else None
+        if armature_obj is None:
+            skipped += 1
+            continue
+
+        pose_bone = armature_registry.pose_bone(armature_name, bone_name)
+        if pose_bone is None:
+            skipped += 1
+            continue
+
+        slot_key = (armature_name, bone_name)
+        if slot_key not in bone_slots:
+            bone_slots[slot_key] = len(table.bones)
+            table.bones.append(pose_bone)
+            table.armatures.append(armature_obj)
+
+        table.routes[feagi_index] = (armature_obj, pose_bone, feagi_index % 3, bone_slots[slot_key])
+
+    table.generation = armature_registry.generation  # after resolving, which registers new armatures
+    logger.info("Routing table: %d servo indexes -> %d bones (%d skipped)", len(table.routes), len(table.bones),
+                skipped)
+    return table
+
+
+def build_routing_table_from_arrays(servo_indexes, name_ids, names, model_list, armature_registry=None):
+    """
+    Same as build_routing_table(), from the arrays of a capabilities_cache.CapabilitiesCache, without
+    building a (feagi_index, custom_name) pair per servo. The owning armature of every index is found in one
+    searchsorted() call, and each distinct (armature, bone) is resolved once instead of once per axis.
+
+    Parameters:
+        servo_indexes (numpy.ndarray): int32, every servo FEAGI index, ascending.
+        name_ids (numpy.ndarray): int32, servo row -> position in names.
+        names (list): Distinct servo custom_names.
+        model_list (dict): armature name -> [first FEAGI index, last FEAGI index]
+        armature_registry (registry.ArmatureRegistry): Where the handles come from. Defaults to the shared one.
+    """
+    if armature_registry is None:
+        armature_registry = registry.default_registry
+    armature_registry.refresh()
+    table = RoutingTable()
+    index_ranges = IndexRanges(model_list)
+    servo_indexes = np.asarray(servo_indexes, dtype=np.int64)
+    name_ids = np.asarray(name_ids, dtype=np.int64)
+
+    owners = np.searchsorted(index_ranges.starts, servo_indexes, side="right") - 1
+    owned = owners >= 0
+    owned[owned] = servo_indexes[owned] <= np.asarray(index_ranges.ends, dtype=np.int64)[owners[owned]]
+    rows = np.flatnonzero(owned)
+    # One key per (armature, bone); bone slots follow the order in which the bones first appear
+    keys = owners[rows] * max(1, len(names)) + name_ids[rows]
+    unique_keys, first_rows, key_rows = np.unique(keys, return_index=True, return_inverse=True)
+    appearance = np.argsort(first_rows, kind="stable")
+
+    slot_of_key = np.full(len(unique_keys), -1, dtype=np.int64)
+    for key_position in appearance.tolist():
+        row = rows[first_rows[key_position]]
+        armature_name = index_ranges.names[owners[row]]
+        pose_bone = armature_registry.pose_bone(armature_name, names[name_ids[row]])
+        if pose_bone is None:
+            continue
+        slot_of_key[key_position] = len(table.bones)
+        table.bones.append(pose_bone)
+        table.armatures.append(armature_registry.armature(armature_name))
+
+    slots = slot_of_key[key_rows.reshape(-1)]
+    routed = slots >= 0
+    bones = table.bones
+    armatures = table.armatures
+    for feagi_index, slot in zip(servo_indexes[rows[routed]].tolist(), slots[routed].tolist()):
+        table.routes[feagi_index] = (armatures[slot], bones[slot], feagi_index % 3, slot)
+
+    table.generation = armature_registry.generation  # after resolving, which registers new armatures
+    logger.info("Routing table: %d servo indexes -> %d bones (%d skipped)", len(table.routes), len(table.bones),
+                len(servo_indexes) - len(table.routes))
+    return table
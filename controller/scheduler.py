@@ -0,0 +1,113 @@
+import time
+
+
+class BurstScheduler:
+    """
+    Wraps the bpy timer callback to keep a stable burst cadence.
+
+    Instead of returning a fixed interval, every tick is scheduled against a deadline. Time spent in the
+    callback and late wake-ups are subtracted from the next wait, and deadlines that were missed entirely are
+    dropped rather than replayed, so a heavy scene slows the burst rate down instead of piling ticks up.
+
+    The callback receives the scheduler and can ask it:
+      - gyro_due(): whether gyro publishing should run this tick (own rate, and only if the time budget allows).
+      - budget_left(): seconds left of this tick's time budget.
+
+    Parameters:
+        callback (callable): scheduler -> None. The work of one burst.
+        target_interval (float or callable): Seconds between bursts, or a function returning them,
+                                             such as lambda: feagi_settings['feagi_burst_speed'].
+        gyro_interval (float or callable): Seconds between gyro publishes. Defaults to target_interval.
+        time_budget (float or callable): Seconds a tick may spend before optional work (gyro) is skipped.
+                                         Defaults to budget_fraction of the target interval.
+        budget_fraction (float): Used when time_budget is None.
+        min_interval (float): Shortest wait ever returned to Blender.
+    """
+
+    def __init__(self, callback, target_interval, gyro_interval=None, time_budget=None, budget_fraction=0.8,
+                 min_interval=0.001, clock=time.perf_counter):
+        self.callback = callback
+        self.target_interval = _as_getter(target_interval)
+        self.gyro_interval = _as_getter(gyro_interval) if gyro_interval is not None else self.target_interval
+        if time_budget is not None:
+            self.time_budget = _as_getter(time_budget)
+        else:
+            self.time_budget = lambda: self.target_interval() * budget_fraction
+        self.min_interval = min_interval
+        self.clock = clock
+
+        self.next_deadline = None
+        self.tick_start = 0.0
+        self.lateness = 0.0
+        self.last_gyro = None
+        self.stats = {
+            "ticks": 0,
+            "late_ticks": 0,
+            "missed_deadlines": 0,
+            "gyro_published": 0,
+            "gyro_throttled": 0,
+            "gyro_over_budget": 0,
+            "last_tick_time": 0.0,
+            "average_tick_time": 0.0,
+            "max_tick_time": 0.0
+        }
+
+    def tick(self):
+        """The function to register with bpy.app.timers. Returns the seconds until the next burst."""
+        start = self.clock()
+        interval = self.target_interval()
+        if self.next_deadline is None:
+            self.next_deadline = start
+
+        self.tick_start = start
+        self.lateness = start - self.next_deadline
+        if self.lateness > interval:
+            self.stats["late_ticks"] += 1
+
+        self.callback(self)
+
+        end = self.clock()
+        self._record_tick(end - start)
+
+        if interval <= 0:
+            self.next_deadline = end
+        else:
+            self.next_deadline += interval
+            if end > self.next_deadline:
+                # Don't try to catch up on deadlines we already missed, just line up with the next one
+                missed = int((end - self.next_deadline) // interval) + 1
+                self.stats["missed_deadlines"] += missed
+                self.next_deadline += missed * interval
+        return max(self.min_interval, self.next_deadline - end)
+
+    def budget_left(self):
+        return self.time_budget() - (self.clock() - self.tick_start)
+
+    def gyro_due(self):
+        """True if gyro data should be published this tick. Call at most once per tick."""
+        now = self.clock()
+        # Half an interval of slack, so jitter doesn't make an equal rate skip every other tick
+        slack = self.target_interval() / 2
+        if self.last_gyro is not None and now - self.last_gyro < self.gyro_interval() - slack:
+            self.stats["gyro_throttled"] += 1
+            return False
+        if now - self.tick_start > self.time_budget():
+            self.stats["gyro_over_budget"] += 1
+            return False
+        self.last_gyro = now
+        self.stats["gyro_published"] += 1
+        return True
+
+    def _record_tick(self, elapsed):
+        stats = self.stats
+        stats["ticks"] += 1
+        stats["last_tick_time"] = elapsed
+        stats["average_tick_time"] += (elapsed - stats["average_tick_time"]) * 0.1  # exponential moving average
+        if elapsed > stats["max_tick_time"]:
+            stats["max_tick_time"] = elapsed
+
+
+def _as_getter(value):
+    if callable(value):
+        return value
+    return lambda: value
@@ -0,0 +1,245 @@
+"""
+Sharded mode: the armatures are split across headless Blender workers, each owning a contiguous FEAGI index range.
+
+The coordinator (the controller) fans servo commands out and merges the workers' gyro rows back into one
+gyro.GyroFrame, through shared_buffers.SharedArray segments. Workers run this file:
+
+    blender --background scene.blend --python controller/sharding.py -- --shard '<json spec>'
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import bpy
+import numpy as np
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import gyro
+import shared_buffers
+from log_utils import get_logger
+
+logger = get_logger("sharding")
+
+
+def plan_shards(model_list, bone_counts, worker_count):
+    """
+    Splits the armatures into at most worker_count groups with about the same number of bones.
+    Groups follow FEAGI index order, so each one covers a contiguous index range.
+
+    Parameters:
+        model_list (dict): armature name -> [first FEAGI index, last FEAGI index]
+        bone_counts (dict): armature name -> number of pose bones. Armatures missing here are left out.
+        worker_count (int): Number of workers.
+
+    Returns:
+        list: One list of armature names per shard.
+    """
+    names = sorted((name for name in model_list if name in bone_counts), key=lambda name: model_list[name][0])
+    shard_count = max(1, min(worker_count, len(names)))
+    total = sum(bone_counts[name] for name in names)
+    shards = [[]]
+    assigned = 0
+    for position, name in enumerate(names):
+        names_left = len(names) - position
+        shards_left = shard_count - len(shards)
+        # Start the next group when this armature would end nearer the next boundary than this one, or when
+        # every later group still needs an armature
+        boundary = total * len(shards) / shard_count
+        if shards[-1] and shards_left and (assigned + bone_counts[name] / 2 > boundary or names_left == shards_left):
+            shards.append([])
+        shards[-1].append(name)
+        assigned += bone_counts[name]
+    return shards
+
+
+class Shard:
+    """One worker's armatures, index range and shared buffers, as the coordinator sees them."""
+
+    def __init__(self, shard_id, model_list, bone_counts, prefix):
+        self.shard_id = shard_id
+        self.model_list = model_list
+        self.first_index = min(index_range[0] for index_range in model_list.values())
+        self.last_index = max(index_range[1] for index_range in model_list.values())
+        self.gyro_rows = sum(bone_counts[name] for name in model_list)
+        servo_count = self.last_index - self.first_index + 1
+        self.commands = shared_buffers.SharedArray(f"{prefix}_cmd{shard_id}", (servo_count,), create=True)
+        self.gyro = shared_buffers.SharedArray(f"{prefix}_gyro{shard_id}", (max(1, self.gyro_rows), 3), create=True)
+        self.targets = np.full(servo_count, np.nan, dtype=np.float32)  # NaN: never sent
+        self.process = None
+
+    def spec(self, capabilities_path):
+        """What the worker needs, passed on its command line."""
+        return {"shard_id": self.shard_id, "armatures": self.model_list, "capabilities": capabilities_path,
+                "first_index": self.first_index, "servo_count": len(self.targets), "gyro_rows": self.gyro_rows,
+                "commands": self.commands.name, "gyro": self.gyro.name}
+
+
+class ShardCoordinator:
+    """
+    Runs the armatures of model_list on worker_count `blender --background` processes.
+
+    dispatch() routes a burst's servo values to the workers by index range; gather_gyro() returns every
+    worker's latest gyro rows as one gyro.GyroFrame with the same keys GyroSampler uses. Neither waits
+    for the workers.
+
+    Parameters:
+        model_list (dict): armature name -> [first FEAGI index, last FEAGI index]
+        capabilities_path (str): capabilities.json, for the workers' routing tables.
+        worker_count (int): Number of Blender workers.
+        blend_path (str): The saved .blend the workers open. Defaults to the open file.
+        blender_binary (str): Blender executable. Defaults to the running one.
+    """
+
+    def __init__(self, model_list, capabilities_path, worker_count, blend_path=None, blender_binary=None):
+        self.blend_path = blend_path or bpy.data.filepath
+        if not self.blend_path:
+            raise ValueError("Sharded mode needs a saved .blend file for the workers to open.")
+        self.blender_binary = blender_binary or bpy.app.binary_path
+        self.capabilities_path = capabilities_path
+        bone_counts = {}
+        for name in model_list:
+            armature = bpy.data.objects.get(name)
+            if armature is not None and armature.type == 'ARMATURE':
+                bone_counts[name] = len(armature.pose.bones)
+        prefix = f"feagi_{os.getpid()}"
+        self.shards = [Shard(shard_id, {name: model_list[name] for name in names}, bone_counts, prefix)
+                       for shard_id, names in enumerate(plan_shards(model_list, bone_counts, worker_count))]
+
+        # The merged gyro buffer: shard rows back to back, keyed like gyro.GyroSampler
+        key_rows = {}
+        row = 0
+        self.gyro_slices = []
+        for shard in self.shards:
+            self.gyro_slices.append((shard, row))
+            for name, index_range in shard.model_list.items():
+                for bone_index in range(bone_counts[name]):
+                    key_rows[str(bone_index + index_range[0])] = row + bone_index
+                row += bone_counts[name]
+        self.gyro_buffer = np.zeros((row, 3), dtype=np.float32)
+        self.frame = gyro.GyroFrame(self.gyro_buffer, key_rows)
+        self.counters = {"bursts": 0, "values_dispatched": 0, "values_unrouted": 0}
+
+    def start(self):
+        for shard in self.shards:
+            command = [self.blender_binary, "--background", self.blend_path, "--python", os.path.abspath(__file__),
+                       "--", "--shard", json.dumps(shard.spec(self.capabilities_path))]
+            shard.process = subprocess.Popen(command)
+            logger.info("Shard %d: %d armatures, FEAGI indexes %d-%d, pid %d", shard.shard_id,
+                        len(shard.model_list), shard.first_index, shard.last_index, shard.process.pid)
+
+    def dispatch(self, servo_data):
+        """Sends a burst's {FEAGI index: value} to the workers that own the indexes."""
+        if not servo_data:
+            return
+        indexes = np.fromiter(servo_data.keys(), dtype=np.int64, count=len(servo_data))
+        values = np.fromiter(servo_data.values(), dtype=np.float32, count=len(servo_data))
+        routed = np.zeros(len(indexes), dtype=bool)
+        for shard in self.shards:
+            in_range = (indexes >= shard.first_index) & (indexes <= shard.last_index)
+            if not in_range.any():
+                continue
+            routed |= in_range
+            # Every write carries the shard's whole target state, so a worker that skipped a burst catches up
+            shard.targets[indexes[in_range] - shard.first_index] = values[in_range]
+            shard.commands.write(shard.targets)
+        self.counters["bursts"] += 1
+        self.counters["values_dispatched"] += int(np.count_nonzero(routed))
+        self.counters["values_unrouted"] += int(len(routed) - np.count_nonzero(routed))
+
+    def gather_gyro(self):
+        """Copies every worker's newest gyro rows into the merged buffer and returns its GyroFrame view."""
+        for shard, row in self.gyro_slices:
+            if shard.gyro_rows:
+                shard.gyro.read(self.gyro_buffer[row:row + shard.gyro_rows], only_new=False)
+        return self.frame
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats["workers_alive"] = sum(1 for shard in self.shards if shard.process and shard.process.poll() is None)
+        stats["gyro_sequences"] = [shard.gyro.sequence for shard in self.shards]
+        return stats
+
+    def stop(self, timeout=5.0):
+        """Tells the workers to exit (closing the command buffers), waits for them, and frees the buffers."""
+        for shard in self.shards:
+            shard.commands.close()
+        deadline = time.monotonic() + timeout
+        for shard in self.shards:
+            if shard.process is None:
+                continue
+            try:
+                shard.process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning("Shard %d didn't exit, terminating it", shard.shard_id)
+                shard.process.terminate()
+            shard.process = None
+        for shard in self.shards:
+            shard.gyro.close()
+
+
+def run_worker(spec, gyro_interval=0.02):
+    """
+    A worker's loop, inside `blender --background`: applies the commands of its index range and publishes
+    the gyro rows of its armatures, until the coordinator closes the command buffer.
+    """
+    import registry
+    import routing
+    import starter
+
+    with open(spec["capabilities"], "r") as f:
+        servo_capabilities = json.load(f)["capabilities"]["output"]["servo"]
+    model_list = spec["armatures"]
+    for name in model_list:
+        registry.default_registry.register(name)
+    routing_table = routing.build_routing_table(servo_capabilities, model_list)
+    routes = routing_table.routes
+    sampler = gyro.GyroSampler(model_list)
+    if len(sampler.buffer) != spec["gyro_rows"]:
+        # The worker's .blend doesn't match the coordinator's scene (unsaved changes?)
+        logger.error("Shard %d: %d gyro rows, the coordinator expects %d", spec["shard_id"],
+                     len(sampler.buffer), spec["gyro_rows"])
+        return
+
+    commands = shared_buffers.SharedArray(spec["commands"], (spec["servo_count"],))
+    gyro_out = shared_buffers.SharedArray(spec["gyro"], (max(1, spec["gyro_rows"]), 3))
+    values = np.empty(spec["servo_count"], dtype=np.float32)
+    applied = np.full(spec["servo_count"], np.nan, dtype=np.float32)
+    first_index = spec["first_index"]
+    last_gyro = 0.0
+    logger.info("Shard %d ready: %d routes, %d gyro rows", spec["shard_id"], len(routes), spec["gyro_rows"])
+
+    while not commands.closed:
+        moved = False
+        if commands.wait(gyro_interval) and commands.read(values) is not None:
+            # Only the indexes whose target changed since the last applied state
+            present = np.flatnonzero(~np.isnan(values) & (values != applied))
+            applied[present] = values[present]
+            bone_rotations = {}
+            for feagi_index, value in zip((present + first_index).tolist(), values[present].tolist()):
+                route = routes.get(feagi_index)
+                if route is not None:
+                    bone_rotations.setdefault(route[3], [None, None, None])[route[2]] = value
+            bones = routing_table.bones
+            moved = starter.write_bone_rotations((bones[slot], bone_rotations[slot]) for slot in bone_rotations) > 0
+        now = time.monotonic()
+        if spec["gyro_rows"] and (moved or now - last_gyro >= gyro_interval):
+            gyro_out.write(sampler.sample().array)
+            last_gyro = now
+    commands.close()
+    gyro_out.close()
+    logger.info("Shard %d stopped", spec["shard_id"])
+
+
+if __name__ == "__main__":
+    import log_utils
+
+    log_utils.setup_logging()
+    parser = argparse.ArgumentParser(description="FEAGI Blender shard worker")
+    parser.add_argument("--shard", required=True, help="JSON spec from ShardCoordinator")
+    arguments = parser.parse_args(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
+    run_worker(json.loads(arguments.shard))
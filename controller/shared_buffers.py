@@ -0,0 +1,149 @@
+import time
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from log_utils import get_logger
+
+logger = get_logger("shared_buffers")
+
+# int64 header fields: published sequence, sequence of slot 0, sequence of slot 1, closed flag,
+# CRC-32 of slot 0, CRC-32 of slot 1
+_HEADER_FIELDS = 6
+_HEADER_BYTES = 64  # keeps the slots cache-line aligned
+
+
+class SharedArray:
+    """
+    One NumPy array shared between processes, double-buffered, with one writer and any number of readers.
+
+    The segment holds a small int64 header and two slots. write() fills the slot readers aren't pointed at,
+    marking it odd (busy) while copying and even when done, then publishes its sequence number. read()
+    copies the published slot and checks that its sequence didn't change meanwhile. Neither side locks.
+    A reader only has to retry if the writer wrapped around to the same slot during the copy.
+
+    NumPy stores come with no memory fences. On x86 stores and loads aren't reordered with each other, so
+    the sequence check alone is enough, but a weakly ordered CPU (ARM) may make the even sequence visible
+    before the data. The writer therefore also stores a CRC-32 of the slot, and read() only accepts a copy
+    that matches it.
+
+    Parameters:
+        name (str): Shared memory name. Both sides use the same name.
+        shape (tuple): Array shape.
+        dtype: Array dtype.
+        create (bool): True on the side that owns (and later unlinks) the segment.
+    """
+
+    def __init__(self, name, shape, dtype=np.float32, create=False):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        slot_bytes = max(1, int(np.prod(self.shape, dtype=np.int64))) * self.dtype.itemsize
+        self.slot_stride = (slot_bytes + 63) // 64 * 64
+        size = _HEADER_BYTES + 2 * self.slot_stride
+        self.owner = create
+        self.memory = shared_memory.SharedMemory(name=name, create=True, size=size) if create else _attach(name)
+        self.name = self.memory.name
+        self.header = np.ndarray(_HEADER_FIELDS, dtype=np.int64, buffer=self.memory.buf)
+        self.slots = [np.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf,
+                                 offset=_HEADER_BYTES + slot * self.slot_stride) for slot in range(2)]
+        if create:
+            self.header[:] = 0
+        self.last_read = 0
+        self._scratch_array = None
+
+    @property
+    def sequence(self):
+        """Sequence number of the newest published array, 0 before the first write()."""
+        return int(self.header[0])
+
+    @property
+    def closed(self):
+        return bool(self.header[3])
+
+    def write(self, array):
+        """Publishes a copy of array. Only one process may write."""
+        sequence = int(self.header[0]) + 1
+        slot = sequence & 1
+        self.header[1 + slot] = 2 * sequence - 1  # odd: being written
+        np.copyto(self.slots[slot], array, casting="unsafe")
+        self.header[4 + slot] = zlib.crc32(self.slots[slot])
+        self.header[1 + slot] = 2 * sequence
+        self.header[0] = sequence
+        return sequence
+
+    def read(self, out, only_new=True, retries=8):
+        """
+        Copies the newest published array into out.
+
+        Parameters:
+            out (numpy.ndarray): Destination with this array's shape.
+            only_new (bool): Return None without copying if nothing was published since the last read().
+
+        Returns:
+            int: The sequence number read, or None if there was nothing (new) or every retry was torn.
+        """
+        # The checksum is taken from a copy in this array's dtype, which out may not have
+        copy = out if out.dtype == self.dtype and out.flags.c_contiguous else self._scratch()
+        for _ in range(retries):
+            sequence = int(self.header[0])
+            if not sequence or (only_new and sequence == self.last_read):
+                return None
+            slot = sequence & 1
+            if int(self.header[1 + slot]) != 2 * sequence:
+                continue  # the writer already moved on to this slot
+            np.copyto(copy, self.slots[slot])
+            checksum = int(self.header[4 + slot])
+            if int(self.header[1 + slot]) == 2 * sequence and zlib.crc32(copy) == checksum:
+                if copy is not out:
+                    np.copyto(out, copy, casting="unsafe")
+                self.last_read = sequence
+                return sequence
+        return None
+
+    def _scratch(self):
+        if self._scratch_array is None:
+            self._scratch_array = np.empty(self.shape, dtype=self.dtype)
+        return self._scratch_array
+
+    def wait(self, timeout, poll_interval=0.0005):
+        """Sleeps until something newer than the last read() is published, or timeout. Returns True if so."""
+        deadline = time.monotonic() + timeout
+        while int(self.header[0]) == self.last_read:
+            if self.closed or time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def close(self, unlink=None):
+        """Marks the array closed for the other side (owner only), detaches, and unlinks if owner."""
+        if self.memory is None:
+            return
+        if self.owner:
+            self.header[3] = 1
+        self.header = None
+        self.slots = None
+        self.memory.close()
+        if self.owner if unlink is None else unlink:
+            try:
+                self.memory.unlink()
+            except FileNotFoundError:
+                pass
+        self.memory = None
+
+
+def _attach(name):
+    # Attaching must not register the segment with this process's resource tracker, which would unlink it
+    # when this process exits even though the creator still uses it. The attaching side is expected to be
+    # started with subprocess (Blender workers, the FEAGI sidecar), so it has a tracker of its own.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(memory._name, "shared_memory")
+    except (ImportError, AttributeError, KeyError):
+        pass
+    return memory
@@ -1,6 +1,14 @@
 import bpy
 import os
 import sys
+import logging
+import numpy as np
+import registry
+import influence
+import routing
+from log_utils import get_logger
+
+logger = get_logger("starter")
 
 
 def clear_terminal():
@@ -22,92 +30,102 @@ def print_armature_info():
 def get_max_translation(armature_name="MyRig", bone_parent_name="StartBone"):
     """To ensure that we don't stretch bones too far, we need to find their max length"""
 
-    if armature_name not in bpy.data.objects:
-        print(f"Armature '{armature_name}' not found in bpy.data.objects")
+    armature_obj = registry.default_registry.armature(armature_name)
+    if armature_obj is None:
+        logger.warning("Armature '%s' not found in bpy.data.objects", armature_name)
         return
 
-    armature_obj = bpy.data.objects[armature_name]
-
-
-# 5. Verify if a rigged bone will affect connected bones when moved
-def validate_connected_bone_movement(armature_name="MyRig", curr_bone_name="root"):
-    # if IK: any parent bones in IK chain will move
-    # if FK: any children will move
 
-    # list of affected bones
-    affected_bones = []
+# Influence graphs, built on first use: armature slot -> (registry generation, influence.InfluenceGraph)
+_influence_graphs = {}
 
-    # validate armature name
-    if armature_name not in bpy.data.objects:
-        print(f"Armature '{armature_name}' not found in bpy.data.objects")
-        return
 
-    # get armature object
-    armature_obj = bpy.data.objects[armature_name]
+def get_influence_graph(armature_name="MyRig"):
+    """
+    Returns the armature's influence.InfluenceGraph, building it on first use and again after
+    the registry saw bones change. Call invalidate_influence_graph() after editing constraints.
+    """
+    armature_registry = registry.default_registry
+    armature_obj = armature_registry.armature(armature_name)
+    if armature_obj is None:
+        logger.warning("Armature '%s' not found in bpy.data.objects", armature_name)
+        return None
+    slot = armature_registry.slot(armature_name)
+    cached = _influence_graphs.get(slot)
+    if cached is None or cached[0] != armature_registry.generation:
+        cached = (armature_registry.generation, influence.InfluenceGraph.from_pose_bones(armature_obj))
+        _influence_graphs[slot] = cached
+    return cached[1]
+
+
+def invalidate_influence_graph(armature_name=None):
+    """Drops the cached influence graph of one armature, or of all of them."""
+    if armature_name is None:
+        _influence_graphs.clear()
+    else:
+        _influence_graphs.pop(registry.default_registry.slot(armature_name), None)
 
-    # 3. Switch to Pose Mode
-    bpy.ops.object.mode_set(mode='POSE')
 
-    # 4. Check if the bone exists in pose mode
-    if curr_bone_name not in armature_obj.pose.bones:
-        print(f"Bone '{curr_bone_name}' not found in armature '{armature_name}'")
+# 5. Verify if a rigged bone will affect connected bones when moved
+def validate_connected_bone_movement(armature_name="MyRig", curr_bone_name="root"):
+    """
+    Returns the pose bones that move when curr_bone_name moves, the bone itself first:
+    its FK descendants, its IK chain if it has an IK constraint, and bones with a copy constraint
+    (COPY_TRANSFORMS/LOCATION/ROTATION/SCALE) targeting any of those, transitively.
+    Answered from the armature's cached influence graph, without switching modes.
+    """
+    graph = get_influence_graph(armature_name)
+    if graph is None:
         return
 
-    # get the bone being moved
-    main_bone = armature_obj.pose.bones[curr_bone_name]
-
-    # iterate through that bone's constraints
-    for constraint in main_bone.constraints:
-
-        # check if bone has IK constraint
-        if constraint.type == 'IK':
-
-            # get number of bones in chain
-            chain_num_bones = constraint.chain_count
-            print(f"Constraint Name: {constraint.name}, Type: {constraint.type}")
-            print(f"chain length: {chain_num_bones}")
-
-            curr_bone = main_bone
+    bone_index = graph.index.get(curr_bone_name)
+    if bone_index is None:
+        logger.warning("Bone '%s' not found in armature '%s'", curr_bone_name, armature_name)
+        return
 
-            # iterate up IK chain 
-            for x in range(chain_num_bones):
-                affected_bones.append(curr_bone)  #add bone to affected bones
-                curr_bone = curr_bone.parent
+    pose_bones = registry.default_registry.bones[registry.default_registry.slot(armature_name)]
+    return [pose_bones[affected] for affected in graph.affected_indices(bone_index).tolist()]
 
-        # else if bone has a default FK constraint       
-        else:
-            affected_bones.append(main_bone)
-            traverse_children(main_bone, affected_bones)  # recursively add all children to affected bones
 
-    # check for any bones in entire armature that have copy_transformation constraint
-    for bone_name, bone in armature_obj.pose.bones.items():
+# Rotation modes that use rotation_euler
+EULER_MODES = {'XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX'}
 
-        #        print(f"Current bone: {bone_name}")
 
-        # loop through each bone's constraint
-        for constraint in bone.constraints:
+def update_view_layer():
+    """
+    Evaluates the scene once, so constraints, drivers and matrix_world reflect the pose edits made so far.
+    The editing functions below call it themselves unless given defer_update=True; pass that for every edit
+    of a batch and call this once at the end. Needs no 3D view, so it works under blender --background.
+    """
+    bpy.context.view_layer.update()
 
-            # check if that bone has a copy constraint
-            if constraint.type == ('COPY_TRANSFORMS' or 'COPY_LOCATION' or 'COPY_ROTATION' or 'COPY_SCALE'):
 
-                # if the subtarget is the bone we are adjusting
-                if main_bone.name == constraint.subtarget:
-                    #                    print(f"{main_bone.name} is the target of {bone.name}")
-                    affected_bones.append(bone)
+def write_pose_channel(armature_obj, channel, rows, values):
+    """
+    Writes one vector channel of many pose bones with a single foreach_get()/foreach_set() pair,
+    without switching modes.
 
-    return affected_bones
+    Parameters:
+        armature_obj: The armature object.
+        channel (str): "location", "rotation_euler" or "scale".
+        rows (list): Indexes into armature_obj.pose.bones.
+        values: (len(rows), 3) new values. NaN leaves that component unchanged.
+    """
+    bones = armature_obj.pose.bones
+    current = np.empty(len(bones) * 3, dtype=np.float32)
+    bones.foreach_get(channel, current)
+    current = current.reshape(-1, 3)
+    values = np.asarray(values, dtype=np.float32).reshape(len(rows), 3)
+    current[rows] = np.where(np.isnan(values), current[rows], values)
+    bones.foreach_set(channel, current.reshape(-1))
 
 
-# traverse children of a specified bone
-def traverse_children(bone, children_list):
-    # base case: at leaf
-    if len(bone.children) > 0:
-        for child in bone.children:
-            children_list.append(child)
-            traverse_children(child, children_list)
+def merge_axes(current, new_values):
+    """current with every axis of new_values that isn't None, as a list."""
+    return [current[axis] if value is None else value for axis, value in enumerate(new_values)]
 
 
-def reset(armature_name="MyRig"):
+def reset(armature_name="MyRig", defer_update=False):
     """
     Resets the translations, rotations, and scales of all bones
     
@@ -115,107 +133,70 @@ def reset(armature_name="MyRig"):
       - location: (0.0, 0.0, 0.0)
       - rotation: (0.0, 0.0, 0.0)
       - scale:    (1.0, 1.0, 1.0)
+
+    Every channel is written for the whole armature with one foreach_set(), without switching modes.
+    Rotations are only reset on bones that use an Euler rotation mode.
     """
-    if armature_name not in bpy.data.objects:
-        print(f"Armature '{armature_name}' not found in bpy.data.objects")
+    armature_obj = registry.default_registry.armature(armature_name)
+    if armature_obj is None:
+        logger.warning("Armature '%s' not found in bpy.data.objects", armature_name)
         return
 
-    armature_obj = bpy.data.objects[armature_name]
-    bpy.context.view_layer.objects.active = armature_obj
-    bpy.ops.object.mode_set(mode='POSE')
+    bones = armature_obj.pose.bones
+    bone_count = len(bones)
+    bones.foreach_set("location", np.zeros(bone_count * 3, dtype=np.float32))
+    euler_rows = [row for row, bone in enumerate(bones) if bone.rotation_mode in EULER_MODES]
+    if len(euler_rows) == bone_count:
+        bones.foreach_set("rotation_euler", np.zeros(bone_count * 3, dtype=np.float32))
+    elif euler_rows:
+        write_pose_channel(armature_obj, "rotation_euler", euler_rows, np.zeros((len(euler_rows), 3)))
+    bones.foreach_set("scale", np.ones(bone_count * 3, dtype=np.float32))
+    logger.debug("Armature '%s': %d bones reset", armature_name, bone_count)
 
-    for bone_name, bone in armature_obj.pose.bones.items():
-        # Reset location to (0.0, 0.0, 0.0)
-        bone.location = (0.0, 0.0, 0.0)
-        # Reset rotation.
-        if bone.rotation_mode in {'XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX'}:
-            bone.rotation_euler = (0.0, 0.0, 0.0)
-        # Reset scale to (1.0, 1.0, 1.0)
-        bone.scale = (1.0, 1.0, 1.0)
+    if not defer_update:
+        update_view_layer()
 
-        print(f"Bone '{bone_name}' reset: location=(0.0, 0.0, 0.0), rotation=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0)")
 
-    bpy.ops.object.mode_set(mode='OBJECT')
-
-
-def translate_bone(armature_name="MyRig", bone_name="root", new_location=(None, None, None)):
+def translate_bone(armature_name="MyRig", bone_name="root", new_location=(None, None, None), defer_update=False):
     """
     Moves a specified bone in pose mode.
     If any element in `new_location` is None, the current location value is retained for that axis.
     """
-    if armature_name not in bpy.data.objects:
-        print(f"Armature '{armature_name}' not found in bpy.data.objects")
-        return
-
-    armature_obj = bpy.data.objects[armature_name]
-    bpy.context.view_layer.objects.active = armature_obj
-    bpy.ops.object.mode_set(mode='POSE')
-
-    if bone_name not in armature_obj.pose.bones:
-        print(f"Bone '{bone_name}' not found in armature '{armature_name}'")
+    bone = registry.default_registry.pose_bone(armature_name, bone_name)
+    if bone is None:
+        logger.warning("Bone '%s' not found in armature '%s'", bone_name, armature_name)
         return
 
-    bone = armature_obj.pose.bones[bone_name]
-
-    # Get current location as a vector
-    current_location = bone.location.copy()
-    new_x, new_y, new_z = new_location
-
-    # Update only if a new value is provided
-    if new_x is not None:
-        current_location.x = new_x
-    if new_y is not None:
-        current_location.y = new_y
-    if new_z is not None:
-        current_location.z = new_z
+    bone.location = merge_axes(bone.location, new_location)
+    logger.debug("Bone '%s' in '%s' moved to %s", bone_name, armature_name, bone.location)
 
-    bone.location = current_location
-    print(f"Bone '{bone_name}' in '{armature_name}' moved to {bone.location}")
+    if not defer_update:
+        update_view_layer()
 
-    bpy.ops.object.mode_set(mode='OBJECT')
 
-
-def scale_bone(armature_name="MyRig", bone_name="root", new_scale=(None, None, None)):
+def scale_bone(armature_name="MyRig", bone_name="root", new_scale=(None, None, None), defer_update=False):
     """
     Scales a specified bone in pose mode.
     If any element in `new_scale` is None, the current scale value is retained for that axis.
     """
-    if armature_name not in bpy.data.objects:
-        print(f"Armature '{armature_name}' not found in bpy.data.objects")
+    bone = registry.default_registry.pose_bone(armature_name, bone_name)
+    if bone is None:
+        logger.warning("Bone '%s' not found in armature '%s'", bone_name, armature_name)
         return
 
-    armature_obj = bpy.data.objects[armature_name]
-    bpy.context.view_layer.objects.active = armature_obj
-    bpy.ops.object.mode_set(mode='POSE')
-
-    if bone_name not in armature_obj.pose.bones:
-        print(f"Bone '{bone_name}' not found in armature '{armature_name}'")
-        return
-
-    bone = armature_obj.pose.bones[bone_name]
-
-    # Get current scale as a mutable vector
-    current_scale = bone.scale.copy()
-    new_x, new_y, new_z = new_scale
-
-    # Update only if a new value is provided
-    if new_x is not None:
-        current_scale.x = new_x
-    if new_y is not None:
-        current_scale.y = new_y
-    if new_z is not None:
-        current_scale.z = new_z
+    bone.scale = merge_axes(bone.scale, new_scale)
+    logger.debug("Bone '%s' in '%s' scaled to %s", bone_name, armature_name, bone.scale)
 
-    bone.scale = current_scale
-    print(f"Bone '{bone_name}' in '{armature_name}' scaled to {bone.scale}")
+    if not defer_update:
+        update_view_layer()
 
-    bpy.ops.object.mode_set(mode='OBJECT')
 
-
-def transform_multiple_bones_in_pose_mode(armature_name="MyRig", bone_transforms=None, frame=None, keyframe=True):
+def transform_multiple_bones_in_pose_mode(armature_name="MyRig", bone_transforms=None, frame=None, keyframe=True,
+                                          defer_update=False):
     """
     Transforms multiple bones simultaneously in pose mode.
     For each bone provided, you can specify a new location and/or a new rotation.
+    Locations and rotations are each written for all bones at once with foreach_set(), without switching modes.
     
     Parameters:
         armature_name (str): Name of the armature object.
@@ -223,52 +204,69 @@ def transform_multiple_bones_in_pose_mode(armature_name="MyRig", bone_transforms
                                 value is another dictionary that can include:
                                   - "location": A tuple (x, y, z)
                                   - "rotation": A tuple (rx, ry, rz) in radians
+        frame (int): Frame the scene jumps to before the bones are written, and where they are keyed.
+        keyframe (bool): Key the new values at frame (or the current frame) with bake_bone_channels().
+        defer_update (bool): Leave the scene update to a later update_view_layer() call.
     """
     if bone_transforms is None:
-        print("No bone transforms provided.")
+        logger.warning("No bone transforms provided.")
         return
 
-    if armature_name not in bpy.data.objects:
-        print(f"Armature '{armature_name}' not found in bpy.data.objects")
+    armature_registry = registry.default_registry
+    armature_obj = armature_registry.armature(armature_name)
+    if armature_obj is None:
+        logger.warning("Armature '%s' not found in bpy.data.objects", armature_name)
         return
 
-    armature_obj = bpy.data.objects[armature_name]
-    bpy.context.view_layer.objects.active = armature_obj
-    bpy.ops.object.mode_set(mode='POSE')
-
+    # Write at the keyed frame, so evaluating an existing action doesn't overwrite the new pose
     if frame is not None:
         bpy.context.scene.frame_set(frame)
 
+    channel_names = {"location": [], "rotation_euler": []}
+    channel_rows = {"location": [], "rotation_euler": []}
+    channel_values = {"location": [], "rotation_euler": []}
     for bone_name, transforms in bone_transforms.items():
-        if bone_name not in armature_obj.pose.bones:
-            print(f"Bone '{bone_name}' not found in armature '{armature_name}'")
+        bone = armature_registry.pose_bone(armature_name, bone_name)
+        if bone is None:
+            logger.warning("Bone '%s' not found in armature '%s'", bone_name, armature_name)
             continue
-
-        bone = armature_obj.pose.bones[bone_name]
+        row = armature_registry.bone_index(armature_registry.slot(armature_name), bone_name)
 
         # Update translation if provided
         if "location" in transforms:
-            bone.location = transforms["location"]
-            if keyframe:
-                bone.keyframe_insert(data_path="location", index=-1)
-            print(f"Bone '{bone_name}' moved to {transforms['location']}")
+            channel_names["location"].append(bone_name)
+            channel_rows["location"].append(row)
+            channel_values["location"].append(transforms["location"])
+            logger.debug("Bone '%s' moved to %s", bone_name, transforms["location"])
 
         # Update rotation if provided
         if "rotation" in transforms:
-            bone.rotation_mode = 'XYZ'  # Ensure we are using Euler rotations
-            bone.rotation_euler = transforms["rotation"]
-            if keyframe:
-                bone.keyframe_insert(data_path="rotation_euler", index=-1)
-            print(f"Bone '{bone_name}' rotated to {transforms['rotation']}")
+            if bone.rotation_mode != 'XYZ':
+                bone.rotation_mode = 'XYZ'  # Ensure we are using Euler rotations
+            channel_names["rotation_euler"].append(bone_name)
+            channel_rows["rotation_euler"].append(row)
+            channel_values["rotation_euler"].append(transforms["rotation"])
+            logger.debug("Bone '%s' rotated to %s", bone_name, transforms["rotation"])
+
+    for channel, rows in channel_rows.items():
+        if rows:
+            write_pose_channel(armature_obj, channel, rows, channel_values[channel])
+
+    if keyframe:
+        key_frame = bpy.context.scene.frame_current
+        for channel, bone_names in channel_names.items():
+            if bone_names:
+                bake_bone_channels(armature_name, bone_names, [channel_values[channel]], key_frame, channel)
 
     if frame is not None:
         marker_name = f"Keyframe {frame}"
         bpy.context.scene.timeline_markers.new(marker_name, frame=frame)
 
-    bpy.ops.object.mode_set(mode='OBJECT')
+    if not defer_update:
+        update_view_layer()
 
 
-def change_ryp(armature_name="MyRig", bone_name="root", new_ryp=None):
+def change_ryp(armature_name="MyRig", bone_name="root", new_ryp=None, defer_update=False):
     """
     Changes the rotation of a specified bone in pose mode using roll, yaw, and pitch values.
     This version allows partial updates (e.g., only roll, or only yaw, etc.).
@@ -282,70 +280,224 @@ def change_ryp(armature_name="MyRig", bone_name="root", new_ryp=None):
         armature_name (str): Name of the armature object.
         bone_name (str): Name of the bone to be rotated.
         new_ryp (tuple): A tuple of three floats (or None) representing (roll, yaw, pitch).
+        defer_update (bool): Leave the scene update to a later update_view_layer() call.
     """
-    # Check if the armature exists
-    print("armature name: ", armature_name, " bone name: ", bone_name)
+    logger.debug("armature name: %s bone name: %s", armature_name, bone_name)
     if new_ryp is None:
         new_ryp = [None, None, None]
-    if armature_name not in bpy.data.objects:
-        print(f"Armature '{armature_name}' not found in bpy.data.objects")
+
+    # Check if the bone exists
+    bone = registry.default_registry.pose_bone(armature_name, bone_name)
+    if bone is None:
+        logger.warning("Bone '%s' not found in armature '%s'", bone_name, armature_name)
         return
 
-    armature_obj = bpy.data.objects[armature_name]
-    bpy.context.view_layer.objects.active = armature_obj
-    bpy.ops.object.mode_set(mode='POSE')
+    # Switches the bone to 'XYZ' and keeps the current value of every None axis
+    write_bone_rotations([(bone, new_ryp)])
+
+    if not defer_update:
+        update_view_layer()
+
+
+def write_bone_rotations(pose_bone_rotations):
+    """
+    Writes rotations straight onto pose bones, without switching modes.
+    Each pose bone's rotation_euler is written exactly once.
+
+    Parameters:
+        pose_bone_rotations (iterable): (pose_bone, [roll, yaw, pitch]) pairs. A None element
+                                        leaves that axis unchanged.
+
+    Returns:
+        int: Number of bones written.
+    """
+    bones_touched = 0
+    for bone, new_ryp in pose_bone_rotations:
+        if bone.rotation_mode != 'XYZ':
+            bone.rotation_mode = 'XYZ'
+
+        # Merge the new axes with the current rotation, then write it back once
+        current_euler = bone.rotation_euler
+        rotation = [current_euler[0], current_euler[1], current_euler[2]]
+        for axis, value in enumerate(new_ryp):
+            if value is not None:
+                rotation[axis] = value
+        bone.rotation_euler = rotation
+        bones_touched += 1
+    return bones_touched
+
+
+# Pose-bone channels bake_bone_channels() can key, and their number of components
+KEYFRAME_CHANNELS = {"location": 3, "rotation_euler": 3, "rotation_quaternion": 4, "scale": 3}
+
+
+# action pointer -> (number of F-curves, {(data_path, index): F-curve}), see action_fcurves()
+_action_fcurves = {}
 
-    # Check if the bone exists in pose mode
-    if bone_name not in armature_obj.pose.bones:
-        print(f"Bone '{bone_name}' not found in armature '{armature_name}'")
-        bpy.ops.object.mode_set(mode='OBJECT')
-        return
 
-    bone = armature_obj.pose.bones[bone_name]
+def get_action(armature_obj):
+    """Returns the armature's action, creating the animation data and action if needed."""
+    animation_data = armature_obj.animation_data or armature_obj.animation_data_create()
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(name=f"{armature_obj.name}Action")
+    return animation_data.action
 
-    # Ensure rotation mode is 'XYZ'
-    bone.rotation_mode = 'XYZ'
 
-    # Get the current rotation
-    current_euler = bone.rotation_euler.copy()
+def action_fcurves(action):
+    """
+    The action's (data_path, index) -> F-curve map, for bulk lookups. Kept per action and rebuilt only when
+    its number of F-curves changed behind our back, such as after keyframe_insert() or curves deleted in the UI.
+    """
+    pointer = action.as_pointer()
+    cached = _action_fcurves.get(pointer)
+    if cached is None or cached[0] != len(action.fcurves):
+        cached = (len(action.fcurves),
+                  {(fcurve.data_path, fcurve.array_index): fcurve for fcurve in action.fcurves})
+        _action_fcurves[pointer] = cached
+    return cached[1]
 
-    # Unpack the new roll, yaw, pitch
-    roll, yaw, pitch = new_ryp
 
-    # If any component is None, keep the current value
-    if roll is not None:
-        current_euler.x = roll
-    if yaw is not None:
-        current_euler.y = yaw
-    if pitch is not None:
-        current_euler.z = pitch
+def get_bone_fcurve(armature_obj, bone_name, channel="rotation_euler", index=0, fcurves=None):
+    """
+    Returns the F-curve of one pose-bone channel component, creating the action and F-curve if needed.
+    The F-curve is grouped under the bone's name, like keyframe_insert does.
 
-    # Assign the updated rotation back to the bone
-    bone.rotation_euler = current_euler
+    fcurves (dict): Optional (data_path, index) -> F-curve map of the action, such as action_fcurves() returns,
+                    updated when a curve is created. action.fcurves.find() is a linear search, so bulk callers
+                    look curves up here instead.
+    """
+    action = get_action(armature_obj)
+    data_path = f'pose.bones["{bpy.utils.escape_identifier(bone_name)}"].{channel}'
+    if fcurves is not None:
+        fcurve = fcurves.get((data_path, index))
+    else:
+        fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=bone_name)
+        if fcurves is not None:
+            fcurves[(data_path, index)] = fcurve
+            cached = _action_fcurves.get(action.as_pointer())
+            if cached is not None and cached[1] is fcurves:
+                _action_fcurves[action.as_pointer()] = (cached[0] + 1, fcurves)
+    return fcurve
+
+
+def set_keyframes(fcurve, frames, values):
+    """
+    Keys many frames of one F-curve at once: keys on frames that already have one are overwritten,
+    the rest are allocated with a single keyframe_points.add() and filled with foreach_set().
 
-    # Return to Object mode
-    bpy.ops.object.mode_set(mode='OBJECT')
+    Parameters:
+        fcurve: A Blender F-curve.
+        frames (array-like): Frame numbers.
+        values (array-like): One value per frame.
+
+    Returns:
+        int: Number of keys written.
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    values = np.asarray(values, dtype=np.float32)
+    points = fcurve.keyframe_points
+    existing = len(points)
+    co = np.empty((existing + len(frames), 2), dtype=np.float32)  # room for every key to be new
+    points.foreach_get("co", co[:existing].reshape(-1))
+
+    new = slice(None)
+    added = len(frames)
+    if existing:
+        # Keys are kept sorted by frame, so matching frames are found with a binary search
+        existing_frames = co[:existing, 0]
+        positions = existing_frames.searchsorted(frames)
+        replace = existing_frames.take(positions, mode="clip") == frames  # past the end: the last key is smaller
+        co[positions[replace], 1] = values[replace]
+        new = ~replace
+        added = int(np.count_nonzero(new))
+    if added:
+        points.add(added)
+        co[existing:existing + added, 0] = frames[new]
+        co[existing:existing + added, 1] = values[new]
+    points.foreach_set("co", co[:existing + added].reshape(-1))
+    fcurve.update()
+    return len(frames)
+
+
+def bake_bone_channels(armature_name, bone_names, values, frames, channel="rotation_euler"):
+    """
+    Bakes a block of animation into the armature's action in bulk, without keyframe_insert, frame_set
+    or mode switches. Each F-curve is written with one set_keyframes() call.
 
+    Parameters:
+        armature_name (str): Name of the armature object.
+        bone_names (list): Bone of every column of values.
+        values (array-like): (frames, bones, channels) array. NaN entries get no key.
+        frames (int or array-like): Frame number of every row, or the frame of the first row
+                                    for consecutive frames.
+        channel (str): "location", "rotation_euler", "rotation_quaternion" or "scale".
+
+    Returns:
+        int: Number of keys written.
+    """
+    armature_obj = registry.default_registry.armature(armature_name)
+    if armature_obj is None:
+        logger.warning("Armature '%s' not found in bpy.data.objects", armature_name)
+        return 0
+    values = np.asarray(values, dtype=np.float32)
+    if values.ndim != 3 or values.shape[1] != len(bone_names) or values.shape[2] != KEYFRAME_CHANNELS[channel]:
+        raise ValueError(f"values must be (frames, {len(bone_names)}, {KEYFRAME_CHANNELS[channel]}) for {channel}, "
+                         f"got {values.shape}")
+    if np.ndim(frames) == 0:
+        frames = frames + np.arange(len(values), dtype=np.float32)
+    frames = np.asarray(frames, dtype=np.float32)
+
+    fcurves = action_fcurves(get_action(armature_obj))
+    keyed = np.isfinite(values)
+    any_keyed = keyed.any(axis=0).tolist()  # (bones, channels)
+    all_keyed = keyed.all(axis=0).tolist()
+    keys_written = 0
+    for column, bone_name in enumerate(bone_names):
+        if not any(any_keyed[column]):
+            continue
+        bone = registry.default_registry.pose_bone(armature_name, bone_name)
+        if bone is None:
+            logger.warning("Bone '%s' not found in armature '%s'", bone_name, armature_name)
+            continue
+        if channel == "rotation_euler" and bone.rotation_mode != 'XYZ':
+            bone.rotation_mode = 'XYZ'
+        for index, has_keys in enumerate(any_keyed[column]):
+            if not has_keys:
+                continue
+            fcurve = get_bone_fcurve(armature_obj, bone_name, channel, index, fcurves)
+            if all_keyed[column][index]:
+                keys_written += set_keyframes(fcurve, frames, values[:, column, index])
+            else:
+                rows = keyed[:, column, index]
+                keys_written += set_keyframes(fcurve, frames[rows], values[rows, column, index])
+    return keys_written
+
+
+def get_name_and_update_index(armature_names, previous=None, spare_bones=0):
+    """
+    Gives each armature a contiguous, non-overlapping FEAGI index range (three indexes per bone) in
+    armature_names order. Names that aren't armatures are skipped. See routing.allocate_index_ranges()
+    for previous and spare_bones, which keep ranges stable across reloads.
 
-def get_name_and_update_index(armature_names):
-    model_list = {}
-    index = 0
+    Returns:
+        dict: armature name -> [first FEAGI index, last FEAGI index]
+    """
+    bone_counts = {}
     for armature_name in armature_names:
         armature = bpy.data.objects.get(armature_name)
-        print(f"Current armature:{armature_name}")
+        logger.info("Current armature: %s", armature_name)
         if not armature or armature.type != 'ARMATURE':
-            print(f"Armature '{armature_name}' not found or is not an armature")
-            return
-        if index == 0:
-            model_list[armature_name] = [index , len(armature.pose.bones) * 3]
-        else:
-            model_list[armature_name] = [index, (len(armature.pose.bones) * 3) + index]
-        index = (len(armature.pose.bones)) * 3
-    return model_list
+            logger.warning("Armature '%s' not found or is not an armature, skipping it", armature_name)
+            continue
+        bone_counts[armature_name] = len(armature.pose.bones)
+    return routing.allocate_index_ranges(bone_counts, previous, spare_bones)
 
 
 def main():
     clear_terminal()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     # print(sys.executable)
 
     # 1. Print available armatures and bones so you can see the exact names
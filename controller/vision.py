@@ -0,0 +1,231 @@
+import threading
+
+import bpy
+import numpy as np
+
+from log_utils import get_logger
+
+logger = get_logger("vision")
+
+
+class FrameRing:
+    """
+    Bounded ring of preallocated frame slots between the capture timer and the vision thread.
+
+    push() copies a frame into the next slot; when every slot is full the oldest frame is dropped and counted,
+    so the vision thread always gets the freshest frames and memory never grows. pop() copies the oldest
+    frame out into the consumer's own buffer, so a slot is never read while the timer overwrites it.
+
+    Parameters:
+        capacity (int): Frames that can wait.
+        shape (tuple): Shape of every frame, such as (height, width, 3).
+        dtype: Frame dtype.
+    """
+
+    def __init__(self, capacity, shape, dtype=np.uint8):
+        self.slots = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.capacity = capacity
+        self.start = 0
+        self.count = 0
+        self.counters = {"pushed": 0, "popped": 0, "dropped": 0}
+        self._ready = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        return self.count
+
+    def push(self, frame):
+        """Copies frame into the ring, dropping the oldest frame if it is full."""
+        with self._ready:
+            if self.count == self.capacity:
+                self.start = (self.start + 1) % self.capacity
+                self.count -= 1
+                self.counters["dropped"] += 1
+            np.copyto(self.slots[(self.start + self.count) % self.capacity], frame)
+            self.count += 1
+            self.counters["pushed"] += 1
+            self._ready.notify()
+
+    def pop(self, out, timeout=None):
+        """
+        Copies the oldest frame into out. Waits up to timeout seconds for one (forever if None).
+
+        Returns:
+            bool: False if no frame arrived in time.
+        """
+        with self._ready:
+            if not self.count and not self._ready.wait_for(lambda: self.count, timeout):
+                return False
+            np.copyto(out, self.slots[self.start])
+            self.start = (self.start + 1) % self.capacity
+            self.count -= 1
+            self.counters["popped"] += 1
+            return True
+
+    def new_frame(self):
+        """A zeroed frame buffer shaped like the slots, for pop()."""
+        return np.zeros_like(self.slots[0])
+
+
+def parse_size(text):
+    """ "320x240" -> (320, 240). None or "" -> None."""
+    if not text:
+        return None
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def frame_layout(render_size, retina_size=None):
+    """
+    How to turn a render into the retina's frame: a centred crop followed by an integer-stride downsample.
+
+    Parameters:
+        render_size (tuple): (width, height) that is rendered.
+        retina_size (tuple): (width, height) the retina wants. Defaults to render_size.
+
+    Returns:
+        tuple: (stride, (x0, y0), (width, height) of the output frame)
+    """
+    render_width, render_height = render_size
+    retina_width, retina_height = retina_size or render_size
+    stride = max(1, min(render_width // retina_width, render_height // retina_height))
+    width = min(retina_width, render_width // stride)
+    height = min(retina_height, render_height // stride)
+    return stride, ((render_width - width * stride) // 2, (render_height - height * stride) // 2), (width, height)
+
+
+def find_view3d():
+    """First 3D viewport of the open windows as (area, space, region), or None (e.g. blender --background)."""
+    window_manager = bpy.context.window_manager
+    for window in window_manager.windows if window_manager else ():
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                for region in area.regions:
+                    if region.type == 'WINDOW':
+                        return area, area.spaces.active, region
+    return None
+
+
+class CameraCapture:
+    """
+    Renders a scene camera offscreen with the viewport renderer and queues the pixels for the vision thread.
+
+    Everything is allocated once: the GPU offscreen target, the GPU-side pixel buffer it is read into, the
+    NumPy view over that buffer and the ring slots. A capture is one draw, one read_color() and one copy into
+    the ring that flips the rows (OpenGL is bottom-up), drops alpha, reorders RGB to OpenCV's BGR, crops and
+    downsamples in the same strided pass.
+
+    Attributes:
+        ring (FrameRing): Frames of shape (height, width, 3) uint8, BGR, top row first.
+        stats (dict): captures, and skipped when there was no camera or 3D viewport.
+    """
+
+    def __init__(self, camera_name, render_size=(256, 256), retina_size=None, ring_capacity=4):
+        """
+        Parameters:
+            camera_name (str): The camera object to look through.
+            render_size (tuple): (width, height) of the offscreen render.
+            retina_size (tuple): (width, height) of the frames handed to the retina. See frame_layout().
+            ring_capacity (int): Frames that can wait for the vision thread.
+        """
+        self.camera_name = camera_name
+        self.render_size = tuple(render_size)
+        self.stride, self.crop_origin, self.frame_size = frame_layout(self.render_size, retina_size)
+        width, height = self.frame_size
+        self.ring = FrameRing(ring_capacity, (height, width, 3))
+        self.stats = {"captures": 0, "skipped": 0}
+        self._offscreen = None
+        self._gpu_buffer = None
+        self._pixels = None
+        self._source = None
+
+    def _allocate(self):
+        import gpu
+
+        width, height = self.render_size
+        self._offscreen = gpu.types.GPUOffScreen(width, height)
+        self._gpu_buffer = gpu.types.Buffer('UBYTE', (height, width, 4))
+        # gpu.types.Buffer exposes the buffer protocol, so this is a view of the pixels read_color() writes
+        self._pixels = np.frombuffer(self._gpu_buffer, dtype=np.uint8).reshape(height, width, 4)
+        # Rows flipped (bottom-up -> top-down), cropped, downsampled and BGR, as one strided view
+        stride = self.stride
+        x0, y0 = self.crop_origin
+        frame_width, frame_height = self.frame_size
+        rows = slice(y0 + (frame_height - 1) * stride, (y0 - 1) if y0 else None, -stride)
+        self._source = self._pixels[rows, x0:x0 + frame_width * stride:stride, 2::-1]
+
+    def capture(self):
+        """
+        Renders one frame and queues it. Must run on Blender's main thread.
+
+        Returns:
+            bool: False if the camera or a 3D viewport is missing.
+        """
+        camera = bpy.data.objects.get(self.camera_name)
+        view3d = find_view3d()
+        if camera is None or view3d is None:
+            self.stats["skipped"] += 1
+            return False
+        if self._offscreen is None:
+            self._allocate()
+
+        import gpu
+
+        _, space, region = view3d
+        scene = bpy.context.scene
+        width, height = self.render_size
+        view_matrix = camera.matrix_world.inverted()
+        projection_matrix = camera.calc_matrix_camera(bpy.context.evaluated_depsgraph_get(), x=width, y=height)
+        with self._offscreen.bind():
+            framebuffer = gpu.state.active_framebuffer_get()
+            framebuffer.clear(color=(0.0, 0.0, 0.0, 1.0))
+            self._offscreen.draw_view3d(scene, bpy.context.view_layer, space, region, view_matrix,
+                                        projection_matrix, do_color_management=True)
+            framebuffer.read_color(0, 0, width, height, 4, 0, 'UBYTE', data=self._gpu_buffer)
+        self.ring.push(self._source)
+        self.stats["captures"] += 1
+        return True
+
+    def close(self):
+        if self._offscreen is not None:
+            self._offscreen.free()
+        self._offscreen = self._gpu_buffer = self._pixels = self._source = None
+
+
+class VisionWorker:
+    """
+    Takes frames off a CameraCapture's ring on its own thread and hands them to process(frame), which does
+    the retina work and sends to FEAGI. The frame buffer is reused, so process() must copy anything it keeps.
+    """
+
+    def __init__(self, ring, process, poll_timeout=0.5):
+        self.ring = ring
+        self.process = process
+        self.poll_timeout = poll_timeout
+        self.frame = ring.new_frame()
+        self.counters = {"frames_processed": 0, "errors": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feagi-vision", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.ring.pop(self.frame, self.poll_timeout):
+                continue
+            try:
+                self.process(self.frame)
+                self.counters["frames_processed"] += 1
+            except Exception:
+                self.counters["errors"] += 1
+                logger.exception("Vision frame failed")
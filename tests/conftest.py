@@ -0,0 +1,47 @@
+"""
+Runs the controller modules against the stand-in bpy from benchmarks/fake_bpy.py, so the tests only need
+NumPy and pytest:
+
+    python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "controller"), os.path.join(ROOT, "benchmarks")]
+
+import fake_bpy  # noqa: E402
+
+fake_bpy.install()
+
+import registry  # noqa: E402
+
+
+@pytest.fixture
+def bpy():
+    """The stand-in bpy, with no objects in the scene."""
+    fake_bpy.reset()
+    yield fake_bpy
+    fake_bpy.reset()
+
+
+@pytest.fixture
+def armature_registry(bpy):
+    return registry.ArmatureRegistry()
+
+
+@pytest.fixture
+def servo_capabilities():
+    """Builds capabilities['output']['servo'] for an armature, three indexes per bone from first."""
+    def build(armature_obj, first=0, max_power=None):
+        capabilities = {}
+        for bone_number, bone in enumerate(armature_obj.pose.bones):
+            for axis in range(3):
+                servo_data = {"custom_name": bone.name}
+                if max_power is not None:
+                    servo_data["max_power"] = max_power
+                capabilities[str(first + bone_number * 3 + axis)] = servo_data
+        return capabilities
+    return build
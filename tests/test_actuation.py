@@ -0,0 +1,74 @@
+import pytest
+
+import actuation
+import routing
+
+
+class PoseCommand(dict):
+    """A pose command stamped with the routing table it was decoded with, like controller.PoseCommand."""
+
+    def __init__(self, routing_table, bone_rotations):
+        super().__init__(bone_rotations)
+        self.routing_table = routing_table
+
+
+@pytest.fixture
+def rigs(bpy, armature_registry, servo_capabilities):
+    """Two 3-bone rigs routed side by side, and their servo capabilities with max_power 0.1."""
+    first = bpy.make_synthetic_rig("First", 3)
+    second = bpy.make_synthetic_rig("Second", 3)
+    servos = {**servo_capabilities(first, max_power=0.1), **servo_capabilities(second, first=9, max_power=0.1)}
+    table = routing.build_routing_table(servos, {"First": [0, 8], "Second": [9, 17]}, armature_registry)
+    return first, second, table, servos
+
+
+def make_actuator(rigs, armature_registry, smoothing_time):
+    _, _, table, servos = rigs
+    return actuation.SmoothedActuator(table, servos, smoothing_time=smoothing_time, frame_rate=24,
+                                      armature_registry=armature_registry)
+
+
+def test_straight_move_is_rate_limited(rigs, armature_registry):
+    first, second, _, _ = rigs
+    actuator = make_actuator(rigs, armature_registry, smoothing_time=0)
+    actuator.set_targets({0: [0.25, None, -0.05], 4: [None, 0.3, None]})
+
+    assert actuator.step(1 / 24) == 2
+    assert tuple(first.pose.bones[0].rotation_euler) == pytest.approx((0.1, 0.0, -0.05))
+    assert tuple(second.pose.bones[1].rotation_euler) == pytest.approx((0.0, 0.1, 0.0))
+    assert actuator.stats["rate_limited"] == 2
+
+    for _ in range(5):
+        actuator.step(1 / 24)
+    assert tuple(first.pose.bones[0].rotation_euler) == pytest.approx((0.25, 0.0, -0.05))
+    assert tuple(second.pose.bones[1].rotation_euler) == pytest.approx((0.0, 0.3, 0.0))
+    assert actuator.step(1 / 24) == 0  # settled bones are no longer written
+
+
+def test_smoothing_converges_and_leaves_undriven_axes(rigs, armature_registry):
+    first = rigs[0]
+    first.pose.bones[1].rotation_euler = (0.0, 0.0, 0.4)
+    actuator = make_actuator(rigs, armature_registry, smoothing_time=0.1)
+    actuator.max_step[:] = float("inf")
+    actuator.set_targets({1: [0.2, -0.2, None]})
+
+    actuator.step(1 / 24)
+    halfway = tuple(first.pose.bones[1].rotation_euler)
+    assert 0.0 < halfway[0] < 0.2
+    for _ in range(48):
+        actuator.step(1 / 24)
+    assert tuple(first.pose.bones[1].rotation_euler) == pytest.approx((0.2, -0.2, 0.4), abs=1e-4)
+    assert not actuator.moving.any()
+
+
+def test_commands_from_another_routing_table_are_dropped(rigs, armature_registry):
+    first, _, table, servos = rigs
+    actuator = make_actuator(rigs, armature_registry, smoothing_time=0)
+    old_table = routing.build_routing_table(servos, {"First": [0, 8]}, armature_registry)
+
+    assert not actuator.set_targets(PoseCommand(old_table, {0: [0.05, 0.05, 0.05]}))
+    assert actuator.set_targets(PoseCommand(table, {0: [0.05, None, None], 99: [1.0, 1.0, 1.0]}))
+    actuator.step(1 / 24)
+    assert actuator.stats["stale_commands"] == 1
+    assert tuple(first.pose.bones[0].rotation_euler) == pytest.approx((0.05, 0.0, 0.0))
+
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+
+import capabilities_cache
+import routing
+
+SERVOS = {
+    "4": {"custom_name": "hand"},
+    "0": {"custom_name": "arm"},
+    "1": {"custom_name": "arm"},
+    "3": {"custom_name": "hand"},
+    "9": {}
+}
+MODEL_LIST = {"Rig": [0, 8], "Prop": [9, 11]}
+
+
+def write_capabilities(path, servos):
+    with open(path, "w") as f:
+        json.dump({"capabilities": {"output": {"servo": servos}}}, f)
+
+
+def test_round_trip(tmp_path):
+    cache_path = str(tmp_path / "capabilities.cache")
+    capabilities_cache.write_cache(capabilities_cache.compile_cache(SERVOS, MODEL_LIST, b"d" * 20), cache_path)
+    cache = capabilities_cache.read_cache(cache_path)
+    try:
+        assert cache.digest == b"d" * 20
+        assert len(cache) == 5
+        np.testing.assert_array_equal(cache.servo_indexes, [0, 1, 3, 4, 9])
+        assert cache.names == ["arm", "hand", ""]
+        assert cache.map_translation() == {0: "arm", 1: "arm", 3: "hand", 4: "hand", 9: ""}
+        assert cache.model_list() == MODEL_LIST
+    finally:
+        cache.close()
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    cache_path = tmp_path / "capabilities.cache"
+    assert capabilities_cache.read_cache(str(cache_path)) is None
+    cache_path.write_bytes(b"")
+    assert capabilities_cache.read_cache(str(cache_path)) is None
+    cache_path.write_bytes(b"FGCC\x63\x00\x00\x00" + bytes(40))
+    assert capabilities_cache.read_cache(str(cache_path)) is None
+
+
+def test_load_or_build_follows_the_json(tmp_path):
+    json_path = str(tmp_path / "capabilities.json")
+    write_capabilities(json_path, SERVOS)
+    built = capabilities_cache.load_or_build(json_path, model_list=lambda: MODEL_LIST)
+    built.close()
+
+    cached = capabilities_cache.load_or_build(json_path, model_list=lambda: {"Other": [0, 2]})
+    assert cached.model_list() == MODEL_LIST  # unchanged sources: read from the cache, not rebuilt
+    cached.close()
+
+    write_capabilities(json_path, {"0": {"custom_name": "arm"}})
+    rebuilt = capabilities_cache.load_or_build(json_path, model_list={"Rig": [0, 2]})
+    assert len(rebuilt) == 1
+    assert rebuilt.model_list() == {"Rig": [0, 2]}
+    rebuilt.close()
+
+
+def test_routing_from_arrays_matches_routing_from_names(bpy, armature_registry, servo_capabilities):
+    first = bpy.make_synthetic_rig("First", 5)
+    second = bpy.make_synthetic_rig("Second", 4)
+    servos = {**servo_capabilities(first), **servo_capabilities(second, first=30)}
+    servos["31"]["custom_name"] = "missing_bone"
+    servos["60"] = {"custom_name": "bone_00000"}  # outside every range
+    model_list = {"First": [0, 14], "Second": [30, 41]}
+    cache = capabilities_cache.compile_cache(servos, model_list, b"")
+
+    from_names = routing.build_routing_table_from_names(cache.servo_names(), model_list, armature_registry)
+    from_arrays = routing.build_routing_table_from_arrays(cache.servo_indexes, cache.servo_name_ids, cache.names,
+                                                          model_list, armature_registry)
+
+    assert from_arrays.routes == from_names.routes
+    assert from_arrays.bones == from_names.bones
+    assert from_arrays.armatures == from_names.armatures
+    assert from_arrays.generation == from_names.generation
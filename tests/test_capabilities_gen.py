@@ -0,0 +1,158 @@
+import json
+
+import numpy as np
+import pytest
+
+import capabilities_gen
+
+
+def test_array_ranges_match_the_per_bone_functions(bpy):
+    rig = bpy.build_armature("Rig", [
+        {"name": "root", "parent": None, "head": (0.0, 0.0, 0.0), "tail": (0.0, 0.0, 2.0)},
+        {"name": "point", "parent": "root", "head": (1.0, 1.0, 1.0), "tail": (1.0, 1.0, 1.0)},  # zero length
+        {"name": "arm", "parent": "root", "head": (0.0, 0.0, 2.0), "tail": (0.3, -0.4, 2.0)},
+        {"name": "finger", "parent": "arm", "head": (0.3, -0.4, 2.0), "tail": (0.3, -0.4, 2.05)},
+    ])
+    bone_names, heads, tails = capabilities_gen.read_bone_geometry(rig)
+    lengths = capabilities_gen.compute_bone_lengths(heads, tails)
+    ranges = capabilities_gen.compute_ranges(lengths)
+
+    assert bone_names == ["root", "point", "arm", "finger"]
+    np.testing.assert_allclose(lengths, [2.0, 0.0, 0.5, 0.05], rtol=1e-6)
+    np.testing.assert_allclose(ranges, [0.25, 0.5, 1.0, 10.0], rtol=1e-5)
+    for pose_bone, length, dynamic_range in zip(rig.pose.bones, lengths, ranges):
+        assert length == pytest.approx(capabilities_gen.compute_bone_length(pose_bone), rel=1e-6)
+        assert capabilities_gen.compute_gyro_range(pose_bone)["max_value"] == pytest.approx(dynamic_range, rel=1e-5)
+        assert capabilities_gen.compute_servo_range(pose_bone)["min_value"] == pytest.approx(-dynamic_range, rel=1e-5)
+
+
+def test_bone_geometry_follows_pose_bone_order(bpy):
+    rig = bpy.make_synthetic_rig("Rig", 4)
+    heads = np.array([bone.bone.head.to_tuple() for bone in rig.pose.bones], dtype=np.float32)
+    rig.data.bones = bpy.Collection(reversed(list(rig.data.bones)))
+
+    bone_names, read_heads, read_tails = capabilities_gen.read_bone_geometry(rig)
+    assert bone_names == rig.pose.bones.keys()
+    np.testing.assert_array_equal(read_heads, heads)
+    np.testing.assert_array_equal(read_tails, [bone.bone.tail.to_tuple() for bone in rig.pose.bones])
+
+
+def plan(bone_counts, previous=None, fingerprints=None):
+    fingerprints = fingerprints or {armature_name: "same" for armature_name in bone_counts}
+    return capabilities_gen.plan_layout(list(bone_counts), bone_counts, fingerprints, previous)
+
+
+def manifest(layout, retired=None):
+    return {"version": capabilities_gen.MANIFEST_VERSION, "armatures": layout, "retired": retired or {}}
+
+
+def starts(layout):
+    return {armature_name: entry["start"] for armature_name, entry in layout.items()}
+
+
+def test_first_layout_is_contiguous():
+    layout, changed, retired = plan({"A": 3, "B": 2, "C": 4})
+    assert starts(layout) == {"A": 0, "B": 3, "C": 5}
+    assert changed == {"A", "B", "C"}
+    assert retired == {}
+
+
+def test_unchanged_armatures_keep_their_indices():
+    previous, _, _ = plan({"A": 3, "B": 2})
+    layout, changed, _ = plan({"A": 3, "B": 2}, manifest(previous), fingerprints={"A": "same", "B": "edited"})
+    assert starts(layout) == {"A": 0, "B": 3}
+    assert changed == {"B"}
+
+
+def test_grown_armature_moves_after_the_last_used_index():
+    previous, _, _ = plan({"A": 3, "B": 2, "C": 4})
+    layout, changed, _ = plan({"A": 5, "B": 1, "C": 4}, manifest(previous))
+    assert starts(layout) == {"A": 9, "B": 3, "C": 5}
+    assert layout["B"]["reserved"] == 2  # shrinking keeps the whole range
+    assert changed == {"A"}
+
+    layout, _, _ = plan({"A": 5, "B": 2, "C": 4, "D": 1}, manifest(layout))
+    assert starts(layout) == {"A": 9, "B": 3, "C": 5, "D": 14}
+
+
+def test_removed_ranges_stay_reserved():
+    previous, _, _ = plan({"A": 3, "B": 2, "C": 4})
+    layout, _, retired = plan({"A": 3, "B": 2}, manifest(previous))
+    assert set(retired) == {"C"}
+
+    layout, changed, retired = plan({"A": 3, "B": 2, "D": 1}, manifest(layout, retired))
+    assert starts(layout)["D"] == 9  # not 5, where C was
+    assert changed == {"D"}
+    assert set(retired) == {"C"}
+
+    layout, changed, retired = plan({"A": 3, "B": 2, "D": 1, "C": 4}, manifest(layout, retired))
+    assert starts(layout)["C"] == 5  # back in its old range
+    assert changed == set()
+    assert retired == {}
+
+
+def test_plan_layout_does_not_modify_the_previous_manifest():
+    previous, _, _ = plan({"A": 3, "B": 2})
+    previous_manifest = manifest(previous)
+    snapshot = json.dumps(previous_manifest, sort_keys=True)
+    plan({"B": 5, "C": 1}, previous_manifest)
+    assert json.dumps(previous_manifest, sort_keys=True) == snapshot
+
+
+def test_reuse_armature_entries(bpy, servo_capabilities):
+    rig = bpy.make_synthetic_rig("Rig", 2)
+    gyro, servo = capabilities_gen.generate_armature_entries(rig, 4)
+    assert sorted(servo, key=int) == [str(index) for index in range(12, 18)]
+
+    assert capabilities_gen.reuse_armature_entries(servo, 4, 2) == (gyro, servo)
+    del servo["16"]
+    assert capabilities_gen.reuse_armature_entries(servo, 4, 2) is None
+
+
+def test_regeneration_does_not_hand_out_removed_ranges(bpy, tmp_path):
+    for armature_name, bone_count in [("A", 3), ("B", 2), ("C", 4)]:
+        bpy.make_synthetic_rig(armature_name, bone_count)
+    output_path = str(tmp_path / "capabilities.json")
+    assert capabilities_gen.generate_capabilities_json(["A", "B", "C"], output_path)
+    assert not capabilities_gen.generate_capabilities_json(["A", "B", "C"], output_path)
+
+    assert capabilities_gen.generate_capabilities_json(["A", "C"], output_path)
+    bpy.make_synthetic_rig("D", 1)
+    assert capabilities_gen.generate_capabilities_json(["A", "C", "D"], output_path)
+    assert capabilities_gen.load_layout(output_path) == {"A": [0, 8], "C": [15, 26], "D": [27, 29]}
+    with open(output_path) as f:
+        servo = json.load(f)["capabilities"]["output"]["servo"]
+    assert sorted(map(int, servo)) == list(range(0, 9)) + list(range(15, 30))
+
+
+@pytest.fixture
+def armature_names_cache(monkeypatch):
+    monkeypatch.setitem(capabilities_gen._armature_names_cache, "key", None)
+    return capabilities_gen._armature_names_cache
+
+
+def test_armature_names_are_sorted_without_metarigs(bpy, armature_names_cache):
+    for name in ["Zed", "Human", "Human_Rigify", "Alpha"]:
+        bpy.make_synthetic_rig(name, 1)
+    bpy.add_object("Camera", type='CAMERA')
+    assert capabilities_gen.get_all_armature_names() == ["Alpha", "Human_Rigify", "Zed"]
+
+
+def test_armature_names_are_cached_until_objects_change(bpy, armature_names_cache):
+    rig = bpy.make_synthetic_rig("Rig", 1)
+    prop = bpy.add_object("Prop")
+    names = capabilities_gen.get_all_armature_names()
+    assert names == ["Rig"]
+    names.append("caller's own list")
+
+    prop.type = 'ARMATURE'  # can't happen in Blender; shows whether the cached result was used
+    assert capabilities_gen.get_all_armature_names() == ["Rig"]
+    assert capabilities_gen.get_all_armature_names(use_cache=False) == ["Prop", "Rig"]
+    prop.type = 'MESH'
+
+    rig.name = "Armature"
+    assert capabilities_gen.get_all_armature_names() == ["Armature"]
+    bpy.make_synthetic_rig("Added", 1)
+    assert capabilities_gen.get_all_armature_names() == ["Added", "Armature"]
+    bpy.data.objects.remove(rig)
+    assert capabilities_gen.get_all_armature_names() == ["Added"]
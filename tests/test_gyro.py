@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import gyro
+
+
+def frame_of(rotations, layout=None):
+    rotations = np.asarray(rotations, dtype=np.float32)
+    return gyro.GyroFrame(rotations, layout if layout is not None else {str(row): row for row in range(len(rotations))})
+
+
+def test_only_bones_past_epsilon_are_sent():
+    delta_filter = gyro.GyroDeltaFilter(epsilon=0.01, keyframe_interval=100)
+    frame = frame_of([[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+    assert len(delta_filter.filter(frame)) == 3  # the first burst is a keyframe
+
+    frame.array[0, 1] = 0.005  # below epsilon
+    frame.array[2, 2] = 0.02
+    assert dict(delta_filter.filter(frame)).keys() == {"2"}
+
+    frame.array[0, 1] = 0.012  # drifted past epsilon since it was last sent
+    assert list(delta_filter.filter(frame)) == ["0"]
+    assert len(delta_filter.filter(frame)) == 0
+
+
+def test_full_snapshot_every_keyframe_interval():
+    delta_filter = gyro.GyroDeltaFilter(epsilon=0.01, keyframe_interval=3)
+    frame = frame_of(np.zeros((4, 3)))
+    assert [len(delta_filter.filter(frame)) for _ in range(7)] == [4, 0, 0, 4, 0, 0, 4]
+
+    delta_filter.reset()
+    assert len(delta_filter.filter(frame)) == 4
+
+
+def test_new_layout_resyncs():
+    delta_filter = gyro.GyroDeltaFilter(epsilon=0.01, keyframe_interval=100)
+    delta_filter.filter(frame_of(np.zeros((2, 3))))
+
+    # Same shape, but the rows now belong to other bones
+    rebuilt = frame_of(np.zeros((2, 3)), {"10": 0, "11": 1})
+    assert list(delta_filter.filter(rebuilt)) == ["10", "11"]
+    assert len(delta_filter.filter(rebuilt.copy())) == 0  # copies keep their layout
+
+
+def test_sampler_rebuilds_after_registry_changes(bpy, armature_registry):
+    first = bpy.make_synthetic_rig("First", 2)
+    bpy.make_synthetic_rig("Second", 3)
+    sampler = gyro.GyroSampler({"First": [0, 5], "Second": [6, 14]}, armature_registry)
+    first.pose.bones[1].rotation_euler = (0.1, 0.2, 0.3)
+
+    frame = sampler.sample()
+    assert list(frame) == ["0", "1", "6", "7", "8"]
+    assert tuple(frame["1"]) == pytest.approx((0.1, 0.2, 0.3))
+    assert sampler.row_bones()[2] == ("Second", "bone_00000")
+
+    bpy.data.objects.remove(first)
+    armature_registry.invalidate()
+    armature_registry.refresh()
+    rebuilt = sampler.sample()
+    assert rebuilt.layout is not frame.layout
+    assert list(rebuilt) == ["6", "7", "8"]
@@ -0,0 +1,50 @@
+import influence
+
+#   root
+#   ├── spine ── chest ── arm ── hand (IK, chain_count 2)
+#   └── leg
+#   prop copies chest's transforms
+BONE_NAMES = ["root", "spine", "chest", "arm", "hand", "leg", "prop"]
+PARENTS = [-1, 0, 1, 2, 3, 0, -1]
+
+
+def graph(ik_chains=(), copy_edges=()):
+    return influence.InfluenceGraph(BONE_NAMES, PARENTS, ik_chains, copy_edges)
+
+
+def test_fk_moves_descendants_breadth_first():
+    fk = graph()
+    assert fk.affected("root") == ["root", "spine", "leg", "chest", "arm", "hand"]
+    assert fk.affected("arm") == ["arm", "hand"]
+    assert fk.affected("hand") == ["hand"]
+    assert fk.affected("missing") == []
+    assert not fk.affects(4, 3)
+
+
+def test_ik_moves_its_chain():
+    assert graph(ik_chains=[(4, 2)]).affected("hand") == ["hand", "arm"]
+    assert graph(ik_chains=[(4, 0)]).affected("hand") == ["hand", "arm", "chest", "spine", "root", "leg"]
+
+
+def test_copy_constraint_moves_its_owner():
+    copy = graph(copy_edges=[(2, 6)])
+    assert copy.affected("chest") == ["chest", "arm", "prop", "hand"]
+    assert copy.affects(1, 6)  # transitively, through chest
+    assert copy.affected("prop") == ["prop"]
+    assert copy.affected_mask([3, 6]).tolist() == [False, False, False, True, True, False, True]
+
+
+def test_closures_are_walked_once_and_read_only():
+    fk = graph()
+    closure = fk.affected_indices(1)
+    assert fk.affected_indices(1) is closure
+    assert not closure.flags.writeable
+
+
+def test_from_pose_bones_reads_constraints(bpy):
+    rig = bpy.make_synthetic_rig("Rig", 12, branching=1)  # a chain; IK on bone 10, bone 7 copies bone 6
+    from_pose = influence.InfluenceGraph.from_pose_bones(rig)
+
+    assert from_pose.affected("bone_00010") == ["bone_00010", "bone_00011", "bone_00009"]
+    assert "bone_00007" in from_pose.affected("bone_00006")
+    assert from_pose.parents.tolist() == list(range(-1, 11))
@@ -0,0 +1,85 @@
+import io
+import json
+
+import pytest
+
+import model_tree
+
+HEADER = {"object_name": "Rig", "possible_constraint_types": ["IK", "COPY_TRANSFORMS"]}
+
+BONES = [
+    {"name": "root", "parent": None, "constraints": [], "custom_properties": {}},
+    {"name": "spine", "parent": "root", "constraints": [{"name": "IK", "type": "IK", "influence": 0.5,
+                                                         "chain_count": 2}],
+     "custom_properties": {"follow": 1.0, "nested": {"list": [1, [2, 3]], "empty": {}}}},
+    {"name": "arm.L", "parent": "spine", "constraints": [], "custom_properties": {"label": "é\"\n"}},
+    {"name": "arm.R", "parent": "spine", "constraints": [], "custom_properties": {"empty": []}},
+    {"name": "head", "parent": "spine", "constraints": [], "custom_properties": {}},
+]
+
+
+def streamed(bones, compact=False):
+    f = io.StringIO()
+    count = model_tree.write_rig_hierarchy(f, HEADER, iter(bones), compact)
+    assert count == len(bones)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 256])
+@pytest.mark.parametrize("bone_count", [0, 1, 5])
+def test_streamed_export_matches_json_dumps(monkeypatch, batch_size, bone_count):
+    monkeypatch.setattr(model_tree, "PRETTY_BATCH_SIZE", batch_size)
+    bones = BONES[:bone_count]
+    assert streamed(bones) == json.dumps({**HEADER, "bones": bones}, indent=4)
+
+
+def test_compact_export_is_the_same_document():
+    text = streamed(BONES, compact=True)
+    assert json.loads(text) == {**HEADER, "bones": BONES}
+    assert len(text.splitlines()) == len(BONES) + 1  # one bone per line
+
+
+def rig_specs():
+    return [
+        {"name": "root", "parent": None},
+        {"name": "spine", "parent": "root", "custom_properties": {"follow": 1.0}},
+        {"name": "arm.L", "parent": "spine", "constraints": [{"type": "IK", "chain_count": 2}]},
+        {"name": "arm.R", "parent": "spine"},
+    ]
+
+
+@pytest.mark.parametrize("compact, binary", [(False, False), (True, True)])
+def test_changes_round_trip(bpy, tmp_path, compact, binary):
+    base_path = str(tmp_path / "base.json")
+    bpy.build_armature("Rig", rig_specs())
+    model_tree.export_rig_hierarchy("Rig", base_path, compact, binary)
+
+    specs = rig_specs()
+    specs[1]["custom_properties"] = {"follow": 0.0}  # changed
+    specs[3]["parent"] = "root"  # reparented
+    del specs[2]  # removed
+    specs.append({"name": "tail", "parent": "root"})  # added
+    bpy.reset()
+    bpy.build_armature("Rig", specs)
+    changes_path = str(tmp_path / "changes.json")
+    assert model_tree.export_rig_changes("Rig", changes_path, base_path, compact, binary) == 3
+
+    changes = model_tree.load_rig_hierarchy(changes_path)
+    assert changes["removed_bones"] == ["arm.L"]
+    assert [bone["name"] for bone in changes["bones"]] == ["spine", "arm.R", "tail"]
+
+    full_path = str(tmp_path / "full.json")
+    model_tree.export_rig_hierarchy("Rig", full_path)
+    assert model_tree.apply_rig_changes(model_tree.load_rig_hierarchy(base_path), changes) == \
+        model_tree.load_rig_hierarchy(full_path)
+
+
+def test_unchanged_rig_exports_no_bones(bpy, tmp_path):
+    base_path = str(tmp_path / "base.json")
+    bpy.build_armature("Rig", rig_specs())
+    model_tree.export_rig_hierarchy("Rig", base_path)
+    changes_path = str(tmp_path / "changes.json")
+
+    assert model_tree.export_rig_changes("Rig", changes_path, base_path) == 0
+    base = model_tree.load_rig_hierarchy(base_path)
+    assert model_tree.apply_rig_changes(base, model_tree.load_rig_hierarchy(changes_path)) == base
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+import pipeline
+
+
+class FakeConnector:
+    """Stands in for pns: hands out the latest message object from FEAGI and records what was sent."""
+
+    def __init__(self):
+        self.latest = None
+        self.sent_frames = []
+        self.sent_messages = []
+
+    def publish(self, message):
+        self.latest = message
+
+    def read_message(self):
+        return self.latest
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def connector():
+    return FakeConnector()
+
+
+@pytest.fixture
+def make_pipeline(connector):
+    pipelines = []
+
+    def make(decode=lambda message: [message["burst"]], **kwargs):
+        feagi_pipeline = pipeline.FeagiPipeline(connector.read_message, decode, connector.sent_frames.append,
+                                                send_message=connector.sent_messages.append, **kwargs)
+        pipelines.append(feagi_pipeline)
+        return feagi_pipeline
+
+    yield make
+    for feagi_pipeline in pipelines:
+        feagi_pipeline.stop()
+
+
+def publish_and_wait(connector, feagi_pipeline, burst):
+    decoded = feagi_pipeline.counters["messages_decoded"]
+    connector.publish({"burst": burst})
+    wait_until(lambda: feagi_pipeline.counters["messages_decoded"] > decoded)
+
+
+def test_commands_are_decoded_in_order(connector, make_pipeline):
+    feagi_pipeline = make_pipeline()
+    feagi_pipeline.start()
+    for burst in range(3):
+        publish_and_wait(connector, feagi_pipeline, burst)
+
+    assert feagi_pipeline.drain_commands() == [[0], [1], [2]]
+    assert feagi_pipeline.drain_commands() == []
+    assert feagi_pipeline.counters["commands_applied"] == 3
+
+
+def test_the_same_message_is_decoded_once(connector, make_pipeline):
+    feagi_pipeline = make_pipeline()
+    message = {"burst": 0}
+    connector.publish(message)
+    feagi_pipeline.start()
+    wait_until(lambda: feagi_pipeline.counters["messages_decoded"] == 1)
+    time.sleep(0.02)  # the worker keeps reading the same object
+
+    connector.publish({"burst": 0})  # equal, but a new message
+    wait_until(lambda: feagi_pipeline.counters["messages_decoded"] == 2)
+    assert feagi_pipeline.drain_commands() == [[0], [0]]
+
+
+def test_oldest_command_is_dropped_when_full(connector, make_pipeline):
+    feagi_pipeline = make_pipeline(max_commands=2)
+    feagi_pipeline.start()
+    for burst in range(4):
+        publish_and_wait(connector, feagi_pipeline, burst)
+
+    assert feagi_pipeline.drain_commands() == [[2], [3]]
+    stats = feagi_pipeline.stats()
+    assert stats["messages_decoded"] == 4
+    assert stats["commands_dropped"] == 2
+    assert stats["commands_applied"] == 2
+    assert stats["command_queue_depth"] == 0
+
+
+def test_frames_and_messages_are_sent_from_the_worker(connector, make_pipeline):
+    feagi_pipeline = make_pipeline(max_frames=2, max_messages=1)
+    senders = []
+    feagi_pipeline.send = lambda frame: senders.append((threading.current_thread().name, frame))
+    for frame in range(3):
+        feagi_pipeline.submit_frame(frame)
+    feagi_pipeline.submit_message("vision 1")
+    feagi_pipeline.submit_message("vision 2")
+    stats = feagi_pipeline.stats()
+    assert (stats["frame_queue_depth"], stats["frames_dropped"]) == (2, 1)
+    assert (stats["message_queue_depth"], stats["messages_dropped"]) == (1, 1)
+
+    feagi_pipeline.start()
+    wait_until(lambda: feagi_pipeline.counters["messages_sent"] == 1 and feagi_pipeline.counters["frames_sent"] == 2)
+    assert senders == [("feagi-io", 1), ("feagi-io", 2)]
+    assert connector.sent_messages == ["vision 2"]
+
+
+def test_worker_survives_errors(connector, make_pipeline):
+    def decode(message):
+        if message["burst"] == 0:
+            raise ValueError("bad burst")
+        return [message["burst"]]
+
+    feagi_pipeline = make_pipeline(decode=decode)
+    feagi_pipeline.start()
+    connector.publish({"burst": 0})
+    wait_until(lambda: feagi_pipeline.counters["errors"] == 1)
+    publish_and_wait(connector, feagi_pipeline, 1)
+
+    assert feagi_pipeline.is_running()
+    assert feagi_pipeline.drain_commands() == [[1]]
+
+
+def test_stop_joins_the_worker(make_pipeline):
+    feagi_pipeline = make_pipeline(poll_interval=10.0)
+    feagi_pipeline.start()
+    assert feagi_pipeline.stats()["running"]
+
+    started = time.monotonic()
+    feagi_pipeline.stop()
+    assert time.monotonic() - started < 1.0  # woken up, not left to finish its poll_interval
+    assert not feagi_pipeline.is_running()
+    assert not any(thread.name == "feagi-io" for thread in threading.enumerate())
@@ -0,0 +1,108 @@
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import gyro
+import pose_bus
+import shared_buffers
+
+
+class RecordingClient:
+    """A run_sidecar() client that hands out queued servo data and keeps the gyro data it is sent."""
+
+    def __init__(self, servo_data=()):
+        self.servo_data = list(servo_data)
+        self.gyro_frames = []
+
+    def receive(self):
+        return self.servo_data.pop(0) if self.servo_data else None
+
+    def send_gyro(self, gyro_data):
+        self.gyro_frames.append(gyro_data)
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def bus(tmp_path, monkeypatch):
+    """
+    A bus whose sidecar runs in a thread of this process. Its attaching side keeps the tracker registration,
+    which shared_buffers._attach drops for a separate sidecar process, as this process also owns the segments.
+    """
+    monkeypatch.setattr(shared_buffers, "_attach", lambda name: shared_memory.SharedMemory(name=name))
+    servo_bus = pose_bus.PoseBus(6, 3, str(tmp_path))
+    yield servo_bus
+    servo_bus.stop()
+
+
+def run_sidecar_thread(servo_bus, client):
+    spec = dict(servo_bus.spec(), parent_pid=None)
+    thread = threading.Thread(target=pose_bus.run_sidecar, args=(spec, client), daemon=True)
+    thread.start()
+    return thread
+
+
+def test_gyro_keys_round_trip_exactly(bus):
+    client = RecordingClient()
+    thread = run_sidecar_thread(bus, client)
+    big_key = 2 ** 24 + 1  # the next float32 after 2**24 is 2**24 + 2
+    rotations = np.array([[0.1, 0.2, 0.3], [1.0, 2.0, 3.0]], dtype=np.float32)
+    bus.publish_gyro(gyro.GyroFrame(rotations, {str(big_key): 0, "7": 1}))
+    wait_until(lambda: client.gyro_frames)
+
+    assert list(client.gyro_frames[0]) == [str(big_key), "7"]
+    np.testing.assert_allclose(client.gyro_frames[0][str(big_key)], [0.1, 0.2, 0.3], rtol=1e-6)
+    np.testing.assert_allclose(client.gyro_frames[0]["7"], [1.0, 2.0, 3.0])
+
+    bus.publish_gyro(gyro.GyroFrame(rotations, {"0": 0, "1": 1, "2": 0, "3": 1}))  # one row more than fits
+    wait_until(lambda: len(client.gyro_frames) == 2)
+    assert list(client.gyro_frames[1]) == ["0", "1", "2"]
+    assert bus.stats()["gyro_rows_truncated"] == 1
+
+    bus.stop()
+    thread.join(5.0)
+    assert not thread.is_alive()
+
+
+def test_servo_data_reaches_blender(bus):
+    client = RecordingClient([{0: 0.5, 4: -0.25, 99: 1.0}, {4: -0.25, 5: 0.125}])
+    run_sidecar_thread(bus, client)
+    changed = {}
+    wait_until(lambda: changed.update(bus.read_servo()) or len(changed) == 3)
+
+    assert changed == {0: 0.5, 4: -0.25, 5: 0.125}  # 99 is out of range
+    assert bus.read_servo() == {}
+
+
+def test_sidecar_process_with_fake_feagi(tmp_path):
+    servo_bus = pose_bus.PoseBus(4, 2, str(tmp_path), fake_feagi=True)
+    try:
+        servo_bus.start()
+        seen = {}
+        wait_until(lambda: seen.update(servo_bus.read_servo()) or len(seen) == 4)
+        assert all(abs(value) <= 0.5 for value in seen.values())
+        servo_bus.publish_gyro(gyro.GyroFrame(np.zeros((1, 3), dtype=np.float32), {"0": 0}))
+        assert servo_bus.stats()["sidecar_alive"]
+    finally:
+        process = servo_bus.process
+        servo_bus.stop()
+    assert process.returncode == 0
+
+
+def test_fake_feagi_sends_at_its_burst_rate():
+    now = [0.0]
+    fake = pose_bus.FakeFeagi(3, burst_rate=10.0, clock=lambda: now[0])
+    assert len(fake.receive()) == 3
+    assert fake.receive() is None
+    now[0] = 0.1
+    assert fake.receive() is not None
+    fake.send_gyro({"0": [0.0, 0.0, 0.0], "1": [0.0, 0.0, 0.0]})
+    assert fake.counters == {"bursts": 2, "gyro_frames": 1, "gyro_rows": 2}
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import recorder
+
+BONES = [("Rig", "bone_00000"), ("Rig", "bone_00001")]
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip(tmp_path, compress):
+    path = str(tmp_path / "session.fgpr")
+    pose_recorder = recorder.PoseRecorder(path, chunk_frames=2, flush_interval=60.0, compress=compress)
+    pose_recorder.set_layout(BONES, gyro_bones=BONES[:1])
+    pose_recorder.start()
+    pose_recorder.record({0: [0.5, None, -0.5]}, gyro_values=np.array([[1.0, 2.0, 3.0]]), timestamp=0.0)
+    pose_recorder.record({1: [0.1, 0.2, 0.3]}, timestamp=0.1)
+    pose_recorder.record(None, timestamp=0.2)
+    pose_recorder.stop()
+
+    assert pose_recorder.stats()["frames_recorded"] == 3
+    assert pose_recorder.stats()["chunks_written"] == 2
+    frames = list(recorder.PoseReplayer(path).frames())
+    assert [timestamp for _, timestamp, _, _ in frames] == pytest.approx([0.0, 0.1, 0.2])
+    layout, _, servo, gyro = frames[0]
+    assert [tuple(bone) for bone in layout["bones"]] == BONES
+    np.testing.assert_array_equal(servo, [[0.5, np.nan, -0.5], [np.nan, np.nan, np.nan]])
+    np.testing.assert_array_equal(gyro, [[1.0, 2.0, 3.0]])
+    assert np.isnan(frames[1][3]).all()  # no gyro sample in that burst
+    assert np.isnan(frames[2][2]).all()
+
+
+def test_layout_change_never_waits_for_the_writer(tmp_path):
+    path = str(tmp_path / "session.fgpr")
+    pose_recorder = recorder.PoseRecorder(path, chunk_frames=1, max_pending_chunks=1, flush_interval=60.0)
+    writer_may_run = threading.Event()
+    write_record = pose_recorder._write_record
+
+    def stalled_write_record(tag, payload):
+        writer_may_run.wait()
+        write_record(tag, payload)
+
+    pose_recorder._write_record = stalled_write_record
+    pose_recorder.set_layout(BONES[:1])
+    pose_recorder.start()
+    for frame in range(4):
+        pose_recorder.record({0: [frame, 0.0, 0.0]}, timestamp=float(frame))
+
+    pose_recorder.set_layout(BONES)  # the queue is full and the writer stalled
+    writer_may_run.set()
+    while pose_recorder.stats()["pending_chunks"]:
+        time.sleep(0.001)
+    pose_recorder.record({1: [9.0, 9.0, 9.0]}, timestamp=9.0)
+    pose_recorder.stop()
+
+    assert pose_recorder.stats()["frames_dropped"] > 0
+    layouts = [[tuple(bone) for bone in layout["bones"]]
+               for layout, _, _, _ in recorder.PoseReplayer(path).chunks()]
+    assert layouts[0] == BONES[:1]
+    assert layouts[-1] == BONES
+
+
+def test_stop_does_not_block_on_a_full_queue(tmp_path):
+    path = str(tmp_path / "session.fgpr")
+    pose_recorder = recorder.PoseRecorder(path, chunk_frames=1, max_pending_chunks=1, flush_interval=60.0)
+    writer_may_run = threading.Event()
+    write_record = pose_recorder._write_record
+
+    def stalled_write_record(tag, payload):
+        writer_may_run.wait()
+        write_record(tag, payload)
+
+    pose_recorder._write_record = stalled_write_record
+    pose_recorder.set_layout(BONES[:1])
+    pose_recorder.start()
+    log = pose_recorder._file
+    for frame in range(3):  # one chunk held by the writer, one queued, the rest dropped
+        pose_recorder.record({0: [frame, 0.0, 0.0]}, timestamp=float(frame))
+
+    started = time.monotonic()
+    pose_recorder.stop(timeout=0.05)
+    assert time.monotonic() - started < 1.0
+    assert not pose_recorder.is_recording()
+    assert not log.closed  # the writer still has chunks for it
+
+    writer_may_run.set()
+    pose_recorder.start()  # waits for the previous writer before replacing the log
+    assert log.closed
+    pose_recorder.stop()
+
+
+def test_stopped_writer_writes_every_queued_chunk(tmp_path):
+    path = str(tmp_path / "session.fgpr")
+    pose_recorder = recorder.PoseRecorder(path, chunk_frames=1, max_pending_chunks=1, flush_interval=60.0)
+    writer_may_run = threading.Event()
+    write_record = pose_recorder._write_record
+
+    def stalled_write_record(tag, payload):
+        writer_may_run.wait()
+        write_record(tag, payload)
+
+    pose_recorder._write_record = stalled_write_record
+    pose_recorder.set_layout(BONES[:1])
+    pose_recorder.start()
+    pose_recorder.record({0: [0.0, 0.0, 0.0]}, timestamp=0.0)
+    while pose_recorder.stats()["pending_chunks"]:  # the writer took it and stalls
+        time.sleep(0.001)
+    pose_recorder.record({0: [1.0, 0.0, 0.0]}, timestamp=1.0)
+    writer = pose_recorder._thread
+    pose_recorder.stop(timeout=0.05)
+
+    writer_may_run.set()
+    writer.join(5.0)
+    assert not writer.is_alive()
+    assert pose_recorder.stats()["chunks_written"] == 2
+    assert [timestamp for _, timestamp, _, _ in recorder.PoseReplayer(path).frames()] == [0.0, 1.0]
+
+
+def test_replay_applies_driven_axes(bpy, armature_registry, tmp_path):
+    rig = bpy.make_synthetic_rig("Rig", 2)
+    rig.pose.bones["bone_00000"].rotation_euler = (0.0, 0.7, 0.0)
+    path = str(tmp_path / "session.fgpr")
+    pose_recorder = recorder.PoseRecorder(path)
+    pose_recorder.set_layout(BONES + [("Rig", "missing")])
+    pose_recorder.start()
+    pose_recorder.record({0: [0.5, None, -0.5], 2: [1.0, 1.0, 1.0]}, timestamp=0.0)
+    pose_recorder.stop()
+
+    replayer = recorder.PoseReplayer(path, armature_registry)
+    (layout, _, servo, _), = replayer.frames()
+    pose_bones = replayer.resolve(layout)
+    assert pose_bones[2] is None
+    assert replayer.apply(pose_bones, servo) == 1
+    assert tuple(rig.pose.bones["bone_00000"].rotation_euler) == pytest.approx((0.5, 0.7, -0.5))
+    assert tuple(rig.pose.bones["bone_00001"].rotation_euler) == (0.0, 0.0, 0.0)
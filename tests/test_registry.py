@@ -0,0 +1,96 @@
+import registry
+
+
+def test_resolves_handles_once(bpy, armature_registry):
+    rig = bpy.make_synthetic_rig("Rig", 3)
+
+    assert armature_registry.armature("Rig") is rig
+    pose_bone = armature_registry.pose_bone("Rig", "bone_00002")
+    assert pose_bone is rig.pose.bones["bone_00002"]
+    assert armature_registry.bone_index(armature_registry.slot("Rig"), "bone_00002") == 2
+    assert armature_registry.pose_bone("Rig", "missing") is None
+    assert armature_registry.armature("Missing") is None
+    assert armature_registry.generation == 1
+    assert not armature_registry.refresh()
+
+
+def test_lookups_only_register_armatures(bpy, armature_registry):
+    bpy.add_object("Prop")
+    assert armature_registry.armature("Typo") is None
+    assert armature_registry.armature("Prop") is None
+    assert armature_registry.pose_bone("Typo", "bone_00000") is None
+    assert len(armature_registry) == 0
+    assert armature_registry.slot("Typo") is None and armature_registry.slot("Prop") is None
+
+    rig = bpy.make_synthetic_rig("Rig", 2)
+    assert armature_registry.armature("Rig") is rig
+    assert armature_registry.armature_names == ["Rig"]
+
+
+def test_registered_name_is_resolved_once_it_exists(bpy, armature_registry):
+    registry.install_handlers(armature_registry)
+    slot = armature_registry.register("Later")
+    assert armature_registry.armature("Later") is None
+
+    rig = bpy.make_synthetic_rig("Later", 2)
+    bpy.notify_depsgraph(rig)
+    assert armature_registry.refresh()
+    assert armature_registry.slot("Later") == slot
+    assert armature_registry.armature("Later") is rig
+
+
+def test_deleted_armature_is_dropped_on_refresh(bpy, armature_registry):
+    rig = bpy.make_synthetic_rig("Rig", 3)
+    registry.install_handlers(armature_registry)
+    armature_registry.armature("Rig")
+    generation = armature_registry.generation
+
+    bpy.data.objects.remove(rig)
+    bpy.notify_depsgraph(bpy.context.scene)
+
+    assert armature_registry.refresh()
+    assert armature_registry.generation > generation
+    assert armature_registry.armature("Rig") is None
+    assert armature_registry.pose_bone("Rig", "bone_00000") is None
+
+
+def test_replaced_armature_gets_new_handles(bpy, armature_registry):
+    old_rig = bpy.make_synthetic_rig("Rig", 3)
+    registry.install_handlers(armature_registry)
+    armature_registry.pose_bone("Rig", "bone_00000")
+    generation = armature_registry.generation
+
+    bpy.data.objects.remove(old_rig)
+    new_rig = bpy.make_synthetic_rig("Rig", 5)
+    bpy.notify_depsgraph(bpy.context.scene)
+
+    assert armature_registry.refresh()
+    assert armature_registry.generation > generation
+    assert armature_registry.armature("Rig") is new_rig
+    assert armature_registry.pose_bone("Rig", "bone_00004") is new_rig.pose.bones["bone_00004"]
+
+
+def test_renamed_armature_keeps_its_slot(bpy, armature_registry):
+    rig = bpy.make_synthetic_rig("Rig", 2)
+    registry.install_handlers(armature_registry)
+    slot = armature_registry.register("Rig")
+
+    rig.name = "Renamed"
+    bpy.notify_depsgraph(rig)
+    armature_registry.refresh()
+
+    assert armature_registry.slot("Renamed") == slot
+    assert armature_registry.armature("Renamed") is rig
+    assert armature_registry.armature("Rig") is rig  # tables keyed by the old name keep working
+
+
+def test_unrelated_updates_are_cheap(bpy, armature_registry):
+    rig = bpy.make_synthetic_rig("Rig", 2)
+    registry.install_handlers(armature_registry)
+    armature_registry.armature("Rig")
+    generation = armature_registry.generation
+
+    bpy.notify_depsgraph(bpy.add_object("Prop"), rig)
+
+    assert not armature_registry.refresh()
+    assert armature_registry.generation == generation
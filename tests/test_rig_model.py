@@ -0,0 +1,108 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pytest
+
+import rig_model
+
+MODEL_TREE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "controller", "model_tree.json")
+
+
+@pytest.fixture(scope="module")
+def exported():
+    with open(MODEL_TREE, "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def model(exported):
+    return rig_model.RigModel(exported)
+
+
+def test_rigify_hierarchy(model):
+    assert model.object_name == "ClassicMan_Rigify"
+    assert model.bone_names[0] == "root"
+    assert model.parents[0] == -1
+    assert model.ancestors("ORG-hand.L")[:3] == ["ORG-forearm.L", "ORG-upper_arm.L", "ORG-shoulder.L"]
+    assert model.ancestors("DEF-forearm.L")[:2] == ["DEF-upper_arm.L.001", "DEF-upper_arm.L"]
+    assert model.ancestors("missing") == []
+
+    leg = model.subtree("ORG-thigh.L")
+    assert leg[0] == "ORG-thigh.L"
+    assert {"ORG-shin.L", "ORG-foot.L", "ORG-toe.L"} <= set(leg)
+    assert not any(bone_name.endswith(".R") for bone_name in leg)
+    assert model.is_ancestor(model.index["ORG-thigh.L"], model.index["ORG-toe.L"])
+    assert not model.is_ancestor(model.index["ORG-toe.L"], model.index["ORG-thigh.L"])
+
+
+def test_order_and_subtrees_match_the_parents(model):
+    parents = model.parents.tolist()
+    descendants = [{bone_index} for bone_index in range(len(model))]
+    for bone_index in model.order[::-1].tolist():
+        if parents[bone_index] >= 0:
+            descendants[parents[bone_index]] |= descendants[bone_index]
+
+    seen = set()
+    for bone_index in model.order.tolist():
+        assert parents[bone_index] < 0 or parents[bone_index] in seen  # parents come first
+        seen.add(bone_index)
+        assert set(model.subtree_indices(bone_index).tolist()) == descendants[bone_index]
+        assert model.depth[bone_index] == len(model.ancestor_indices(bone_index))
+
+
+def test_constraint_rows_follow_the_export(exported, model):
+    assert model.constraint_offsets[-1] == sum(len(bone["constraints"]) for bone in exported["bones"])
+    for bone_index, bone in enumerate(exported["bones"]):
+        assert model.constraints(bone["name"]) == \
+            [(constraint["name"], constraint["type"], constraint["influence"]) for constraint in bone["constraints"]]
+    assert model.constraints("ORG-forearm.L") == [("Copy Transforms", "COPY_TRANSFORMS", 1.0),
+                                                  ("Copy Transforms.001", "COPY_TRANSFORMS", 1.0)]
+    assert [model.bone_names[bone_index] for bone_index in model.bones_with_constraint("IK")] == \
+        ["MCH-shin_ik.L", "MCH-shin_ik.R", "MCH-forearm_ik.L", "MCH-forearm_ik.R"]
+    assert len(model.bones_with_constraint("SHRINKWRAP")) == 0
+
+
+def test_constraint_targets_and_unknown_types():
+    model = rig_model.RigModel({"object_name": "Rig", "possible_constraint_types": ["IK"], "bones": [
+        {"name": "root", "parent": None, "constraints": []},
+        {"name": "arm", "parent": "root", "constraints": [
+            {"name": "IK", "type": "IK", "influence": 0.5, "chain_count": 2},
+            {"name": "Copy", "type": "COPY_ROTATION", "target": "Rig", "subtarget": "root"},
+            {"name": "Prop", "type": "COPY_ROTATION", "target": "Prop", "subtarget": "root"},
+        ]},
+    ]})
+    np.testing.assert_array_equal(model.constraint_offsets, [0, 0, 3])
+    assert model.constraint_types == ["IK", "COPY_ROTATION"]
+    np.testing.assert_array_equal(model.constraint_codes, [0, 1, 1])
+    np.testing.assert_array_equal(model.constraint_subtargets, [-1, 0, -1])  # "Prop" is another object
+    np.testing.assert_array_equal(model.constraint_chain_counts, [2, 0, 0])
+    np.testing.assert_array_equal(model.constraint_owners(), [1, 1, 1])
+
+
+def test_diff_against_the_committed_export(exported, model):
+    newer = copy.deepcopy(exported)
+    bones = {bone["name"]: bone for bone in newer["bones"]}
+    newer["bones"].append({"name": "prop.L", "parent": "ORG-hand.L", "constraints": [], "custom_properties": {}})
+    newer["bones"].remove(bones["ORG-foot.L"])
+    bones["ORG-toe.R"]["parent"] = "ORG-shin.R"
+    bones["ORG-forearm.L"]["constraints"][0]["influence"] = 0.5
+    bones["torso"]["custom_properties"]["new_property"] = 1
+
+    diff = model.diff(rig_model.RigModel(newer))
+    assert diff.added == ["prop.L"]
+    assert diff.removed == ["ORG-foot.L"]
+    orphans = [bone["name"] for bone in exported["bones"] if bone["parent"] == "ORG-foot.L"]
+    assert orphans  # their parent is gone, so they count as reparented too
+    assert diff.reparented == sorted(orphans + ["ORG-toe.R"], key=model.index.get)
+    assert diff.constraints_changed == ["ORG-forearm.L"]
+    assert diff.properties_changed == ["torso"]
+    assert model.diff(model) == rig_model.RigDiff([], [], [], [], [])
+
+
+def test_bad_exports_are_rejected():
+    with pytest.raises(ValueError, match="Duplicate"):
+        rig_model.RigModel({"bones": [{"name": "a", "parent": None}, {"name": "a", "parent": None}]})
+    with pytest.raises(ValueError, match="cycle"):
+        rig_model.RigModel({"bones": [{"name": "a", "parent": "b"}, {"name": "b", "parent": "a"}]})
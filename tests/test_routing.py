@@ -0,0 +1,86 @@
+import routing
+
+
+def test_routes_follow_index_layout(bpy, armature_registry, servo_capabilities):
+    rig = bpy.make_synthetic_rig("Rig", 4)
+    table = routing.build_routing_table(servo_capabilities(rig), {"Rig": [0, 11]}, armature_registry)
+
+    assert len(table) == 12
+    assert len(table.bones) == 4
+    armature_obj, pose_bone, axis = table.lookup(7)
+    assert armature_obj is rig
+    assert pose_bone.name == "bone_00002"
+    assert axis == 1
+    assert table.routes[7][3] == table.bones.index(pose_bone)
+    assert table.generation == armature_registry.generation
+
+
+def test_unknown_armatures_and_bones_are_skipped(bpy, armature_registry, servo_capabilities):
+    rig = bpy.make_synthetic_rig("Rig", 2)
+    capabilities = servo_capabilities(rig)
+    capabilities["3"]["custom_name"] = "missing_bone"
+    capabilities["100"] = {"custom_name": "bone_00000"}
+    table = routing.build_routing_table(capabilities, {"Rig": [0, 5], "Gone": [100, 102]}, armature_registry)
+
+    assert sorted(table.routes) == [0, 1, 2, 4, 5]
+    assert 3 not in table
+    assert table.lookup(100) is None
+    assert len(table.bones) == 2
+
+
+def test_bone_slots_are_shared_across_armatures(bpy, armature_registry, servo_capabilities):
+    first = bpy.make_synthetic_rig("First", 2)
+    second = bpy.make_synthetic_rig("Second", 2)
+    capabilities = {**servo_capabilities(first), **servo_capabilities(second, first=6)}
+    table = routing.build_routing_table(capabilities, {"First": [0, 5], "Second": [6, 11]}, armature_registry)
+
+    assert len(table.bones) == 4
+    assert table.armatures == [first, first, second, second]
+    assert table.lookup(6)[0] is second
+    assert table.routes[6][3] == 2
+
+
+def test_index_ranges_find_owner_by_bisection():
+    index_ranges = routing.IndexRanges({"B": [30, 38], "A": [0, 8]})
+
+    assert index_ranges.names == ["A", "B"]
+    assert index_ranges.find(0) == "A"
+    assert index_ranges.find(8) == "A"
+    assert index_ranges.find(9) is None  # gap between the ranges
+    assert index_ranges.find(38) == "B"
+    assert index_ranges.find(39) is None
+    assert index_ranges.find(-1) is None
+
+
+def test_index_ranges_cut_overlaps_short():
+    index_ranges = routing.IndexRanges({"A": [0, 20], "B": [9, 17]})
+
+    assert index_ranges.find(8) == "A"
+    assert index_ranges.find(9) == "B"
+    assert index_ranges.find(18) is None
+
+
+def test_allocate_index_ranges_is_contiguous():
+    model_list = routing.allocate_index_ranges({"A": 2, "B": 3})
+
+    assert model_list == {"A": [0, 5], "B": [6, 14]}
+
+
+def test_allocate_index_ranges_keeps_previous_ranges():
+    previous = {"A": [0, 5], "B": [6, 14], "Gone": [15, 17]}
+    model_list = routing.allocate_index_ranges({"New": 1, "B": 3, "A": 3}, previous)
+
+    assert model_list["B"] == [6, 14]
+    # New and grown armatures go after the highest index in use, Gone's range stays reserved
+    assert model_list["New"] == [18, 20]
+    assert model_list["A"] == [21, 29]
+    assert list(model_list) == ["New", "B", "A"]
+
+
+def test_allocate_index_ranges_leaves_spare_bones():
+    model_list = routing.allocate_index_ranges({"A": 2, "B": 1}, spare_bones=2)
+    assert model_list == {"A": [0, 5], "B": [12, 14]}
+
+    grown = routing.allocate_index_ranges({"A": 4, "B": 1}, model_list, spare_bones=2)
+    assert grown["A"] == [0, 11]
+    assert grown["B"] == [12, 14]
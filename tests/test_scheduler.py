@@ -0,0 +1,76 @@
+import pytest
+
+import scheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(clock, work, **kwargs):
+    """A scheduler whose burst takes work() seconds of fake time."""
+    def callback(burst):
+        clock.now += work()
+    return scheduler.BurstScheduler(callback, 0.1, clock=clock, **kwargs)
+
+
+def test_burst_time_is_subtracted_from_the_wait():
+    clock = FakeClock()
+    burst_scheduler = make_scheduler(clock, lambda: 0.02)
+
+    assert burst_scheduler.tick() == pytest.approx(0.08)
+    clock.now += 0.09  # Blender woke us 10 ms late
+    assert burst_scheduler.tick() == pytest.approx(0.07)  # catches up to the 0.2 deadline
+    assert burst_scheduler.next_deadline == pytest.approx(0.2)
+    assert burst_scheduler.stats["missed_deadlines"] == 0
+
+
+def test_missed_deadlines_are_dropped_not_replayed():
+    clock = FakeClock()
+    work = [0.35, 0.02]
+    burst_scheduler = make_scheduler(clock, lambda: work.pop(0))
+
+    wait = burst_scheduler.tick()  # ends at 0.35: the 0.1, 0.2 and 0.3 deadlines are gone
+    assert burst_scheduler.stats["missed_deadlines"] == 3
+    assert burst_scheduler.next_deadline == pytest.approx(0.4)
+    assert wait == pytest.approx(0.05)
+
+    clock.now += wait
+    assert burst_scheduler.tick() == pytest.approx(0.08)
+    assert burst_scheduler.stats["ticks"] == 2
+
+
+def test_late_ticks_are_counted():
+    clock = FakeClock()
+    burst_scheduler = make_scheduler(clock, lambda: 0.0)
+    burst_scheduler.tick()
+    clock.now += 0.25  # more than one interval past the 0.1 deadline
+
+    burst_scheduler.tick()
+    assert burst_scheduler.lateness == pytest.approx(0.15)
+    assert burst_scheduler.stats["late_ticks"] == 1
+
+
+def test_gyro_runs_at_its_own_rate_and_within_budget():
+    clock = FakeClock()
+    due = []
+    burst_scheduler = scheduler.BurstScheduler(lambda burst: due.append(burst.gyro_due()), 0.1, gyro_interval=0.2,
+                                               clock=clock)
+    for _ in range(4):
+        clock.now += burst_scheduler.tick()
+    assert due == [True, False, True, False]
+    assert burst_scheduler.stats["gyro_throttled"] == 2
+
+    def slow_burst(burst):
+        clock.now += 0.09  # past the default budget of 80% of the interval
+        due.append(burst.gyro_due())
+
+    burst_scheduler.callback = slow_burst
+    burst_scheduler.tick()
+    assert due[-1] is False
+    assert burst_scheduler.stats["gyro_over_budget"] == 1
+    assert burst_scheduler.budget_left() == pytest.approx(0.08 - 0.09)
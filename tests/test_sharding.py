@@ -0,0 +1,47 @@
+import pytest
+
+import sharding
+
+
+def index_ranges(bone_counts):
+    """Contiguous FEAGI index ranges in bone_counts order, three indexes per bone."""
+    model_list = {}
+    first = 0
+    for name, bone_count in bone_counts.items():
+        model_list[name] = [first, first + bone_count * 3 - 1]
+        first += bone_count * 3
+    return model_list
+
+
+@pytest.mark.parametrize("worker_count, expected", [
+    (1, [["A", "B", "C", "D", "E", "F"]]),
+    (2, [["A", "B", "C"], ["D", "E", "F"]]),
+    (3, [["A", "B"], ["C", "D"], ["E", "F"]]),
+    (6, [["A"], ["B"], ["C"], ["D"], ["E"], ["F"]]),
+    (8, [["A"], ["B"], ["C"], ["D"], ["E"], ["F"]]),
+])
+def test_equal_armatures_split_evenly(worker_count, expected):
+    bone_counts = {name: 10 for name in "ABCDEF"}
+    assert sharding.plan_shards(index_ranges(bone_counts), bone_counts, worker_count) == expected
+
+
+def test_split_balances_bones_not_armatures():
+    bone_counts = {"A": 10, "B": 10, "C": 10, "D": 100, "E": 10}
+    model_list = index_ranges(bone_counts)
+    assert sharding.plan_shards(model_list, bone_counts, 2) == [["A", "B", "C"], ["D", "E"]]
+    assert sharding.plan_shards(model_list, bone_counts, 3) == [["A", "B", "C"], ["D"], ["E"]]
+
+
+def test_shards_follow_feagi_index_order():
+    bone_counts = {"C": 10, "A": 10, "B": 10, "D": 10}
+    model_list = {"A": [0, 29], "B": [30, 59], "C": [60, 89], "D": [90, 119]}
+    shards = sharding.plan_shards(model_list, bone_counts, 2)
+    assert shards == [["A", "B"], ["C", "D"]]
+    for shard, next_shard in zip(shards, shards[1:]):
+        assert max(model_list[name][1] for name in shard) < min(model_list[name][0] for name in next_shard)
+
+
+def test_armatures_without_bone_counts_are_left_out():
+    model_list = {"A": [0, 29], "B": [30, 59]}
+    assert sharding.plan_shards(model_list, {"B": 10}, 2) == [["B"]]
+    assert sharding.plan_shards({}, {}, 3) == [[]]
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import numpy as np
+import pytest
+
+import shared_buffers
+
+CONTROLLER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "controller")
+
+
+@pytest.fixture
+def shared():
+    """
+    A (4, 3) float32 array owned by this process, which both writes and reads it. Attaching is meant for
+    other processes (see shared_buffers._attach), which test_another_process_can_attach covers.
+    """
+    shared_array = shared_buffers.SharedArray(f"fgtest_{os.getpid()}_{uuid.uuid4().hex[:8]}", (4, 3),
+                                              create=True)
+    yield shared_array
+    shared_array.close()
+
+
+def test_read_returns_the_newest_write(shared):
+    out = np.zeros((4, 3), dtype=np.float32)
+    assert shared.sequence == 0
+    assert shared.read(out) is None
+
+    shared.write(np.full((4, 3), 1.0))
+    shared.write(np.arange(12).reshape(4, 3))
+    assert shared.sequence == 2
+    assert shared.read(out) == 2
+    np.testing.assert_array_equal(out, np.arange(12).reshape(4, 3))
+
+
+def test_only_new_skips_what_was_read(shared):
+    out = np.zeros((4, 3), dtype=np.float32)
+    shared.write(np.ones((4, 3)))
+
+    assert shared.read(out) == 1
+    assert shared.read(out) is None
+    assert shared.read(out, only_new=False) == 1
+    assert not shared.wait(0.01)
+
+    shared.write(np.zeros((4, 3)))
+    assert shared.wait(0.01)
+    assert shared.read(out) == 2
+
+
+def test_torn_slot_is_retried_then_given_up(shared):
+    out = np.zeros((4, 3), dtype=np.float32)
+    shared.write(np.ones((4, 3)))
+    shared.header[2] = 1  # slot 1 marked as being written again
+
+    assert shared.read(out) is None
+    np.testing.assert_array_equal(out, 0.0)
+
+
+def test_data_not_matching_the_checksum_is_rejected(shared):
+    out = np.zeros((4, 3), dtype=np.float32)
+    shared.write(np.ones((4, 3)))
+    shared.slots[1][2, 1] = 5.0  # a store that became visible out of order on a weakly ordered CPU
+
+    assert shared.read(out) is None
+    shared.write(np.full((4, 3), 2.0))
+    assert shared.read(out) == 2
+    np.testing.assert_array_equal(out, 2.0)
+
+
+def test_read_into_another_dtype(shared):
+    out = np.zeros((4, 3), dtype=np.float64)
+    shared.write(np.arange(12).reshape(4, 3) / 8)
+    assert shared.read(out) == 1
+    np.testing.assert_array_equal(out, np.arange(12).reshape(4, 3) / 8)
+
+
+def test_closed_flag_stops_waiting(shared):
+    assert not shared.closed
+    shared.header[3] = 1  # what the owner's close() sets before detaching
+    assert shared.closed
+    assert not shared.wait(1.0)
+
+
+def test_another_process_can_attach(shared):
+    script = (f"import sys; sys.path.insert(0, {CONTROLLER!r}); import numpy as np, shared_buffers; "
+              f"shared = shared_buffers.SharedArray({shared.name!r}, (4, 3)); "
+              f"shared.write(np.full((4, 3), 7.0)); shared.close()")
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=60)
+
+    out = np.zeros((4, 3), dtype=np.float32)
+    assert shared.read(out) == 1
+    np.testing.assert_array_equal(out, 7.0)
+    assert not shared.closed  # only the owner closes the array for the other side
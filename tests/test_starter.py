@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import registry
+import starter
+
+
+@pytest.fixture
+def rig(bpy, armature_registry, monkeypatch):
+    monkeypatch.setattr(registry, "default_registry", armature_registry)
+    return bpy.make_synthetic_rig("Rig", 3)
+
+
+def keys(fcurve):
+    co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+    fcurve.keyframe_points.foreach_get("co", co)
+    return co.reshape(-1, 2)
+
+
+def test_set_keyframes_replaces_and_adds(rig):
+    fcurve = starter.get_bone_fcurve(rig, "bone_00000")
+    assert starter.set_keyframes(fcurve, [5.0], [0.5]) == 1
+    assert starter.set_keyframes(fcurve, [1.0, 5.0, 9.0], [0.1, 0.2, 0.3]) == 3
+    assert starter.set_keyframes(fcurve, [9.0], [0.4]) == 1
+    np.testing.assert_allclose(keys(fcurve), [[1.0, 0.1], [5.0, 0.2], [9.0, 0.4]])
+
+
+def test_bake_bone_channels_skips_nan(rig):
+    values = np.full((2, 2, 3), np.nan, dtype=np.float32)
+    values[:, 0, 1] = [0.1, 0.2]
+    values[1, 1] = [1.0, 2.0, 3.0]
+
+    assert starter.bake_bone_channels("Rig", ["bone_00000", "bone_00001"], values, 10) == 5
+    action = starter.get_action(rig)
+    assert len(action.fcurves) == 4
+    np.testing.assert_allclose(keys(starter.get_bone_fcurve(rig, "bone_00000", index=1)), [[10.0, 0.1], [11.0, 0.2]])
+    np.testing.assert_allclose(keys(starter.get_bone_fcurve(rig, "bone_00001", index=2)), [[11.0, 3.0]])
+
+
+def test_action_fcurves_is_kept_per_action(rig):
+    action = starter.get_action(rig)
+    fcurves = starter.action_fcurves(action)
+    fcurve = starter.get_bone_fcurve(rig, "bone_00000", index=2, fcurves=fcurves)
+    assert starter.action_fcurves(action) is fcurves
+    assert fcurves[(fcurve.data_path, 2)] is fcurve
+
+    outside = action.fcurves.new('pose.bones["bone_00001"].location', index=0)  # e.g. keyframe_insert()
+    rebuilt = starter.action_fcurves(action)
+    assert rebuilt is not fcurves
+    assert rebuilt[(outside.data_path, 0)] is outside
+
+
+def test_transform_writes_and_keys_at_the_frame(bpy, rig):
+    transforms = {"bone_00001": {"location": (0.0, 1.0, 0.0), "rotation": (0.1, 0.2, 0.3)}}
+    starter.transform_multiple_bones_in_pose_mode("Rig", transforms, frame=7)
+
+    assert bpy.context.scene.frame_current == 7
+    assert tuple(rig.pose.bones["bone_00001"].rotation_euler) == pytest.approx((0.1, 0.2, 0.3))
+    np.testing.assert_allclose(keys(starter.get_bone_fcurve(rig, "bone_00001", "location", 1)), [[7.0, 1.0]])
+    np.testing.assert_allclose(keys(starter.get_bone_fcurve(rig, "bone_00001", "rotation_euler", 2)), [[7.0, 0.3]])
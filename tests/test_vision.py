@@ -0,0 +1,104 @@
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+import vision
+
+
+def frame(value):
+    return np.full((2, 3, 3), value, dtype=np.uint8)
+
+
+def test_ring_drops_the_oldest_frame_when_full():
+    ring = vision.FrameRing(3, (2, 3, 3))
+    for value in range(5):
+        ring.push(frame(value))
+    assert len(ring) == 3
+    assert ring.counters == {"pushed": 5, "popped": 0, "dropped": 2}
+
+    out = ring.new_frame()
+    popped = []
+    while ring.pop(out, timeout=0):
+        popped.append(int(out[0, 0, 0]))
+    assert popped == [2, 3, 4]
+    assert ring.counters["popped"] == 3
+
+
+def test_ring_pop_copies_out_and_waits():
+    ring = vision.FrameRing(2, (2, 3, 3))
+    out = ring.new_frame()
+    assert not ring.pop(out, timeout=0.01)
+
+    ring.push(frame(7))
+    assert ring.pop(out)
+    ring.push(frame(9))  # reuses the slot out was copied from
+    assert (out == 7).all()
+
+    threading.Timer(0.02, ring.push, args=(frame(1),)).start()
+    assert ring.pop(out, timeout=5.0)
+    assert (out == 9).all()
+
+
+@pytest.mark.parametrize("text, size", [
+    ("320x240", (320, 240)),
+    ("64X48", (64, 48)),
+    ("", None),
+    (None, None),
+])
+def test_parse_size(text, size):
+    assert vision.parse_size(text) == size
+
+
+@pytest.mark.parametrize("text", ["320", "320x240x3", "wide x tall"])
+def test_parse_size_rejects_garbage(text):
+    with pytest.raises(ValueError):
+        vision.parse_size(text)
+
+
+@pytest.mark.parametrize("render_size, retina_size, layout", [
+    ((256, 256), None, (1, (0, 0), (256, 256))),
+    ((1024, 768), (256, 256), (3, (128, 0), (256, 256))),  # stride limited by the height, width cropped
+    ((640, 480), (320, 240), (2, (0, 0), (320, 240))),
+    ((641, 481), (320, 240), (2, (0, 0), (320, 240))),  # the odd row and column are left out
+    ((100, 100), (400, 50), (1, (0, 25), (100, 50))),  # a retina bigger than the render is clamped
+])
+def test_frame_layout(render_size, retina_size, layout):
+    assert vision.frame_layout(render_size, retina_size) == layout
+
+
+@pytest.fixture
+def gpu(monkeypatch):
+    """Just enough of Blender's gpu module for CameraCapture._allocate()."""
+    offscreen = types.SimpleNamespace(free=lambda: None)
+    gpu_module = types.SimpleNamespace(types=types.SimpleNamespace(
+        GPUOffScreen=lambda width, height: offscreen,
+        Buffer=lambda kind, shape: bytearray(int(np.prod(shape)))))
+    monkeypatch.setitem(sys.modules, "gpu", gpu_module)
+    return gpu_module
+
+
+@pytest.mark.parametrize("render_size, retina_size", [((12, 9), (4, 3)), ((10, 7), (3, 3)), ((5, 4), None)])
+def test_capture_view_flips_crops_and_downsamples(gpu, render_size, retina_size):
+    capture = vision.CameraCapture("Camera", render_size, retina_size)
+    capture._allocate()
+    height, width = capture._pixels.shape[:2]
+    capture._pixels[:] = np.random.default_rng(0).integers(0, 256, (height, width, 4), dtype=np.uint8)
+
+    stride = capture.stride
+    x0, y0 = capture.crop_origin
+    frame_width, frame_height = capture.frame_size
+    expected = np.empty((frame_height, frame_width, 3), dtype=np.uint8)
+    for row in range(frame_height):
+        source_row = y0 + (frame_height - 1 - row) * stride  # OpenGL rows are bottom-up
+        for column in range(frame_width):
+            red, green, blue, _ = capture._pixels[source_row, x0 + column * stride]
+            expected[row, column] = (blue, green, red)
+
+    np.testing.assert_array_equal(capture._source, expected)
+    capture.ring.push(capture._source)
+    out = capture.ring.new_frame()
+    assert capture.ring.pop(out, timeout=0)
+    np.testing.assert_array_equal(out, expected)